@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+签到吞吐基准：在本地模拟 new-api 服务上分别运行 10 / 100 / 1000 个账号，
+输出每轮的总耗时、签到进程的峰值内存和每秒请求数
+
+	python benchmarks/bench_checkin.py
+	python benchmarks/bench_checkin.py --accounts 10,100 --latency 0.05 --rate-limit 200 --json bench.json
+	python benchmarks/bench_checkin.py --accounts 1000,10000 --accounts-file
+
+默认不模拟 WAF，只测 HTTP 签到流程；加 --waf 时服务商改为 waf_cookies 模式，需要已安装 Playwright 浏览器。
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# 添加项目根目录到 PATH
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from benchmarks.mock_server import MockNewApiServer, add_config_arguments, config_from_args
+
+CHECKIN_SCRIPT = project_root / 'checkin.py'
+# 子进程中需要清空的环境变量，避免基准测试发送通知或读取真实配置
+CLEARED_ENV = (
+	'PUSHPLUS_TOKEN',
+	'SERVERPUSHKEY',
+	'DINGDING_WEBHOOK',
+	'FEISHU_WEBHOOK',
+	'WEIXIN_WEBHOOK',
+	'EMAIL_USER',
+	'EMAIL_PASS',
+	'EMAIL_TO',
+	'PROXY_URL',
+	'PROXY_HOST',
+	'PROXY_PORT',
+	'WAF_COOKIE_CACHE_FILE',
+	'NOTIFY_OUTBOX_FILE',
+	'PROFILE_FILE',
+	'METRICS_TEXTFILE',
+)
+
+
+class ServerThread:
+	"""在后台线程的事件循环中运行模拟服务，主线程可以同步等待签到子进程"""
+
+	def __init__(self, server: MockNewApiServer):
+		self.server = server
+		self.loop = asyncio.new_event_loop()
+		self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+
+	def __enter__(self) -> MockNewApiServer:
+		self._thread.start()
+		asyncio.run_coroutine_threadsafe(self.server.start(), self.loop).result()
+		return self.server
+
+	def __exit__(self, *exc):
+		asyncio.run_coroutine_threadsafe(self.server.close(), self.loop).result()
+		self.loop.call_soon_threadsafe(self.loop.stop)
+		self._thread.join()
+
+	def call(self, func):
+		"""在服务线程中执行 func，避免与请求处理并发修改统计数据"""
+
+		async def run():
+			return func()
+
+		return asyncio.run_coroutine_threadsafe(run(), self.loop).result()
+
+
+def build_env(
+	server_url: str,
+	account_count: int,
+	waf: bool,
+	workdir: str,
+	extra: dict,
+	client_rate_limit: float | None = None,
+	accounts_file: bool = False,
+) -> dict:
+	accounts = (
+		{'name': f'bench-{i}', 'provider': 'bench', 'api_user': str(i), 'cookies': {'session': f'session-{i}'}}
+		for i in range(account_count)
+	)
+	providers = {'bench': {'domain': server_url, 'bypass_method': 'waf_cookies' if waf else None}}
+	if client_rate_limit:
+		providers['bench']['rate_limit'] = client_rate_limit
+	env = dict(os.environ)
+	env.update({name: '' for name in CLEARED_ENV})
+	if accounts_file:
+		# 通过 JSONL 账号文件流式读取，避免环境变量长度限制
+		path = os.path.join(workdir, 'accounts.jsonl')
+		with open(path, 'w', encoding='utf-8') as f:
+			f.writelines(json.dumps(account) + '\n' for account in accounts)
+		env.update({'ANYROUTER_ACCOUNTS_FILE': path, 'ANYROUTER_ACCOUNTS': ''})
+	else:
+		env.update({'ANYROUTER_ACCOUNTS': json.dumps(list(accounts)), 'ANYROUTER_ACCOUNTS_FILE': ''})
+	env.update(
+		{
+			'PROVIDERS': json.dumps(providers),
+			'BALANCE_DB_FILE': os.path.join(workdir, 'balance_history.db'),
+			'PYTHONIOENCODING': 'utf-8',
+		}
+	)
+	env.update(extra)
+	return env
+
+
+def run_checkin(env: dict, workdir: str) -> tuple[int, float, float | None]:
+	"""运行一次签到子进程，返回 (退出码, 耗时秒, 峰值 RSS MB)"""
+	with open(os.path.join(workdir, 'checkin.log'), 'wb') as log:
+		start = time.perf_counter()
+		process = subprocess.Popen(
+			[sys.executable, str(CHECKIN_SCRIPT)], cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT
+		)
+		if hasattr(os, 'wait4'):
+			# wait4 返回该子进程自己的资源使用情况，多轮运行之间互不影响
+			_, status, usage = os.wait4(process.pid, 0)
+			elapsed = time.perf_counter() - start
+			process.returncode = os.waitstatus_to_exitcode(status)
+			# Linux 上 ru_maxrss 单位为 KB，macOS 上为字节
+			divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+			return process.returncode, elapsed, usage.ru_maxrss / divisor
+		process.wait()
+		return process.returncode, time.perf_counter() - start, None
+
+
+def run_benchmark(args) -> list[dict]:
+	results = []
+	extra_env = {'MAX_CONCURRENCY': str(args.concurrency)} if args.concurrency else {}
+	config = config_from_args(args)
+	config.waf = args.waf
+	server_thread = ServerThread(MockNewApiServer(config))
+	with server_thread as server:
+		for account_count in args.accounts:
+			server_thread.call(server.reset)
+			with tempfile.TemporaryDirectory(prefix='checkin-bench-') as workdir:
+				env = build_env(
+					server.url, account_count, args.waf, workdir, extra_env, args.client_rate_limit, args.accounts_file
+				)
+				exit_code, elapsed, peak_rss = run_checkin(env, workdir)
+				if exit_code != 0:
+					print(Path(workdir, 'checkin.log').read_text(encoding='utf-8', errors='replace')[-2000:])
+			stats = server_thread.call(server.stats)
+			checked_in = server_thread.call(lambda: len(server.checked_in))
+			results.append(
+				{
+					'accounts': account_count,
+					'exit_code': exit_code,
+					'wall_time': round(elapsed, 3),
+					'peak_rss_mb': round(peak_rss, 1) if peak_rss is not None else None,
+					'requests': stats['requests'],
+					'requests_per_second': round(stats['requests'] / elapsed, 1) if elapsed else 0.0,
+					'checked_in': checked_in,
+					'status': stats['status'],
+				}
+			)
+			print_result(results[-1])
+	return results
+
+
+def print_result(result: dict):
+	rss = f'{result["peak_rss_mb"]:.1f} MB' if result['peak_rss_mb'] is not None else 'n/a'
+	print(
+		f'📊 [基准] {result["accounts"]:>5} 个账号: 耗时 {result["wall_time"]:.2f}s, 峰值内存 {rss}, '
+		f'{result["requests"]} 个请求 ({result["requests_per_second"]:.1f} req/s), '
+		f'签到成功 {result["checked_in"]}, 状态码 {result["status"]}',
+		flush=True,
+	)
+
+
+def main():
+	parser = argparse.ArgumentParser(description='签到吞吐基准测试')
+	parser.add_argument('--accounts', default='10,100,1000', help='逗号分隔的账号数量，默认 10,100,1000')
+	parser.add_argument('--concurrency', type=int, help='传给签到脚本的 MAX_CONCURRENCY')
+	parser.add_argument('--waf', action='store_true', help='模拟 WAF 挑战并通过浏览器求解（需要 Playwright 浏览器）')
+	parser.add_argument('--client-rate-limit', type=float, help='签到脚本侧服务商的 rate_limit（每秒请求数）')
+	parser.add_argument('--accounts-file', action='store_true', help='通过 ANYROUTER_ACCOUNTS_FILE（JSONL）传入账号')
+	parser.add_argument('--json', help='将结果写入 JSON 文件')
+	add_config_arguments(parser)
+	args = parser.parse_args()
+	args.accounts = [int(value) for value in args.accounts.split(',') if value.strip()]
+
+	results = run_benchmark(args)
+	if args.json:
+		with open(args.json, 'w', encoding='utf-8') as f:
+			json.dump(results, f, ensure_ascii=False, indent=2)
+	return 0 if all(result['exit_code'] == 0 for result in results) else 1
+
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+冷启动基准：测量 import checkin 的耗时并检查是否超出预算，同时确认 Playwright 和通知后端没有在导入时加载
+
+	python benchmarks/bench_startup.py
+	python benchmarks/bench_startup.py --runs 10 --budget-ms 150
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+
+# 导入 checkin 时不应加载的模块：只有需要 WAF 或发送邮件时才按需导入
+LAZY_MODULES = ('playwright', 'smtplib', 'utils.notify')
+
+PROBE = """
+import json, sys
+import checkin
+lazy = {lazy!r}
+print(json.dumps(sorted(m for m in sys.modules if any(m == name or m.startswith(name + '.') for name in lazy))))
+"""
+
+
+def measure_import(python: str) -> tuple[float, float]:
+	"""运行一次 -X importtime，返回 (checkin 模块累计导入耗时 ms, 进程总耗时 ms)"""
+	start = time.perf_counter()
+	result = subprocess.run(
+		[python, '-X', 'importtime', '-c', 'import checkin'],
+		cwd=project_root,
+		capture_output=True,
+		text=True,
+		check=True,
+	)
+	wall = (time.perf_counter() - start) * 1000
+	for line in reversed(result.stderr.splitlines()):
+		parts = [part.strip() for part in line.split('|')]
+		if len(parts) == 3 and parts[2] == 'checkin':
+			return int(parts[1]) / 1000, wall
+	raise RuntimeError('checkin not found in -X importtime output')
+
+
+def loaded_lazy_modules(python: str) -> list[str]:
+	result = subprocess.run(
+		[python, '-c', PROBE.format(lazy=LAZY_MODULES)],
+		cwd=project_root,
+		capture_output=True,
+		text=True,
+		check=True,
+	)
+	return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+	parser = argparse.ArgumentParser(description='checkin.py 冷启动导入耗时基准')
+	parser.add_argument('--runs', type=int, default=5, help='测量次数，取中位数，默认 5')
+	parser.add_argument(
+		'--budget-ms', type=float, default=200.0, help='import checkin 耗时预算（中位数，毫秒），默认 200'
+	)
+	parser.add_argument('--python', default=sys.executable, help='使用的 Python 解释器')
+	args = parser.parse_args()
+
+	# 第一次运行会生成 .pyc，不计入结果
+	measure_import(args.python)
+	samples = [measure_import(args.python) for _ in range(max(1, args.runs))]
+	import_ms = statistics.median(sample[0] for sample in samples)
+	wall_ms = statistics.median(sample[1] for sample in samples)
+	print(
+		f'⏱️ [启动] import checkin: 中位数 {import_ms:.1f} ms（最大 {max(s[0] for s in samples):.1f} ms），'
+		f'进程总耗时中位数 {wall_ms:.1f} ms，预算 {args.budget_ms:.0f} ms'
+	)
+
+	exit_code = 0
+	lazy_loaded = loaded_lazy_modules(args.python)
+	if lazy_loaded:
+		print(f'❌ [启动] 以下模块应按需导入，但在 import checkin 时已加载: {", ".join(lazy_loaded)}')
+		exit_code = 1
+	if import_ms > args.budget_ms:
+		print(f'❌ [启动] 导入耗时超出预算 {import_ms - args.budget_ms:.1f} ms')
+		exit_code = 1
+	if exit_code == 0:
+		print('✅ [启动] 导入耗时在预算内，Playwright 和通知后端均为按需导入')
+	return exit_code
+
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+本地模拟 new-api 服务：用于离线测试和性能基准，不依赖真实服务商
+
+实现的接口：
+- GET  /login                    模拟 WAF 挑战：缺少 WAF cookies 时下发 acw_tc / cdn_sec_tc，并返回计算 acw_sc__v2 的脚本
+- GET  /api/user/self            用户信息（quota / used_quota）
+- GET  /api/user/checkin/status  今日是否已签到
+- POST /api/user/checkin         自动签到（新接口）
+- POST /api/user/sign_in         签到（旧接口）
+- GET  /__stats                  请求统计（总数、连接数、按状态码计数、同时处理的请求数和账号数峰值）
+- POST /__reset                  清空签到记录和统计
+
+延迟、错误率和限流均可配置，用法：
+	python benchmarks/mock_server.py --port 8080 --latency 0.05 --jitter 0.02 --error-rate 0.01 --rate-limit 200
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+from dataclasses import dataclass, field
+
+WAF_COOKIES = ('acw_tc', 'cdn_sec_tc', 'acw_sc__v2')
+
+# 与阿里云 WAF 挑战页类似：页面脚本根据 arg1 计算 acw_sc__v2 后写入 cookie 并刷新
+CHALLENGE_PAGE = """<html><head><script>
+var arg1='{arg1}';
+document.cookie='acw_sc__v2='+arg1.split('').reverse().join('')+'; path=/';
+setTimeout(function(){{location.reload();}}, 10);
+</script></head><body></body></html>"""
+
+LOGIN_PAGE = '<html><head><title>New API</title></head><body><div id="root"></div></body></html>'
+
+
+@dataclass
+class MockServerConfig:
+	"""模拟服务配置
+
+	latency 为每个请求的基础延迟（秒），另加 0~jitter 秒的随机延迟；
+	error_rate 为 API 请求返回 500 的概率；rate_limit 为每秒允许的请求数（0 表示不限流），
+	超出时返回 429 和 Retry-After。
+	"""
+
+	latency: float = 0.0
+	jitter: float = 0.0
+	error_rate: float = 0.0
+	rate_limit: float = 0.0
+	burst: int = 0
+	waf: bool = True
+	quota: int = 25_000_000
+	used_quota: int = 5_000_000
+	checkin_reward: int = 500_000
+
+
+@dataclass
+class _TokenBucket:
+	rate: float
+	capacity: float
+	tokens: float = 0.0
+	updated: float = field(default_factory=time.monotonic)
+
+	def take(self) -> float:
+		"""取一个令牌，成功返回 0，否则返回需要等待的秒数"""
+		now = time.monotonic()
+		self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+		self.updated = now
+		if self.tokens >= 1:
+			self.tokens -= 1
+			return 0.0
+		return (1 - self.tokens) / self.rate
+
+
+class MockNewApiServer:
+	"""基于 asyncio 的 HTTP/1.1 模拟服务，支持 keep-alive，便于测试连接复用"""
+
+	def __init__(self, config: MockServerConfig | None = None, host: str = '127.0.0.1', port: int = 0):
+		self.config = config or MockServerConfig()
+		self.host = host
+		self.port = port
+		self.checked_in: set[str] = set()
+		self.request_count = 0
+		self.connection_count = 0
+		self.status_counts: dict[int, int] = {}
+		# 同时处理中的请求数及其峰值，以及同时有请求在处理中的账号数峰值（按 new-api-user 区分）
+		self.in_flight = 0
+		self.max_in_flight = 0
+		self._accounts_in_flight: dict[str, int] = {}
+		self.max_accounts_in_flight = 0
+		self._bucket = None
+		if self.config.rate_limit > 0:
+			capacity = self.config.burst or max(1.0, self.config.rate_limit)
+			self._bucket = _TokenBucket(self.config.rate_limit, capacity, tokens=capacity)
+		self._server: asyncio.AbstractServer | None = None
+
+	@property
+	def url(self) -> str:
+		return f'http://{self.host}:{self.port}'
+
+	async def start(self):
+		self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+		self.port = self._server.sockets[0].getsockname()[1]
+
+	async def close(self):
+		if self._server:
+			self._server.close()
+			await self._server.wait_closed()
+			self._server = None
+
+	async def __aenter__(self) -> 'MockNewApiServer':
+		await self.start()
+		return self
+
+	async def __aexit__(self, *exc):
+		await self.close()
+
+	def reset(self):
+		self.checked_in.clear()
+		self.request_count = 0
+		self.connection_count = 0
+		self.status_counts.clear()
+		self.max_in_flight = 0
+		self.max_accounts_in_flight = 0
+
+	def stats(self) -> dict:
+		return {
+			'requests': self.request_count,
+			'connections': self.connection_count,
+			'status': {str(k): v for k, v in sorted(self.status_counts.items())},
+			'max_in_flight': self.max_in_flight,
+			'max_accounts_in_flight': self.max_accounts_in_flight,
+		}
+
+	async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+		self.connection_count += 1
+		try:
+			while True:
+				request_line = await reader.readline()
+				if not request_line:
+					break
+				method, target, version = request_line.decode('latin-1').split(' ', 2)
+				headers = {}
+				while True:
+					line = await reader.readline()
+					if line in (b'\r\n', b'\n', b''):
+						break
+					name, _, value = line.decode('latin-1').partition(':')
+					headers[name.strip().lower()] = value.strip()
+				body = b''
+				if int(headers.get('content-length') or 0):
+					body = await reader.readexactly(int(headers['content-length']))
+
+				status, response_headers, payload = await self.handle(method, target.split('?', 1)[0], headers, body)
+				keep_alive = headers.get('connection', '').lower() != 'close' and version.strip() == 'HTTP/1.1'
+				head = [f'HTTP/1.1 {status} {_REASONS.get(status, "OK")}', f'Content-Length: {len(payload)}']
+				head += [f'{name}: {value}' for name, value in response_headers]
+				head.append(f'Connection: {"keep-alive" if keep_alive else "close"}')
+				writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + payload)
+				await writer.drain()
+				if not keep_alive:
+					break
+		except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+			pass
+		finally:
+			writer.close()
+
+	async def handle(self, method: str, path: str, headers: dict, body: bytes) -> tuple[int, list, bytes]:
+		"""处理单个请求，返回 (状态码, 响应头列表, 响应体)"""
+		if path == '/__stats':
+			return _json(200, self.stats())
+		if path == '/__reset':
+			self.reset()
+			return _json(200, {'success': True})
+
+		self.request_count += 1
+		api_user = headers.get('new-api-user')
+		self._enter(api_user)
+		try:
+			status, response_headers, payload = await self._dispatch(method, path, headers)
+		finally:
+			self._leave(api_user)
+		self.status_counts[status] = self.status_counts.get(status, 0) + 1
+		return status, response_headers, payload
+
+	def _enter(self, api_user: str | None):
+		self.in_flight += 1
+		self.max_in_flight = max(self.max_in_flight, self.in_flight)
+		if api_user:
+			self._accounts_in_flight[api_user] = self._accounts_in_flight.get(api_user, 0) + 1
+			self.max_accounts_in_flight = max(self.max_accounts_in_flight, len(self._accounts_in_flight))
+
+	def _leave(self, api_user: str | None):
+		self.in_flight -= 1
+		if api_user:
+			self._accounts_in_flight[api_user] -= 1
+			if not self._accounts_in_flight[api_user]:
+				del self._accounts_in_flight[api_user]
+
+	async def _dispatch(self, method: str, path: str, headers: dict) -> tuple[int, list, bytes]:
+		config = self.config
+		if self._bucket:
+			wait = self._bucket.take()
+			if wait > 0:
+				return _json(
+					429,
+					{'success': False, 'message': 'too many requests'},
+					[('Retry-After', str(max(1, math.ceil(wait))))],
+				)
+		if config.latency or config.jitter:
+			await asyncio.sleep(config.latency + random.uniform(0, config.jitter))
+
+		cookies = _parse_cookie_header(headers.get('cookie', ''))
+		if not path.startswith('/api/'):
+			# 与 new-api 前端一致，/login 等页面路径都返回同一个单页应用
+			return self._login(cookies)
+
+		if config.waf and not all(name in cookies for name in WAF_COOKIES):
+			return self._challenge()
+		if config.error_rate and random.random() < config.error_rate:
+			return _json(500, {'success': False, 'message': 'internal error'})
+		api_user = headers.get('new-api-user')
+		if not api_user or 'session' not in cookies:
+			return _json(401, {'success': False, 'message': '未登录'})
+
+		if path == '/api/user/self' and method == 'GET':
+			quota = config.quota + (config.checkin_reward if api_user in self.checked_in else 0)
+			return _json(200, {'success': True, 'data': {'quota': quota, 'used_quota': config.used_quota}})
+		if path == '/api/user/checkin/status' and method == 'GET':
+			return _json(200, {'success': True, 'data': {'checked': api_user in self.checked_in}})
+		if path in ('/api/user/checkin', '/api/user/sign_in') and method == 'POST':
+			if api_user in self.checked_in:
+				return _json(200, {'success': False, 'message': '今日已签到'})
+			self.checked_in.add(api_user)
+			return _json(200, {'success': True, 'message': '签到成功'})
+		return _json(404, {'success': False, 'message': 'not found'})
+
+	def _login(self, cookies: dict) -> tuple[int, list, bytes]:
+		if not self.config.waf or all(name in cookies for name in WAF_COOKIES):
+			return 200, [('Content-Type', 'text/html; charset=utf-8')], LOGIN_PAGE.encode('utf-8')
+		return self._challenge()
+
+	def _challenge(self) -> tuple[int, list, bytes]:
+		arg1 = f'{random.getrandbits(64):016X}'
+		response_headers = [
+			('Content-Type', 'text/html; charset=utf-8'),
+			('Set-Cookie', f'acw_tc={random.getrandbits(64):016x}; Path=/; HttpOnly'),
+			('Set-Cookie', f'cdn_sec_tc={random.getrandbits(64):016x}; Path=/; HttpOnly'),
+		]
+		return 200, response_headers, CHALLENGE_PAGE.format(arg1=arg1).encode('utf-8')
+
+
+_REASONS = {200: 'OK', 401: 'Unauthorized', 404: 'Not Found', 429: 'Too Many Requests', 500: 'Internal Server Error'}
+
+
+def _json(status: int, data: dict, extra_headers: list | None = None) -> tuple[int, list, bytes]:
+	headers = [('Content-Type', 'application/json')] + (extra_headers or [])
+	return status, headers, json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+
+def _parse_cookie_header(value: str) -> dict:
+	cookies = {}
+	for part in value.split(';'):
+		name, sep, cookie_value = part.strip().partition('=')
+		if sep:
+			cookies[name] = cookie_value
+	return cookies
+
+
+def add_config_arguments(parser: argparse.ArgumentParser):
+	parser.add_argument('--latency', type=float, default=0.0, help='每个请求的基础延迟（秒）')
+	parser.add_argument('--jitter', type=float, default=0.0, help='每个请求额外的随机延迟上限（秒）')
+	parser.add_argument('--error-rate', type=float, default=0.0, help='API 请求返回 500 的概率')
+	parser.add_argument('--rate-limit', type=float, default=0.0, help='每秒允许的请求数，0 表示不限流')
+	parser.add_argument('--burst', type=int, default=0, help='限流的突发容量，默认等于 --rate-limit')
+
+
+def config_from_args(args) -> MockServerConfig:
+	return MockServerConfig(
+		latency=args.latency,
+		jitter=args.jitter,
+		error_rate=args.error_rate,
+		rate_limit=args.rate_limit,
+		burst=args.burst,
+		waf=not getattr(args, 'no_waf', False),
+	)
+
+
+async def serve(config: MockServerConfig, host: str, port: int):
+	async with MockNewApiServer(config, host, port) as server:
+		print(f'🧪 [模拟服务] 已在 {server.url} 启动', flush=True)
+		await asyncio.Event().wait()
+
+
+def main():
+	parser = argparse.ArgumentParser(description='本地模拟 new-api 服务')
+	parser.add_argument('--host', default='127.0.0.1')
+	parser.add_argument('--port', type=int, default=8080)
+	parser.add_argument('--no-waf', action='store_true', help='关闭模拟 WAF 挑战')
+	add_config_arguments(parser)
+	args = parser.parse_args()
+	try:
+		asyncio.run(serve(config_from_args(args), args.host, args.port))
+	except KeyboardInterrupt:
+		pass
+
+
+if __name__ == '__main__':
+	main()
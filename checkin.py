@@ -3,25 +3,60 @@
 AnyRouter.top 自动签到脚本
 """
 
+import argparse
 import asyncio
-import hashlib
+import contextlib
+import heapq
+import itertools
 import json
 import os
+import random
+import signal
 import sys
-from datetime import datetime
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from operator import itemgetter
 
 import httpx
 from dotenv import load_dotenv
-from playwright.async_api import async_playwright
 
-from utils.config import AccountConfig, AppConfig, load_accounts_config
-from utils.notify import notify
+from utils.balance_store import BalanceStore
+from utils.browser import SharedBrowser
+from utils.browser_pool import BrowserWorkerPool
+from utils.checkin_state import CheckinStateStore
+from utils.config import AccountConfig, AccountSource, AppConfig, ProviderConfig
+from utils.http_pool import ClientPool, format_cookie_header
+from utils.metrics import MetricsRegistry, MetricsServer
+from utils.outbox import NotificationOutbox
+from utils.pipeline import Done, run_pipeline
+from utils.profiler import RunProfiler
+from utils.rate_limit import TokenBucket
+from utils.resilience import parse_retry_after
+from utils.scheduler import CronSchedule, ResetSchedule, Schedule
+from utils.sharding import DEFAULT_SHARD_RESULTS_DIR, Shard, ShardResultWriter, find_shard_results
+from utils.waf_cache import WafCookieCache
 
 load_dotenv()
 
 # 浏览器无头模式：True=不显示浏览器窗口（服务器环境），False=显示浏览器窗口（本地调试）
 HEADLESS = True
-BALANCE_HASH_FILE = 'balance_hash.txt'
+# 需要从 WAF 挑战中获取的 cookies
+REQUIRED_WAF_COOKIES = ('acw_tc', 'cdn_sec_tc', 'acw_sc__v2')
+# 等待 WAF cookies 的默认最长时间（秒），可通过环境变量 WAF_COOKIE_TIMEOUT 覆盖
+DEFAULT_WAF_COOKIE_TIMEOUT = 20.0
+# 浏览器工作进程求解 WAF 的超时时间比 WAF_COOKIE_TIMEOUT 多出的余量（秒），包含浏览器启动和页面加载
+WORKER_SOLVE_TIMEOUT_MARGIN = 60.0
+# 启动时服务商健康检查的默认超时时间（秒）
+DEFAULT_HEALTH_CHECK_TIMEOUT = 5.0
+# 通知中最多逐行展示的余额账号数，其余账号合并为一行摘要
+DEFAULT_NOTIFY_MAX_BALANCE_LINES = 50
+# 常驻模式默认调度计划（与 GitHub Actions 的 cron 保持一致）
+DEFAULT_DAEMON_CRON = '0 */6 * * *'
+# 默认并发签到的账号数量，可通过环境变量 MAX_CONCURRENCY 覆盖
+DEFAULT_MAX_CONCURRENCY = 5
+# 通知中最多逐个列出的账号名称和失败详情数，其余只给出数量
+NOTIFY_MAX_SUMMARY_NAMES = 100
 
 
 def get_proxy_config():
@@ -46,6 +81,70 @@ def get_proxy_config():
     return None
 
 
+def get_max_concurrency():
+    """获取并发签到的账号数量上限"""
+    value = os.getenv('MAX_CONCURRENCY')
+    if not value:
+        return DEFAULT_MAX_CONCURRENCY
+    try:
+        return max(1, int(value))
+    except ValueError:
+        print(f'⚠️ [警告] MAX_CONCURRENCY 配置无效: {value}，使用默认值 {DEFAULT_MAX_CONCURRENCY}')
+        return DEFAULT_MAX_CONCURRENCY
+
+
+def get_notify_max_balance_lines():
+    """获取通知中逐行展示的余额账号数上限"""
+    value = os.getenv('NOTIFY_MAX_BALANCE_LINES')
+    if not value:
+        return DEFAULT_NOTIFY_MAX_BALANCE_LINES
+    try:
+        return max(0, int(value))
+    except ValueError:
+        print(f'⚠️ [警告] NOTIFY_MAX_BALANCE_LINES 配置无效: {value}，使用默认值 {DEFAULT_NOTIFY_MAX_BALANCE_LINES}')
+        return DEFAULT_NOTIFY_MAX_BALANCE_LINES
+
+
+def get_pipeline_sizes(default_browser_concurrency: int, max_concurrency: int) -> tuple[int, int]:
+    """获取 cookie 阶段的并发数（BROWSER_CONCURRENCY）和两阶段之间的队列容量（PIPELINE_QUEUE_SIZE）
+
+    cookie 阶段默认与浏览器工作进程数（未启用时与 MAX_CONCURRENCY）相同，队列容量默认与 MAX_CONCURRENCY 相同
+    """
+    sizes = []
+    for name, default in (('BROWSER_CONCURRENCY', default_browser_concurrency), ('PIPELINE_QUEUE_SIZE', max_concurrency)):
+        value = os.getenv(name)
+        try:
+            sizes.append(max(1, int(value)) if value else default)
+        except ValueError:
+            print(f'⚠️ [警告] {name} 配置无效: {value}，使用默认值 {default}')
+            sizes.append(default)
+    return sizes[0], sizes[1]
+
+
+def get_health_check_timeout():
+    """获取启动时服务商健康检查的超时时间（秒），设置为 0 时跳过健康检查"""
+    value = os.getenv('HEALTH_CHECK_TIMEOUT')
+    if not value:
+        return DEFAULT_HEALTH_CHECK_TIMEOUT
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        print(f'⚠️ [警告] HEALTH_CHECK_TIMEOUT 配置无效: {value}，使用默认值 {DEFAULT_HEALTH_CHECK_TIMEOUT}')
+        return DEFAULT_HEALTH_CHECK_TIMEOUT
+
+
+def get_waf_cookie_timeout():
+    """获取等待 WAF cookies 的最长时间（秒）"""
+    value = os.getenv('WAF_COOKIE_TIMEOUT')
+    if not value:
+        return DEFAULT_WAF_COOKIE_TIMEOUT
+    try:
+        return max(1.0, float(value))
+    except ValueError:
+        print(f'⚠️ [警告] WAF_COOKIE_TIMEOUT 配置无效: {value}，使用默认值 {DEFAULT_WAF_COOKIE_TIMEOUT}')
+        return DEFAULT_WAF_COOKIE_TIMEOUT
+
+
 def get_httpx_proxies(proxy_url):
     """获取 httpx 代理配置"""
     if not proxy_url:
@@ -81,34 +180,63 @@ def get_playwright_proxy(proxy_url):
     return proxy_config
 
 
-def load_balance_hash():
-    """加载余额hash"""
-    try:
-        if os.path.exists(BALANCE_HASH_FILE):
-            with open(BALANCE_HASH_FILE, 'r', encoding='utf-8') as f:
-                return f.read().strip()
-    except Exception:
-        pass
-    return None
-
-
-def save_balance_hash(balance_hash):
-    """保存余额hash"""
-    try:
-        with open(BALANCE_HASH_FILE, 'w', encoding='utf-8') as f:
-            f.write(balance_hash)
-    except Exception as e:
-        print(f'Warning: Failed to save balance hash: {e}')
-
-
-def generate_balance_hash(balances):
-    """生成余额数据的hash"""
-    # 将包含 quota 和 used 的结构转换为简单的 quota 值用于 hash 计算
-    simple_balances = {k: v['quota']
-                       for k, v in balances.items()} if balances else {}
-    balance_json = json.dumps(
-        simple_balances, sort_keys=True, separators=(',', ':'))
-    return hashlib.sha256(balance_json.encode('utf-8')).hexdigest()[:16]
+@dataclass
+class RunContext:
+    """一次运行中所有账号共享的资源（代理、浏览器、WAF 缓存、HTTP 连接池、签到状态、耗时统计、指标）"""
+
+    proxy_url: str | None = None
+    browser: SharedBrowser | None = None
+    # 设置 BROWSER_WORKERS 后由工作进程池求解 WAF，此时不使用 browser
+    browser_pool: BrowserWorkerPool | None = None
+    waf_cache: WafCookieCache | None = None
+    clients: ClientPool = field(default_factory=ClientPool)
+    checkin_state: CheckinStateStore | None = None
+    profiler: RunProfiler = field(default_factory=RunProfiler)
+    metrics: MetricsRegistry = field(default_factory=MetricsRegistry)
+    # 今日已签到的账号是否仍刷新余额（只请求用户信息，不启动浏览器）
+    refresh_checked_balance: bool = True
+    # 签到成功后是否重新获取余额，使通知中的余额包含签到奖励（每个账号多一次请求，默认关闭）
+    refresh_after_checkin: bool = False
+    # 最近一次运行中签到失败的账号数（常驻模式据此决定是否重试）
+    last_failed_count: int = 0
+    # 最近一次运行中账号用到的服务商（常驻模式据此计算下一次签到重置时间）
+    account_providers: list[ProviderConfig] = field(default_factory=list)
+
+    @classmethod
+    def from_env(cls, proxy_url: str | None = None) -> 'RunContext':
+        """根据环境变量创建共享资源，浏览器在第一次需要时才启动"""
+        metrics = MetricsRegistry()
+        clients = ClientPool.from_env()
+        clients.response_hooks.append(metrics.record_http_response)
+        return cls(
+            proxy_url=proxy_url,
+            browser=SharedBrowser(headless=HEADLESS, proxy=get_playwright_proxy(proxy_url)),
+            browser_pool=BrowserWorkerPool.from_env(
+                solve_waf_in_worker, headless=HEADLESS, proxy=get_playwright_proxy(proxy_url),
+                solve_timeout=get_waf_cookie_timeout() + WORKER_SOLVE_TIMEOUT_MARGIN),
+            waf_cache=WafCookieCache.from_env(),
+            clients=clients,
+            checkin_state=CheckinStateStore.from_env(),
+            profiler=RunProfiler.from_env(),
+            metrics=metrics,
+            refresh_checked_balance=os.getenv('REFRESH_CHECKED_BALANCE', 'true').lower() in ['true', '1', 'yes'],
+            refresh_after_checkin=os.getenv('REFRESH_BALANCE_AFTER_CHECKIN', 'false').lower() in ['true', '1', 'yes'],
+        )
+
+    def flush(self):
+        """保存需要持久化的状态（常驻模式下每次运行结束时调用）"""
+        if self.checkin_state:
+            self.checkin_state.flush()
+
+    async def close(self):
+        """释放浏览器、浏览器工作进程和 HTTP 连接"""
+        if self.browser:
+            await self.browser.close()
+        if self.browser_pool:
+            await self.browser_pool.close()
+        await self.clients.aclose()
+        if self.checkin_state:
+            self.checkin_state.close()
 
 
 def parse_cookies(cookies_data):
@@ -126,89 +254,174 @@ def parse_cookies(cookies_data):
     return {}
 
 
-async def get_waf_cookies_with_playwright(account_name: str, login_url: str, proxy_url: str = None):
-    """使用 Playwright 获取 WAF cookies（隐私模式）"""
-    print(f'🔄 [处理中] {account_name}: 正在启动浏览器获取 WAF cookies...')
+async def wait_for_waf_cookies(page, timeout: float, poll_interval: float = 0.25) -> dict:
+    """等待 WAF cookies 全部写入浏览器上下文，齐全后立即返回
+
+    每次页面收到响应（挑战脚本设置 cookie 后会重新加载页面）都会立即检查一次，
+    其余时间按 poll_interval 轮询，最多等待 timeout 秒，超时返回已获取到的部分。
+    """
+    changed = asyncio.Event()
+    on_response = lambda _response: changed.set()
+    page.on('response', on_response)
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    waf_cookies = {}
+    try:
+        while True:
+            changed.clear()
+            waf_cookies = {
+                cookie['name']: cookie['value']
+                for cookie in await page.context.cookies()
+                if cookie.get('name') in REQUIRED_WAF_COOKIES and cookie.get('value') is not None
+            }
+            remaining = deadline - loop.time()
+            if len(waf_cookies) == len(REQUIRED_WAF_COOKIES) or remaining <= 0:
+                return waf_cookies
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=min(poll_interval, remaining))
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        page.remove_listener('response', on_response)
+
+
+async def block_unneeded_resources(context, resource_types=(), url_patterns=(), origin: str | None = None):
+    """拦截 WAF 挑战用不到的资源（图片、字体、统计脚本等）
+
+    页面文档始终放行；WAF 挑战脚本由服务商自己的域名下发，因此来自 origin 的脚本
+    即使匹配了 url_patterns 也不会被拦截。
+    """
+    resource_types = frozenset(resource_types)
+    url_patterns = tuple(url_patterns)
+    if not resource_types and not url_patterns:
+        return
+    origin_url = httpx.URL(origin) if origin else None
+
+    def is_first_party_script(request) -> bool:
+        if request.resource_type != 'script' or origin_url is None:
+            return False
+        url = httpx.URL(request.url)
+        return (url.scheme, url.host, url.port) == (origin_url.scheme, origin_url.host, origin_url.port)
+
+    async def handle_route(route):
+        request = route.request
+        if request.resource_type != 'document' and not is_first_party_script(request) and (
+                request.resource_type in resource_types or any(p in request.url for p in url_patterns)):
+            await route.abort()
+        else:
+            await route.continue_()
+
+    await context.route('**/*', handle_route)
+
+
+async def pace_navigations(context, limiter: TokenBucket):
+    """页面导航（包括 WAF 挑战脚本触发的刷新）先从服务商的令牌桶取得令牌，导航返回 429 时降速"""
+
+    async def handle_route(route):
+        if route.request.is_navigation_request():
+            await limiter.acquire()
+        await route.fallback()
+
+    def handle_response(response):
+        if response.status == 429 and response.request.is_navigation_request():
+            limiter.on_rate_limited(parse_retry_after(response.headers.get('retry-after')))
+
+    await context.route('**/*', handle_route)
+    context.on('response', handle_response)
+
+
+async def get_waf_cookies_with_playwright(account_name: str, login_url: str, proxy_url: str = None,
+                                          browser: SharedBrowser = None, blocked_resource_types=(),
+                                          blocked_url_patterns=(), profiler: RunProfiler = None,
+                                          rate_limiter: TokenBucket = None):
+    """使用 Playwright 获取 WAF cookies（隐私模式）
+
+    传入 browser 时复用共享浏览器，只为当前账号创建独立的无痕上下文；
+    未传入时临时启动一个浏览器，用完即关闭。
+    """
+    if browser is None:
+        async with SharedBrowser(headless=HEADLESS, proxy=get_playwright_proxy(proxy_url)) as temp_browser:
+            return await get_waf_cookies_with_playwright(account_name, login_url, proxy_url, temp_browser,
+                                                         blocked_resource_types, blocked_url_patterns, profiler,
+                                                         rate_limiter)
+    profiler = profiler or RunProfiler()
+
+    print(f'🔄 [处理中] {account_name}: 正在创建浏览器上下文获取 WAF cookies...')
 
     if proxy_url:
         print(f'🌐 [代理] {account_name}: 使用代理连接')
 
-    async with async_playwright() as p:
-        import tempfile
-
-        with tempfile.TemporaryDirectory() as temp_dir:
-            # 准备启动参数
-            launch_args = {
-                'user_data_dir': temp_dir,
-                'headless': HEADLESS,
-                'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/138.0.0.0 Safari/537.36',
-                'viewport': {'width': 1920, 'height': 1080},
-                'args': [
-                    '--disable-blink-features=AutomationControlled',
-                    '--disable-dev-shm-usage',
-                    '--disable-web-security',
-                    '--disable-features=VizDisplayCompositor',
-                    '--no-sandbox',
-                ],
-            }
+    try:
+        # 第一个账号的耗时包含浏览器启动
+        with profiler.span('browser_context', account_name):
+            context = await browser.new_context(
+                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/138.0.0.0 Safari/537.36',
+                viewport={'width': 1920, 'height': 1080},
+            )
+    except Exception as e:
+        print(f'❌ [失败] {account_name}: 启动浏览器失败: {e}')
+        return None
 
-            # 添加代理配置
-            playwright_proxy = get_playwright_proxy(proxy_url)
-            if playwright_proxy:
-                launch_args['proxy'] = playwright_proxy
+    try:
+        await block_unneeded_resources(context, blocked_resource_types, blocked_url_patterns, origin=login_url)
+        if rate_limiter:
+            # 后注册的路由先执行：先限速，再交给资源拦截处理
+            await pace_navigations(context, rate_limiter)
+        page = await context.new_page()
 
-            context = await p.chromium.launch_persistent_context(**launch_args)
+        print(f'🔄 [处理中] {account_name}: 正在访问登录页面获取初始 cookies...')
 
-            page = await context.new_page()
+        # 只等待服务器响应即可，之后一旦三个 WAF cookies 齐全就立即返回
+        with profiler.span('waf_page', account_name):
+            await page.goto(login_url, wait_until='commit')
+        with profiler.span('waf_wait', account_name):
+            waf_cookies = await wait_for_waf_cookies(page, get_waf_cookie_timeout())
 
-            try:
-                print(f'🔄 [处理中] {account_name}: 正在访问登录页面获取初始 cookies...')
+        print(
+            f'ℹ️ [信息] {account_name}: 已获取 {len(waf_cookies)} 个 WAF cookies')
 
-                await page.goto(login_url, wait_until='networkidle')
+        missing_cookies = [
+            c for c in REQUIRED_WAF_COOKIES if c not in waf_cookies]
 
-                try:
-                    await page.wait_for_function('document.readyState === "complete"', timeout=5000)
-                except Exception:
-                    await page.wait_for_timeout(3000)
+        if missing_cookies:
+            print(
+                f'❌ [失败] {account_name}: 缺少 WAF cookies: {missing_cookies}')
+            return None
 
-                cookies = await page.context.cookies()
+        print(f'✅ [成功] {account_name}: 成功获取所有 WAF cookies')
 
-                waf_cookies = {}
-                for cookie in cookies:
-                    cookie_name = cookie.get('name')
-                    cookie_value = cookie.get('value')
-                    if cookie_name in ['acw_tc', 'cdn_sec_tc', 'acw_sc__v2'] and cookie_value is not None:
-                        waf_cookies[cookie_name] = cookie_value
+        return waf_cookies
 
-                print(
-                    f'ℹ️ [信息] {account_name}: 已获取 {len(waf_cookies)} 个 WAF cookies')
+    except Exception as e:
+        print(f'❌ [失败] {account_name}: 获取 WAF cookies 时发生错误: {e}')
+        return None
+    finally:
+        await context.close()
 
-                required_cookies = ['acw_tc', 'cdn_sec_tc', 'acw_sc__v2']
-                missing_cookies = [
-                    c for c in required_cookies if c not in waf_cookies]
 
-                if missing_cookies:
-                    print(
-                        f'❌ [失败] {account_name}: 缺少 WAF cookies: {missing_cookies}')
-                    await context.close()
-                    return None
+class WafChallengeError(Exception):
+    """请求被 WAF 拦截（返回挑战页而不是 JSON），说明使用的 WAF cookies 已失效"""
 
-                print(f'✅ [成功] {account_name}: 成功获取所有 WAF cookies')
 
-                await context.close()
+def is_waf_challenge(response: httpx.Response) -> bool:
+    """WAF 挑战页会下发计算 acw_sc__v2 的脚本（arg1=...），正常页面和接口响应不会包含"""
+    if 'json' in response.headers.get('content-type', ''):
+        return False
+    text = response.text
+    return 'arg1=' in text or 'acw_sc__v2' in text
 
-                return waf_cookies
 
-            except Exception as e:
-                print(f'❌ [失败] {account_name}: 获取 WAF cookies 时发生错误: {e}')
-                await context.close()
-                return None
+def raise_for_waf_challenge(response: httpx.Response):
+    if is_waf_challenge(response):
+        raise WafChallengeError(f'WAF challenge from {response.request.url.host}')
 
 
-def get_user_info(client, headers, user_info_url: str):
-    """获取用户信息"""
+async def get_user_info(client: httpx.AsyncClient, headers, user_info_url: str):
+    """获取用户信息，被 WAF 拦截时抛出 WafChallengeError"""
     try:
-        response = client.get(user_info_url, headers=headers, timeout=30)
+        response = await client.get(user_info_url, headers=headers, timeout=30)
+        raise_for_waf_challenge(response)
 
         if response.status_code == 200:
             data = response.json()
@@ -223,17 +436,103 @@ def get_user_info(client, headers, user_info_url: str):
                     'display': f'💰 已使用: ${used_quota}, 当前余额: 💵${quota}',
                 }
         return {'success': False, 'error': f'❌ 获取用户信息失败: HTTP {response.status_code}'}
+    except WafChallengeError:
+        raise
     except Exception as e:
         return {'success': False, 'error': f'❌ 获取用户信息失败: {str(e)[:50]}...'}
 
 
-async def prepare_cookies(account_name: str, provider_config, user_cookies: dict, proxy_url: str = None) -> dict | None:
-    """准备请求所需的 cookies（可能包含 WAF cookies）"""
+async def probe_waf_cookies(client: httpx.AsyncClient, login_url: str, waf_cookies: dict) -> bool:
+    """用一次轻量 HTTP 请求确认缓存的 WAF cookies 仍被服务器接受"""
+    try:
+        response = await client.get(login_url, timeout=10.0, headers={
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/138.0.0.0 Safari/537.36',
+            'Cookie': format_cookie_header(waf_cookies),
+        })
+        return response.status_code == 200 and not is_waf_challenge(response)
+    except Exception:
+        return False
+
+
+async def solve_waf_in_worker(browser: SharedBrowser, request: dict) -> dict | None:
+    """在浏览器工作进程中求解 WAF（BrowserWorkerPool 的 solver），request 由 solve_waf_cookies 生成"""
+    return await get_waf_cookies_with_playwright(
+        request['account_name'], request['login_url'], request['proxy_url'], browser,
+        request['blocked_resource_types'], request['blocked_url_patterns'])
+
+
+async def solve_waf_cookies(account_name: str, login_url: str, provider_config, ctx: RunContext) -> dict | None:
+    """启动浏览器求解 WAF，并记录耗时和结果指标"""
+    start = time.perf_counter()
+    limiter = ctx.clients.limiter(provider_config.domain)
+    if ctx.browser_pool:
+        # 令牌桶在主进程中，工作进程中的页面导航无法逐个限速，改为每次求解前取得一个令牌
+        await limiter.acquire()
+        with ctx.profiler.span('waf_worker', account_name):
+            waf_cookies = await ctx.browser_pool.solve({
+                'account_name': account_name,
+                'login_url': login_url,
+                'proxy_url': ctx.proxy_url,
+                'blocked_resource_types': provider_config.blocked_resource_types,
+                'blocked_url_patterns': provider_config.blocked_url_patterns,
+            })
+    else:
+        waf_cookies = await get_waf_cookies_with_playwright(
+            account_name, login_url, ctx.proxy_url, ctx.browser,
+            provider_config.blocked_resource_types, provider_config.blocked_url_patterns, ctx.profiler, limiter)
+    ctx.metrics.observe('anyrouter_waf_solve_seconds', time.perf_counter() - start, provider=provider_config.name)
+    ctx.metrics.inc('anyrouter_waf_solve_total', provider=provider_config.name,
+                    result='success' if waf_cookies else 'failure')
+    return waf_cookies
+
+
+async def get_waf_cookies(account_name: str, provider_config, ctx: RunContext,
+                          rejected: dict | None = None) -> dict | None:
+    """获取 WAF cookies，优先使用缓存，缓存未命中或被拒绝时才启动浏览器
+
+    rejected 为请求时被 WAF 拦截的 cookies：缓存中仍是这组 cookies 时将其移除并重新求解，
+    已被其他账号替换为新的 cookies 时直接复用，同一服务商的多个账号同时被拦截也只求解一次
+    """
+    login_url = f'{provider_config.domain}{provider_config.login_path}'
+    proxy_url, waf_cache = ctx.proxy_url, ctx.waf_cache
+    if waf_cache is None or not waf_cache.enabled:
+        return await solve_waf_cookies(account_name, login_url, provider_config, ctx)
+
+    cache_key = waf_cache.make_key(provider_config.domain, proxy_url)
+    # 同一服务商 + 代理只让一个账号求解 WAF，其余账号等待后直接复用
+    async with waf_cache.lock(cache_key):
+        entry = waf_cache.get(cache_key)
+        if entry and rejected and entry.cookies.items() <= rejected.items():
+            ctx.metrics.inc('anyrouter_waf_cache_lookups_total', provider=provider_config.name, result='rejected')
+            print(f'ℹ️ [信息] {account_name}: 缓存的 WAF cookies 被拒绝，重新获取')
+            waf_cache.invalidate(cache_key)
+        elif entry:
+            client = ctx.clients.get(provider_config.domain, proxy_url)
+            if entry.validated or await ctx.profiler.timed(
+                    'waf_probe', probe_waf_cookies(client, login_url, entry.cookies), account_name):
+                entry.validated = True
+                ctx.metrics.inc('anyrouter_waf_cache_lookups_total', provider=provider_config.name, result='hit')
+                print(f'♻️ [缓存] {account_name}: 复用缓存的 WAF cookies')
+                return dict(entry.cookies)
+            ctx.metrics.inc('anyrouter_waf_cache_lookups_total', provider=provider_config.name, result='stale')
+            print(f'ℹ️ [信息] {account_name}: 缓存的 WAF cookies 已失效，重新获取')
+            waf_cache.invalidate(cache_key)
+        else:
+            ctx.metrics.inc('anyrouter_waf_cache_lookups_total', provider=provider_config.name, result='miss')
+
+        waf_cookies = await solve_waf_cookies(account_name, login_url, provider_config, ctx)
+        if waf_cookies:
+            waf_cache.set(cache_key, waf_cookies)
+        return waf_cookies
+
+
+async def prepare_cookies(account_name: str, provider_config, user_cookies: dict, ctx: RunContext,
+                          rejected: dict | None = None) -> dict | None:
+    """准备请求所需的 cookies（可能包含 WAF cookies），rejected 见 get_waf_cookies"""
     waf_cookies = {}
 
     if provider_config.needs_waf_cookies():
-        login_url = f'{provider_config.domain}{provider_config.login_path}'
-        waf_cookies = await get_waf_cookies_with_playwright(account_name, login_url, proxy_url)
+        waf_cookies = await get_waf_cookies(account_name, provider_config, ctx, rejected)
         if not waf_cookies:
             print(f'❌ [失败] {account_name}: 无法获取 WAF cookies')
             return None
@@ -243,7 +542,7 @@ async def prepare_cookies(account_name: str, provider_config, user_cookies: dict
     return {**waf_cookies, **user_cookies}
 
 
-def execute_check_in(client, account_name: str, provider_config, headers: dict):
+async def execute_check_in(client: httpx.AsyncClient, account_name: str, provider_config, headers: dict):
     """执行签到请求"""
     print(f'🌐 [网络] {account_name}: 正在执行签到')
 
@@ -252,7 +551,9 @@ def execute_check_in(client, account_name: str, provider_config, headers: dict):
         {'Content-Type': 'application/json', 'X-Requested-With': 'XMLHttpRequest'})
 
     sign_in_url = f'{provider_config.domain}{provider_config.sign_in_path}'
-    response = client.post(sign_in_url, headers=checkin_headers, timeout=30)
+    # 重复签到只会返回"已签到"，因此可以安全重试
+    response = await client.post(sign_in_url, headers=checkin_headers, timeout=30, extensions={'idempotent': True})
+    raise_for_waf_challenge(response)
 
     print(f'📡 [响应] {account_name}: 响应状态码 {response.status_code}')
 
@@ -279,14 +580,15 @@ def execute_check_in(client, account_name: str, provider_config, headers: dict):
         return False
 
 
-def get_checkin_status(client, account_name: str, provider_config, headers: dict):
+async def get_checkin_status(client: httpx.AsyncClient, account_name: str, provider_config, headers: dict):
     """获取签到状态"""
     try:
         if not provider_config.checkin_status_path:
             return {'success': False, 'checked': None}
 
         checkin_status_url = f'{provider_config.domain}{provider_config.checkin_status_path}'
-        response = client.get(checkin_status_url, headers=headers, timeout=30)
+        response = await client.get(checkin_status_url, headers=headers, timeout=30)
+        raise_for_waf_challenge(response)
 
         if response.status_code == 200:
             data = response.json()
@@ -294,12 +596,14 @@ def get_checkin_status(client, account_name: str, provider_config, headers: dict
                 checked = data.get('data', {}).get('checked', False)
                 return {'success': True, 'checked': checked}
         return {'success': False, 'checked': None}
+    except WafChallengeError:
+        raise
     except Exception as e:
         print(f'⚠️ [警告] {account_name}: 获取签到状态失败 - {str(e)[:50]}...')
         return {'success': False, 'checked': None}
 
 
-def execute_auto_checkin(client, account_name: str, provider_config, headers: dict):
+async def execute_auto_checkin(client: httpx.AsyncClient, account_name: str, provider_config, headers: dict):
     """执行自动签到（新接口）
 
     返回: (success: bool, already_checked: bool)
@@ -313,7 +617,9 @@ def execute_auto_checkin(client, account_name: str, provider_config, headers: di
         {'Content-Type': 'application/json', 'X-Requested-With': 'XMLHttpRequest'})
 
     checkin_url = f'{provider_config.domain}{provider_config.checkin_path}'
-    response = client.post(checkin_url, headers=checkin_headers, timeout=30)
+    # 重复签到只会返回"已签到"，因此可以安全重试
+    response = await client.post(checkin_url, headers=checkin_headers, timeout=30, extensions={'idempotent': True})
+    raise_for_waf_challenge(response)
 
     print(f'📡 [响应] {account_name}: 响应状态码 {response.status_code}')
 
@@ -345,14 +651,138 @@ def execute_auto_checkin(client, account_name: str, provider_config, headers: di
         return (False, False)
 
 
-async def check_in_account(account: AccountConfig, account_index: int, app_config: AppConfig, proxy_url: str = None):
-    """为单个账号执行签到操作
+def build_headers(provider_config, account: AccountConfig, cookies: dict) -> dict:
+    """构造账号请求头（包含 cookies 和 api_user）"""
+    return {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/138.0.0.0 Safari/537.36',
+        'Accept': 'application/json, text/plain, */*',
+        'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+        'Accept-Encoding': 'gzip, deflate, br, zstd',
+        'Referer': provider_config.domain,
+        'Origin': provider_config.domain,
+        'Connection': 'keep-alive',
+        'Sec-Fetch-Dest': 'empty',
+        'Sec-Fetch-Mode': 'cors',
+        'Sec-Fetch-Site': 'same-origin',
+        'Cookie': format_cookie_header(cookies),
+        provider_config.api_user_key: account.api_user,
+    }
+
+
+async def retry_on_waf_challenge(account_name: str, provider_config, user_cookies: dict, cookies: dict,
+                                 ctx: RunContext, request):
+    """以 cookies 执行 request(cookies)；被 WAF 拦截时从缓存中移除这组 WAF cookies，重新求解后重试一次"""
+    try:
+        return await request(cookies)
+    except WafChallengeError:
+        if not provider_config.needs_waf_cookies():
+            raise
+    print(f'⚠️ [警告] {account_name}: 请求被 WAF 拦截，重新获取 WAF cookies 后重试')
+    with ctx.profiler.span('prepare_cookies', account_name):
+        cookies = await prepare_cookies(account_name, provider_config, user_cookies, ctx, rejected=cookies)
+    if not cookies:
+        raise WafChallengeError('无法重新获取 WAF cookies')
+    return await request(cookies)
+
+
+async def refresh_balance_only(account_name: str, account: AccountConfig, provider_config, user_cookies: dict,
+                               ctx: RunContext) -> dict | None:
+    """今日已签到的账号只刷新余额：不启动浏览器，需要 WAF 时仅使用缓存中的 cookies
+
+    缓存的 cookies 被 WAF 拒绝时将其移除并返回 None（余额历史保留上一次的记录），不为刷新余额重新求解
+    """
+    waf_cookies = {}
+    cache_key = None
+    if provider_config.needs_waf_cookies():
+        entry = None
+        if ctx.waf_cache:
+            cache_key = ctx.waf_cache.make_key(provider_config.domain, ctx.proxy_url)
+            entry = ctx.waf_cache.get(cache_key)
+        if not entry:
+            print(f'ℹ️ [信息] {account_name}: 无可用的 WAF cookies 缓存，跳过余额刷新')
+            return None
+        waf_cookies = entry.cookies
+
+    client = ctx.clients.get(provider_config.domain, ctx.proxy_url)
+    headers = build_headers(provider_config, account, {**waf_cookies, **user_cookies})
+    user_info_url = f'{provider_config.domain}{provider_config.user_info_path}'
+    try:
+        user_info = await get_user_info(client, headers, user_info_url)
+    except WafChallengeError:
+        print(f'ℹ️ [信息] {account_name}: 缓存的 WAF cookies 已被拒绝，跳过余额刷新')
+        entry = ctx.waf_cache.get(cache_key) if cache_key else None
+        # 其他账号可能已经换上了新的 cookies，只移除被拒绝的这一组
+        if entry and entry.cookies.items() <= waf_cookies.items():
+            ctx.waf_cache.invalidate(cache_key)
+        return None
+    if user_info.get('success'):
+        print(user_info['display'])
+    else:
+        print(user_info.get('error', '未知错误'))
+    return user_info
+
+
+async def refresh_user_info_after_checkin(client: httpx.AsyncClient, headers: dict, user_info_url: str,
+                                          user_info: dict | None) -> dict | None:
+    """签到成功后重新获取余额，失败（包括被 WAF 拦截）时保留签到前的用户信息"""
+    try:
+        refreshed = await get_user_info(client, headers, user_info_url)
+    except WafChallengeError:
+        return user_info
+    if refreshed.get('success'):
+        print(f'🔄 [刷新] {refreshed["display"]}')
+        return refreshed
+    return user_info
+
+
+def record_checkin(ctx: RunContext, account: AccountConfig, checkin_date: str):
+    """记录账号今日已完成签到"""
+    if ctx.checkin_state:
+        ctx.checkin_state.mark(account.api_user, account.provider, checkin_date)
+
+
+@dataclass(slots=True)
+class PreparedCheckin:
+    """cookie 阶段的产出：cookies 已就绪、只差 HTTP 请求的账号"""
+
+    account: AccountConfig
+    account_name: str
+    provider_config: ProviderConfig
+    checkin_date: str
+    cookies: dict
+    # 本地记录显示今日已签到，只需刷新余额
+    already_checked: bool = False
+
+
+async def check_in_account(account: AccountConfig, account_index: int, app_config: AppConfig, ctx: RunContext = None):
+    """为单个账号执行签到操作（依次执行 cookie 阶段和 HTTP 阶段）
+
+    ctx 为本次运行共享的资源，不传入时会临时创建并在结束后释放
 
     返回: (success: bool, user_info: dict, already_checked: bool)
         - success: 签到是否成功
         - user_info: 用户信息
         - already_checked: 是否今日已签到
     """
+    if ctx is None:
+        ctx = RunContext.from_env(get_proxy_config())
+        try:
+            return await check_in_account(account, account_index, app_config, ctx)
+        finally:
+            await ctx.close()
+
+    prepared = await prepare_checkin(account, account_index, app_config, ctx)
+    if not isinstance(prepared, PreparedCheckin):
+        return prepared
+    return await complete_checkin(prepared, ctx)
+
+
+async def prepare_checkin(account: AccountConfig, account_index: int, app_config: AppConfig,
+                          ctx: RunContext) -> PreparedCheckin | tuple:
+    """cookie 阶段：检查配置并准备 cookies（可能需要浏览器求解 WAF）
+
+    返回 PreparedCheckin 交给 HTTP 阶段；无法继续时直接返回与 check_in_account 相同格式的结果
+    """
     account_name = account.get_display_name(account_index)
     print(f'\n🔄 [处理中] 开始处理 {account_name}')
 
@@ -364,271 +794,818 @@ async def check_in_account(account: AccountConfig, account_index: int, app_confi
     print(
         f'ℹ️ [信息] {account_name}: 使用服务商 "{account.provider}" ({provider_config.domain})')
 
-    if proxy_url:
+    if ctx.proxy_url:
         print(f'🌐 [代理] {account_name}: 使用代理进行请求')
 
+    if not ctx.clients.is_available(provider_config.domain):
+        print(f'❌ [失败] {account_name}: 服务商 "{account.provider}" 暂时不可用（已熔断），跳过')
+        return False, None, False
+
     user_cookies = parse_cookies(account.cookies)
     if not user_cookies:
         print(f'❌ [失败] {account_name}: 配置格式无效')
         return False, None, False
 
-    all_cookies = await prepare_cookies(account_name, provider_config, user_cookies, proxy_url)
+    # 本地记录显示今日（按服务商时区）已签到时，跳过浏览器和签到请求
+    checkin_date = provider_config.current_checkin_date()
+    if ctx.checkin_state and ctx.checkin_state.is_checked_in(account.api_user, account.provider, checkin_date):
+        print(f'ℹ️ [信息] {account_name}: 本地记录显示今日已签到，跳过签到')
+        return PreparedCheckin(account, account_name, provider_config, checkin_date, user_cookies, already_checked=True)
+
+    with ctx.profiler.span('prepare_cookies', account_name):
+        all_cookies = await prepare_cookies(account_name, provider_config, user_cookies, ctx)
     if not all_cookies:
         return False, None, False
+    return PreparedCheckin(account, account_name, provider_config, checkin_date, all_cookies)
 
-    # 创建 httpx 客户端，配置代理
-    if proxy_url:
-        # httpx 0.28+ 使用 proxy 参数（字符串），而不是 proxies（字典）
-        client = httpx.Client(http2=True, timeout=30.0, proxy=proxy_url)
-    else:
-        client = httpx.Client(http2=True, timeout=30.0)
 
-    try:
-        client.cookies.update(all_cookies)
+async def complete_checkin(prepared: PreparedCheckin, ctx: RunContext):
+    """HTTP 阶段：查询用户信息和签到状态并执行签到，返回格式与 check_in_account 相同
 
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/138.0.0.0 Safari/537.36',
-            'Accept': 'application/json, text/plain, */*',
-            'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-            'Accept-Encoding': 'gzip, deflate, br, zstd',
-            'Referer': provider_config.domain,
-            'Origin': provider_config.domain,
-            'Connection': 'keep-alive',
-            'Sec-Fetch-Dest': 'empty',
-            'Sec-Fetch-Mode': 'cors',
-            'Sec-Fetch-Site': 'same-origin',
-            provider_config.api_user_key: account.api_user,
-        }
-
-        user_info_url = f'{provider_config.domain}{provider_config.user_info_path}'
-        user_info = get_user_info(client, headers, user_info_url)
-        if user_info and user_info.get('success'):
-            print(user_info['display'])
-        elif user_info:
-            print(user_info.get('error', '未知错误'))
-
-        # 优先尝试新的自动签到接口
-        success = False
-        already_checked = False
-        if provider_config.checkin_path:
-            # 先查询签到状态（如果支持）
-            if provider_config.checkin_status_path:
-                checkin_status = get_checkin_status(
-                    client, account_name, provider_config, headers)
-                if checkin_status.get('success') and checkin_status.get('checked'):
-                    print(f'ℹ️ [信息] {account_name}: 今日已签到，无需重复签到')
-                    return True, user_info, True
-
-            # 执行自动签到
-            success, already_checked = execute_auto_checkin(
-                client, account_name, provider_config, headers)
+    请求被 WAF 拦截时重新获取 WAF cookies 并重试一次（签到请求可以安全重复）
+    """
+    account, account_name, provider_config = prepared.account, prepared.account_name, prepared.provider_config
+    if prepared.already_checked:
+        user_info = None
+        if ctx.refresh_checked_balance:
+            with ctx.profiler.span('balance_only', account_name):
+                user_info = await refresh_balance_only(account_name, account, provider_config, prepared.cookies, ctx)
+        return True, user_info, True
 
-            # 如果新接口成功（包括"已签到"的情况），直接返回
-            if success:
-                return success, user_info, already_checked
+    try:
+        return await retry_on_waf_challenge(
+            account_name, provider_config, parse_cookies(account.cookies), prepared.cookies, ctx,
+            lambda cookies: request_checkin(prepared, cookies, ctx))
+    except Exception as e:
+        print(f'❌ [失败] {account_name}: 签到过程中发生错误 - {str(e)[:50]}...')
+        return False, None, False
 
-            # 如果新接口真正失败（非"已签到"），尝试降级到旧接口
-            print(f'ℹ️ [信息] {account_name}: 新签到接口失败，尝试使用旧接口...')
 
-        # 尝试老的签到接口
-        if provider_config.needs_manual_check_in():
-            success = execute_check_in(
+async def request_checkin(prepared: PreparedCheckin, all_cookies: dict, ctx: RunContext):
+    """使用 all_cookies 查询用户信息和签到状态并执行签到"""
+    account, account_name, provider_config = prepared.account, prepared.account_name, prepared.provider_config
+    checkin_date = prepared.checkin_date
+    # 同一服务商（+ 代理）的账号共用一个客户端，cookies 和 api_user 通过请求头按账号携带
+    client = ctx.clients.get(provider_config.domain, ctx.proxy_url)
+
+    headers = build_headers(provider_config, account, all_cookies)
+
+    user_info_url = f'{provider_config.domain}{provider_config.user_info_path}'
+    checkin_status = None
+    if provider_config.checkin_path and provider_config.checkin_status_path:
+        # 用户信息和签到状态互不依赖，同时请求
+        user_info, checkin_status = await asyncio.gather(
+            ctx.profiler.timed('user_info', get_user_info(client, headers, user_info_url), account_name),
+            ctx.profiler.timed(
+                'checkin_status', get_checkin_status(client, account_name, provider_config, headers), account_name),
+        )
+    else:
+        with ctx.profiler.span('user_info', account_name):
+            user_info = await get_user_info(client, headers, user_info_url)
+    if user_info and user_info.get('success'):
+        print(user_info['display'])
+    elif user_info:
+        print(user_info.get('error', '未知错误'))
+
+    # 优先尝试新的自动签到接口
+    success = False
+    already_checked = False
+    if provider_config.checkin_path:
+        # 根据签到状态判断是否需要签到（如果支持）
+        if checkin_status:
+            if checkin_status.get('success') and checkin_status.get('checked'):
+                print(f'ℹ️ [信息] {account_name}: 今日已签到，无需重复签到')
+                record_checkin(ctx, account, checkin_date)
+                return True, user_info, True
+
+        # 执行自动签到
+        with ctx.profiler.span('checkin', account_name):
+            success, already_checked = await execute_auto_checkin(
                 client, account_name, provider_config, headers)
-            return success, user_info, False
-        elif provider_config.sign_in_path:
-            # 如果有旧的签到接口，尝试使用
-            success = execute_check_in(
+
+        # 如果新接口成功（包括"已签到"的情况），直接返回
+        if success:
+            record_checkin(ctx, account, checkin_date)
+            if not already_checked and ctx.refresh_after_checkin:
+                with ctx.profiler.span('refresh_balance', account_name):
+                    user_info = await refresh_user_info_after_checkin(client, headers, user_info_url, user_info)
+            return success, user_info, already_checked
+
+        # 如果新接口真正失败（非"已签到"），尝试降级到旧接口
+        print(f'ℹ️ [信息] {account_name}: 新签到接口失败，尝试使用旧接口...')
+
+    # 尝试老的签到接口
+    if provider_config.needs_manual_check_in() or provider_config.sign_in_path:
+        # 需要手动签到，或有旧的签到接口时尝试使用
+        with ctx.profiler.span('checkin_legacy', account_name):
+            success = await execute_check_in(
                 client, account_name, provider_config, headers)
-            return success, user_info, False
+        if success:
+            record_checkin(ctx, account, checkin_date)
+            if ctx.refresh_after_checkin:
+                with ctx.profiler.span('refresh_balance', account_name):
+                    user_info = await refresh_user_info_after_checkin(client, headers, user_info_url, user_info)
+        return success, user_info, False
+    else:
+        # 没有任何签到接口可用，返回失败
+        print(f'❌ [失败] {account_name}: 所有签到接口均失败')
+        return False, user_info, False
+
+
+async def check_provider_health(providers: list, ctx: RunContext):
+    """并发检查各服务商域名是否可访问，并预热连接池
+
+    检查请求与普通请求一样经过熔断器：连接失败和 5xx 响应计入该域名的失败统计，
+    偶发的一次失败不会直接熔断；检查超时只说明服务商响应慢，不计入失败统计
+    """
+    timeout = get_health_check_timeout()
+
+    async def check(provider_config) -> tuple[str, str | None, bool, float]:
+        client = ctx.clients.get(provider_config.domain, ctx.proxy_url)
+        start = time.perf_counter()
+        error, timed_out = None, False
+        try:
+            response = await client.get(f'{provider_config.domain}/', timeout=timeout,
+                                        extensions={'retries': 0, 'timeout_is_failure': False})
+            error = f'HTTP {response.status_code}' if response.status_code >= 500 else None
+        except httpx.TimeoutException:
+            timed_out = True
+        except Exception as e:
+            error = (str(e) or type(e).__name__).splitlines()[0][:80]
+        return provider_config.domain, error, timed_out, time.perf_counter() - start
+
+    results = await asyncio.gather(*(check(provider_config) for provider_config in providers))
+    for domain, error, timed_out, elapsed in results:
+        if error:
+            print(f'⚠️ [健康检查] {domain} 请求失败（{error}），已计入熔断统计')
+        elif timed_out:
+            print(f'🐢 [健康检查] {domain} 在 {timeout:g}s 内未响应，继续处理该服务商的账号')
         else:
-            # 没有任何签到接口可用，返回失败
-            print(f'❌ [失败] {account_name}: 所有签到接口均失败')
-            return False, user_info, False
+            print(f'🩺 [健康检查] {domain} 可访问，耗时 {elapsed:.2f}s')
 
-    except Exception as e:
-        print(f'❌ [失败] {account_name}: 签到过程中发生错误 - {str(e)[:50]}...')
-        return False, None, False
-    finally:
-        client.close()
 
+def get_notification_kit():
+    """按需导入通知模块，只有需要推送或补发通知时才加载，并使用最新的环境变量创建"""
+    from utils.notify import NotificationKit
 
-async def main():
-    """主函数"""
-    print('🚀 [系统] AnyRouter.top 多账号自动签到脚本已启动 (使用 Playwright)')
-    print(f'⏰ [时间] 执行时间: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}')
+    return NotificationKit()
 
-    # 获取代理配置
-    proxy_url = get_proxy_config()
+
+async def verify_proxy(proxy_url: str | None):
+    """打印代理配置并验证代理出口 IP"""
     if proxy_url:
         print(f'🌐 [代理] 检测到代理配置，将使用代理进行请求')
         # 验证代理 IP（可选）
         try:
-            test_client = httpx.Client(proxy=proxy_url, timeout=10.0)
-            response = test_client.get('https://api.ipify.org?format=json')
-            proxy_ip = response.json().get('ip', '未知')
+            async with httpx.AsyncClient(proxy=proxy_url, timeout=10.0) as test_client:
+                response = await test_client.get('https://api.ipify.org?format=json')
+                proxy_ip = response.json().get('ip', '未知')
             print(f'🌐 [代理] 代理 IP: {proxy_ip}')
-            test_client.close()
         except Exception as e:
             print(f'⚠️ [警告] 无法验证代理 IP: {str(e)[:50]}...')
     else:
         print(f'ℹ️ [信息] 未配置代理，将直接连接')
 
-    app_config = AppConfig.load_from_env()
-    print(f'ℹ️ [信息] 已加载 {len(app_config.providers)} 个服务商配置')
-
-    accounts = load_accounts_config()
-    if not accounts:
-        print('❌ [失败] 无法加载账号配置，程序退出')
-        sys.exit(1)
 
-    print(f'ℹ️ [信息] 发现 {len(accounts)} 个账号配置')
+def format_account_names(names: list[str], total: int) -> str:
+    """格式化为 【名称1】、【名称2】，未列出的账号只显示总数"""
+    formatted = '【' + '】、【'.join(names) + '】'
+    if total > len(names):
+        formatted += f'等 {total} 个账号'
+    return formatted
 
-    last_balance_hash = load_balance_hash()
 
-    success_count = 0
-    total_count = len(accounts)
-    notification_content = []
-    current_balances = {}
-    # 检查是否设置了总是通知的环境变量（默认为 false，只在余额变化或失败时通知）
-    always_notify_env = os.getenv('ALWAYS_NOTIFY', 'false').lower()
-    always_notify = always_notify_env in ['true', '1', 'yes']
-    need_notify = always_notify  # 如果设置了总是通知，则默认需要通知
-    balance_changed = False  # 余额是否有变化
+def account_result_record(index: int, account: AccountConfig, result) -> dict:
+    """把单个账号的签到结果整理为可序列化的记录，分片模式下写入结果文件，合并时按同样的方式汇总"""
+    record = {'index': index, 'name': account.get_display_name(index), 'provider': account.provider,
+              'api_user': account.api_user}
+    try:
+        if isinstance(result, BaseException):
+            raise result
+        success, user_info, already_checked = result
+        record.update(success=success, already_checked=already_checked)
+        if user_info and user_info.get('success'):
+            record.update(quota=user_info['quota'], used=user_info['used_quota'], display=user_info['display'])
+        elif user_info:
+            record['error'] = user_info.get('error', '未知错误')
+    except Exception as e:
+        record['exception'] = str(e)
+    return record
 
-    # 记录成功和失败的账号名称
-    success_accounts = []
-    already_checked_accounts = []  # 今日已签到的账号
-    failed_accounts = []
 
-    for i, account in enumerate(accounts):
-        account_key = f'account_{i + 1}'
-        account_name = account.get_display_name(i)
-        try:
-            success, user_info, already_checked = await check_in_account(account, i, app_config, proxy_url)
-            if success:
-                success_count += 1
-                if already_checked:
-                    already_checked_accounts.append(account_name)
-                else:
-                    success_accounts.append(account_name)
-            else:
-                failed_accounts.append(account_name)
+def record_account_metrics(metrics: MetricsRegistry, record: dict):
+    if 'exception' in record:
+        outcome = 'error'
+    elif record['success']:
+        outcome = 'already_checked' if record['already_checked'] else 'success'
+    else:
+        outcome = 'failure'
+    metrics.inc('anyrouter_checkin_total', provider=record['provider'], result=outcome)
+    if 'quota' in record:
+        metrics.set('anyrouter_account_quota', record['quota'], account=record['api_user'], provider=record['provider'])
+        metrics.set('anyrouter_account_used_quota', record['used'],
+                    account=record['api_user'], provider=record['provider'])
 
-            should_notify_this_account = False
 
-            if not success:
-                should_notify_this_account = True
-                need_notify = True
-                print(f'🔔 [通知] {account_name} 失败，将发送通知')
+class RunReport:
+    """汇总一次运行中各账号的结果，检查余额变化并生成通知内容
 
-            if user_info and user_info.get('success'):
-                current_quota = user_info['quota']
-                current_used = user_info['used_quota']
-                current_balances[account_key] = {
-                    'quota': current_quota, 'used': current_used}
-
-            if should_notify_this_account:
-                status = '✅ [成功]' if success else '❌ [失败]'
-                account_result = f'{status} {account_name}'
-                if user_info and user_info.get('success'):
-                    account_result += f'\n{user_info["display"]}'
-                elif user_info:
-                    account_result += f'\n{user_info.get("error", "未知错误")}'
-                notification_content.append(account_result)
+    账号结果按配置顺序逐个加入，签到结果只保留通知中展示的部分；余额先暂存，
+    结束时用一次查询取回所有账号的历史记录进行比较，并在一个事务中写入。
+    balance_store 为空时（分片模式）只统计签到结果，余额检查和通知由合并步骤完成。
+    """
 
-        except Exception as e:
-            failed_accounts.append(account_name)
-            print(f'❌ [失败] {account_name} 处理异常: {e}')
-            need_notify = True  # 异常也需要通知
-            notification_content.append(
-                f'❌ [失败] {account_name} 异常: {str(e)[:50]}...')
-
-    # 检查余额变化
-    current_balance_hash = generate_balance_hash(
-        current_balances) if current_balances else None
-    if current_balance_hash:
-        if last_balance_hash is None:
-            # 首次运行
-            balance_changed = True
-            need_notify = True
-            print('🔔 [通知] 检测到首次运行，将发送包含当前余额的通知')
-        elif current_balance_hash != last_balance_hash:
-            # 余额有变化
-            balance_changed = True
-            need_notify = True
-            print('🔔 [通知] 检测到余额变化，将发送通知')
+    def __init__(self, balance_store: BalanceStore | None, always_notify: bool = False, max_lines: int = 50):
+        self.balance_store = balance_store
+        self.always_notify = always_notify
+        self.max_lines = max_lines
+        self.need_notify = always_notify  # 如果设置了总是通知，则默认需要通知
+        self.balance_changed = False  # 余额是否有变化
+        self.total_count = 0
+        self.success_count = 0
+        self.notification_content = []
+        self.omitted_failures = 0
+        # 记录成功和失败的账号名称（只保留通知中展示的部分，其余只计数）
+        self.success_accounts = []
+        self.already_checked_accounts = []  # 今日已签到的账号
+        self.failed_accounts = []
+        self.success_total = self.already_checked_total = self.failed_total = 0
+        # 余额变化统计：每个账号与自己最近一次的历史记录比较，只保留通知中展示的余额行
+        self.balance_ts = time.time()
+        self.pending_balances = []  # (account, provider, quota, used, name, listed)
+        self.balance_lines = []
+        self.balance_count = 0
+        self.has_history = False
+        self.changed_count = 0
+        self.omitted_changed = 0
+        self.unchanged_count = 0
+        self.unchanged_quota = 0
+
+    @staticmethod
+    def _add_name(names: list, name: str):
+        if len(names) < NOTIFY_MAX_SUMMARY_NAMES:
+            names.append(name)
+
+    def _add_failure(self, content: str):
+        self.failed_total += 1
+        self.need_notify = True
+        if len(self.notification_content) < NOTIFY_MAX_SUMMARY_NAMES:
+            self.notification_content.append(content)
         else:
-            print('ℹ️ [信息] 未检测到余额变化')
-
-    # 为有余额变化的情况添加所有成功账号到通知内容
-    # 或者如果设置了总是通知，也添加所有账号余额
-    if balance_changed or always_notify:
-        for i, account in enumerate(accounts):
-            account_key = f'account_{i + 1}'
-            if account_key in current_balances:
-                account_name = account.get_display_name(i)
-                # 只添加成功获取余额的账号，且避免重复添加
-                account_result = f'💰 [余额] {account_name}'
-                account_result += f'\n💰 已使用: ${current_balances[account_key]["used"]}, 当前余额: 💵${current_balances[account_key]["quota"]}'
-                # 检查是否已经在通知内容中（避免重复）
-                if not any(account_name in item for item in notification_content):
-                    notification_content.append(account_result)
-
-    # 保存当前余额hash
-    if current_balance_hash:
-        save_balance_hash(current_balance_hash)
-
-    if need_notify and notification_content:
+            self.omitted_failures += 1
+
+    def add(self, record: dict):
+        """加入一个账号的结果记录（见 account_result_record）"""
+        self.total_count += 1
+        account_name = record['name']
+        if 'exception' in record:
+            self._add_name(self.failed_accounts, account_name)
+            print(f'❌ [失败] {account_name} 处理异常: {record["exception"]}')
+            self._add_failure(f'❌ [失败] {account_name} 异常: {record["exception"][:50]}...')
+            return
+
+        success = record['success']
+        if success:
+            self.success_count += 1
+            if record['already_checked']:
+                self.already_checked_total += 1
+                self._add_name(self.already_checked_accounts, account_name)
+            else:
+                self.success_total += 1
+                self._add_name(self.success_accounts, account_name)
+        else:
+            self._add_name(self.failed_accounts, account_name)
+            if self.balance_store:
+                print(f'🔔 [通知] {account_name} 失败，将发送通知')
+            account_result = f'❌ [失败] {account_name}'
+            if 'display' in record:
+                account_result += f'\n{record["display"]}'
+            elif 'error' in record:
+                account_result += f'\n{record["error"]}'
+            self._add_failure(account_result)
+
+        if 'quota' in record and self.balance_store:
+            self._add_balance(record, listed=not success)
+
+    def _add_balance(self, record: dict, listed: bool):
+        self.pending_balances.append(
+            (record['api_user'], record['provider'], record['quota'], record['used'], record['name'], listed))
+
+    def _check_balances(self):
+        # 与历史记录比较只在结束时进行一次，必须在写入本次余额之前
+        if not self.pending_balances:
+            return
+        last_balances = self.balance_store.latest(
+            (account, provider) for account, provider, *_ in self.pending_balances)
+        self.has_history = bool(last_balances)
+        for account, provider, current_quota, current_used, name, listed in self.pending_balances:
+            # quota 或 used 任一变化即视为该账号余额变化
+            self.balance_count += 1
+            changed = last_balances.get((account, provider)) != (current_quota, current_used)
+            if changed:
+                self.changed_count += 1
+            else:
+                self.unchanged_count += 1
+                self.unchanged_quota += current_quota
+            # 只展示余额有变化的账号（总是通知模式下也展示未变化的账号），已在失败信息中展示的账号不重复展示
+            if not listed and (self.always_notify or changed):
+                if len(self.balance_lines) < self.max_lines:
+                    self.balance_lines.append(
+                        f'💰 [余额] {name}\n💰 已使用: ${current_used}, 当前余额: 💵${current_quota}')
+                elif changed:
+                    self.omitted_changed += 1
+        self.balance_store.append(
+            ((account, provider, quota, used) for account, provider, quota, used, *_ in self.pending_balances),
+            ts=self.balance_ts)
+        self.pending_balances.clear()
+
+    def add_note(self, content: str):
+        """加入一条需要通知的说明（如缺少的分片）"""
+        self.need_notify = True
+        self.notification_content.append(content)
+
+    def close(self):
+        """检查余额变化并保存本次的余额记录"""
+        if self.balance_store:
+            self._check_balances()
+            self.balance_store.close()
+
+    def build_notification(self) -> str | None:
+        """完成余额变化检查并生成通知内容，不需要通知时返回 None"""
+        if self.balance_store:
+            self._check_balances()
+        if self.omitted_failures:
+            self.notification_content.append(f'❌ [失败] 另有 {self.omitted_failures} 个账号失败，未逐一列出')
+
+        if self.balance_count:
+            if not self.has_history:
+                # 首次运行
+                self.balance_changed = True
+                self.need_notify = True
+                print('🔔 [通知] 检测到首次运行，将发送包含当前余额的通知')
+            elif self.changed_count:
+                # 余额有变化
+                self.balance_changed = True
+                self.need_notify = True
+                print(f'🔔 [通知] 检测到 {self.changed_count} 个账号余额变化，将发送通知')
+            else:
+                print('ℹ️ [信息] 未检测到余额变化')
+
+        # 超出上限及未展示的账号合并为摘要，保证通知长度可控
+        if self.balance_changed or self.always_notify:
+            self.notification_content.extend(self.balance_lines)
+            if self.omitted_changed:
+                self.notification_content.append(f'💰 [余额] 另有 {self.omitted_changed} 个账号余额有变化，未逐一列出')
+            if self.unchanged_count:
+                self.notification_content.append(
+                    f'💰 [余额] {self.unchanged_count} 个账号余额无变化，合计余额: 💵${round(self.unchanged_quota, 2)}')
+
+        if not (self.need_notify and self.notification_content):
+            return None
+
         # 构建通知内容
         summary = ['📊 [统计] 签到结果统计:']
 
         # 显示新签到、已签到和失败的账号
-        if success_accounts:
-            success_names_formatted = '】、【'.join(success_accounts)
-            summary.append(f'✅ [新签到] 【{success_names_formatted}】签到成功！')
+        if self.success_total:
+            summary.append(f'✅ [新签到] {format_account_names(self.success_accounts, self.success_total)}签到成功！')
 
-        if already_checked_accounts:
-            already_names_formatted = '】、【'.join(already_checked_accounts)
-            summary.append(f'ℹ️ [已签到] 【{already_names_formatted}】今日已签到')
+        if self.already_checked_total:
+            names = format_account_names(self.already_checked_accounts, self.already_checked_total)
+            summary.append(f'ℹ️ [已签到] {names}今日已签到')
 
-        if failed_accounts:
-            failed_names_formatted = '】、【'.join(failed_accounts)
-            summary.append(f'❌ [失败] 【{failed_names_formatted}】签到失败！')
+        if self.failed_total:
+            summary.append(f'❌ [失败] {format_account_names(self.failed_accounts, self.failed_total)}签到失败！')
 
         # 总结
-        if success_count == total_count:
-            if already_checked_accounts and not success_accounts:
+        if self.success_count == self.total_count:
+            if self.already_checked_total and not self.success_total:
                 summary.append('ℹ️ [提示] 所有账号今日已签到！')
             else:
                 summary.append('🎉 [成功] 所有账号签到成功！')
-        elif success_count > 0:
+        elif self.success_count > 0:
             summary.append('⚠️ [警告] 部分账号签到成功！')
         else:
             summary.append('❌ [错误] 所有账号签到失败！')
 
         time_info = f'⏰ [时间] {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}'
 
-        notify_content = '\n\n'.join(
-            [time_info, '\n'.join(notification_content), '\n'.join(summary)])
+        return '\n\n'.join([time_info, '\n'.join(self.notification_content), '\n'.join(summary)])
+
+
+def get_always_notify() -> bool:
+    """是否总是发送通知（默认为 false，只在余额变化或失败时通知）"""
+    return os.getenv('ALWAYS_NOTIFY', 'false').lower() in ['true', '1', 'yes']
+
 
+async def deliver_report(report: RunReport, profiler: RunProfiler, metrics: MetricsRegistry,
+                         outbox: NotificationOutbox | None, outbox_task: asyncio.Task | None):
+    """发送运行结果通知，推送失败的渠道写入发件箱"""
+    notify_content = report.build_notification()
+    notify_title = '🔔 AnyRouter 签到提醒'
+    push_results = None
+    if notify_content:
         print(notify_content)
-        notify.push_message('🔔 AnyRouter 签到提醒',
-                            notify_content, msg_type='text')
-        if always_notify:
+        with profiler.span('notify'):
+            push_results = await get_notification_kit().apush_message(notify_title, notify_content, msg_type='text')
+        for push_result in push_results:
+            profiler.record(f'notify.{push_result["channel"]}', push_result['elapsed'])
+            metrics.observe('anyrouter_notify_seconds', push_result['elapsed'], channel=push_result['channel'])
+            metrics.inc('anyrouter_notify_total', channel=push_result['channel'],
+                        result='success' if push_result['success'] else 'failure')
+        if report.always_notify:
             print('🔔 [通知] 已发送通知（总是通知模式）')
         else:
             print('🔔 [通知] 由于失败或余额变化已发送通知')
     else:
         print('ℹ️ [信息] 所有账号成功且未检测到余额变化，跳过通知')
 
-    # 返回退出码
-    return 0 if success_count > 0 else 1
+    if outbox_task:
+        try:
+            await outbox_task
+        except Exception as e:
+            print(f'⚠️ [警告] 补发通知失败: {e}')
+    if outbox and push_results:
+        # 推送失败的渠道写入发件箱，下次运行时按退避策略重试
+        outbox.record_results(push_results, notify_title, notify_content, 'text')
+
+
+def write_metrics_textfile(metrics: MetricsRegistry):
+    """设置了 METRICS_TEXTFILE 时写入指标文件"""
+    metrics_textfile = os.getenv('METRICS_TEXTFILE')
+    if metrics_textfile:
+        # node_exporter 的 textfile collector 要求文件名以 .prom 结尾
+        metrics.write_textfile(metrics_textfile)
+
+
+def start_outbox_delivery() -> tuple[NotificationOutbox | None, asyncio.Task | None]:
+    """在后台补发之前失败的通知，不阻塞签到流程"""
+    outbox = NotificationOutbox.from_env()
+    if outbox and outbox.due():
+        return outbox, asyncio.create_task(outbox.deliver_pending(get_notification_kit()))
+    return outbox, None
+
+
+async def main(ctx: RunContext = None, only_unchecked: bool = False, spread: float = 0.0,
+               shard: Shard | None = None):
+    """主函数
+
+    ctx 为空时创建本次运行的共享资源并在结束时释放；
+    常驻模式会传入长期存在的 ctx，使浏览器、连接池和缓存在多次运行之间保持可用。
+    only_unchecked 为 True 时只处理本地记录中今日尚未签到的账号（用于失败重试），
+    spread 大于 0 时各账号在 0~spread 秒内随机错开开始。
+    shard 不为空时只处理属于该分片的账号，结果写入分片结果文件，不检查余额也不发送通知（由 --merge-shards 完成）。
+    """
+    print('🚀 [系统] AnyRouter.top 多账号自动签到脚本已启动 (使用 Playwright)')
+    run_start = time.perf_counter()
+    print(f'⏰ [时间] 执行时间: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}')
+
+    owns_ctx = ctx is None
+    if owns_ctx:
+        # 获取代理配置
+        proxy_url = get_proxy_config()
+        await verify_proxy(proxy_url)
+
+    app_config = AppConfig.load_from_env()
+    print(f'ℹ️ [信息] 已加载 {len(app_config.providers)} 个服务商配置')
+
+    source = AccountSource.from_env()
+    if not source:
+        print('❌ [失败] 无法加载账号配置，程序退出')
+        return 1
+
+    print(f'ℹ️ [信息] 账号来源: {source.describe()}')
+
+    # 账号按配置顺序逐个读取（保留序号用于生成显示名称），不在内存中保存完整列表
+    indexed_accounts = iter(source)
+    if shard:
+        indexed_accounts = (item for item in indexed_accounts if shard.owns(item[1].provider, item[1].api_user))
+        print(f'ℹ️ [信息] 分片 {shard}：只处理按 (provider, api_user) 哈希分配到本分片的账号')
+    if only_unchecked and ctx and ctx.checkin_state:
+        def is_unchecked(item: tuple[int, AccountConfig]) -> bool:
+            provider_config = app_config.get_provider(item[1].provider)
+            return not (provider_config and ctx.checkin_state.is_checked_in(
+                item[1].api_user, item[1].provider, provider_config.current_checkin_date()))
+
+        indexed_accounts = filter(is_unchecked, indexed_accounts)
+        print('ℹ️ [信息] 仅重试今日尚未签到的账号')
+
+    first_account = next(indexed_accounts, None)
+    if first_account is None and (only_unchecked or not shard):
+        if only_unchecked and ctx:
+            ctx.last_failed_count = 0
+            return 0
+        print('❌ [失败] 没有可用的账号配置，程序退出')
+        return 1
+    # 分片没有分到账号时仍写入空的结果文件，合并时不会被当作缺少的分片
+    indexed_accounts = itertools.chain([first_account] if first_account else [], indexed_accounts)
+
+    outbox, outbox_task = start_outbox_delivery() if not shard else (None, None)
+
+    if shard:
+        report = RunReport(None)
+        shard_writer = ShardResultWriter(shard, get_shard_results_dir())
+    else:
+        report = RunReport(BalanceStore.from_env(), get_always_notify(), get_notify_max_balance_lines())
+        shard_writer = None
+
+    # 所有账号共享浏览器（首次使用时才启动）、WAF cookies 缓存和 HTTP 连接池
+    if owns_ctx:
+        ctx = RunContext.from_env(proxy_url)
+    else:
+        # 常驻模式下每次运行单独统计耗时
+        ctx.profiler = RunProfiler.from_env()
+    profiler = ctx.profiler
+    metrics = ctx.metrics
+
+    # 签到分为两个阶段：cookie 阶段（可能需要浏览器求解 WAF）和 HTTP 阶段，中间以有界队列衔接，并发数分别配置
+    max_concurrency = get_max_concurrency()
+    browser_concurrency, queue_size = get_pipeline_sizes(
+        ctx.browser_pool.size if ctx.browser_pool else max_concurrency, max_concurrency)
+    print(f'ℹ️ [信息] 并发数上限: cookie 阶段 {browser_concurrency}，HTTP 阶段 {max_concurrency}，阶段间队列 {queue_size}')
+
+    # 账号用到的服务商，健康检查和限速按域名进行（同一域名只保留一个）
+    ctx.account_providers = [
+        provider_config for provider_config in map(app_config.get_provider, sorted(source.providers()))
+        if provider_config]
+    used_providers = {}
+    for provider_config in ctx.account_providers:
+        used_providers.setdefault(provider_config.domain, provider_config)
+
+    # spread 需要账号总数来均匀分配开始时间（文件来源只数行，不解析；分片时按平均分到的账号数估算）
+    spread_count = max(1, round(source.count() / (shard.count if shard else 1))) if spread > 0 else 0
+    loop = asyncio.get_running_loop()
+
+    async def prepare_account(item: tuple[int, tuple[int, AccountConfig]]):
+        position, (index, account) = item
+        if spread_count:
+            # 把 0~spread 秒均分给各账号，每个账号在自己的时段内随机开始，避免重置后瞬间集中请求；
+            # 开始时间随顺序递增，按顺序读取账号时不会被前面的账号长时间阻塞
+            offset = min(spread, (position + random.random()) * spread / spread_count)
+            await asyncio.sleep(max(0.0, dispatch_start + offset - loop.time()))
+        # 从这里开始计时，不包含错开的等待时间
+        start = time.perf_counter()
+        prepared = await prepare_checkin(account, index, app_config, ctx)
+        elapsed = time.perf_counter() - start
+        if not isinstance(prepared, PreparedCheckin):
+            profiler.record('account', elapsed, account.get_display_name(index))
+            return Done(prepared)
+        return prepared, elapsed, time.perf_counter()
+
+    async def complete_account(item: tuple[int, tuple[int, AccountConfig]], produced):
+        prepared, prepare_elapsed, queued_at = produced
+        start = time.perf_counter()
+        # 在队列中等待 HTTP 阶段的时间，持续偏高说明 HTTP 并发数不足
+        profiler.record('queue_wait', start - queued_at, prepared.account_name)
+        try:
+            return await complete_checkin(prepared, ctx)
+        finally:
+            profiler.record('account', prepare_elapsed + time.perf_counter() - start, prepared.account_name)
+
+    # 两阶段流水线并发执行签到：结果按账号顺序产出，保证统计和通知顺序与配置一致；账号按需读取，内存占用不随账号总数增长
+    completed = False
+    try:
+        for provider_config in used_providers.values():
+            # 按服务商配置限速，常驻模式下每次运行使用最新配置
+            ctx.clients.limiter(provider_config.domain).configure(provider_config.rate_limit, provider_config.rate_burst)
+        if used_providers and get_health_check_timeout() > 0:
+            # 开始处理账号前并发检查所有用到的服务商域名
+            with profiler.span('health_check'):
+                await check_provider_health(list(used_providers.values()), ctx)
+
+        dispatch_start = loop.time()
+        accounts_in_order = run_pipeline(
+            enumerate(indexed_accounts), prepare_account, complete_account,
+            producers=browser_concurrency, consumers=max_concurrency, queue_size=queue_size)
+        async with contextlib.aclosing(accounts_in_order):
+            async for (_, (i, account)), result in accounts_in_order:
+                record = account_result_record(i, account, result)
+                record_account_metrics(metrics, record)
+                report.add(record)
+                if shard_writer:
+                    shard_writer.write(record)
+        completed = True
+    finally:
+        if owns_ctx:
+            await ctx.close()
+        else:
+            ctx.flush()
+        # 保存本次余额到历史记录
+        report.close()
+        if shard_writer:
+            # 运行中断时不留下不完整的分片结果
+            shard_writer.close({'success': report.success_count, 'failed': report.failed_total} if completed else None)
+
+    print(f'ℹ️ [信息] 共处理 {report.total_count} 个账号')
+    if shard_writer:
+        print(f'💾 [分片] 分片 {shard} 的 {shard_writer.count} 个账号结果已写入 {shard_writer.path}，'
+              f'成功 {report.success_count}，失败 {report.failed_total}')
+    else:
+        await deliver_report(report, profiler, metrics, outbox, outbox_task)
+
+    if ctx:
+        ctx.last_failed_count = report.failed_total
+
+    run_duration = time.perf_counter() - run_start
+    metrics.mark_run(run_duration)
+    write_metrics_textfile(metrics)
+
+    profiler.record('run', run_duration)
+    profile_summary = profiler.write()
+    if profile_summary:
+        print(f'⏱️ [耗时] 阶段耗时统计已写入 {profiler.path}（p50 / p95 / max，单位秒）')
+        for phase, stats in profile_summary['phases'].items():
+            print(f'⏱️ [耗时] {phase}: {stats["p50"]:.2f} / {stats["p95"]:.2f} / {stats["max"]:.2f}（{stats["count"]} 次）')
+
+    # 返回退出码（没有分到账号的分片视为成功）
+    if shard and report.total_count == 0:
+        return 0
+    return 0 if report.success_count > 0 else 1
+
+
+def get_shard_results_dir() -> str:
+    """分片结果文件所在目录，多台机器分片时应指向共享存储"""
+    return os.getenv('SHARD_RESULTS_DIR') or DEFAULT_SHARD_RESULTS_DIR
+
+
+async def merge_shards(results_dir: str, metrics: MetricsRegistry | None = None) -> int:
+    """合并各分片的结果：统一检查余额变化并只发送一次通知，合并过的结果文件不会再次合并
+
+    所有分片的签到结果、余额和通知指标记录到 metrics，并写入 METRICS_TEXTFILE
+    """
+    metrics = metrics or MetricsRegistry()
+    print(f'🚀 [系统] 合并分片签到结果: {results_dir}')
+    shard_files = find_shard_results(results_dir)
+    if not shard_files:
+        print(f'❌ [失败] {results_dir} 中没有待合并的分片结果')
+        return 1
+    shard_counts = {shard_file.count for shard_file in shard_files}
+    if len(shard_counts) > 1:
+        print(f'❌ [失败] 分片结果的分片总数不一致: {sorted(shard_counts)}，请清理旧的结果文件后重试')
+        return 1
+
+    shard_count = shard_counts.pop()
+    missing = sorted(set(range(1, shard_count + 1)) - {shard_file.index for shard_file in shard_files})
+
+    outbox, outbox_task = start_outbox_delivery()
+    report = RunReport(BalanceStore.from_env(), get_always_notify(), get_notify_max_balance_lines())
+    try:
+        # 各分片文件内的账号已按配置顺序排列，按序号归并后通知顺序与单进程运行一致
+        for record in heapq.merge(*(shard_file.records() for shard_file in shard_files), key=itemgetter('index')):
+            record_account_metrics(metrics, record)
+            report.add(record)
+    finally:
+        report.close()
+    if missing:
+        missing_shards = '、'.join(f'{index}/{shard_count}' for index in missing)
+        print(f'⚠️ [分片] 缺少分片 {missing_shards} 的结果')
+        report.add_note(f'⚠️ [分片] 缺少分片 {missing_shards} 的结果，这些分片的账号未统计')
+    print(f'ℹ️ [信息] 已合并 {len(shard_files)}/{shard_count} 个分片，共 {report.total_count} 个账号')
+
+    profiler = RunProfiler.from_env()
+    await deliver_report(report, profiler, metrics, outbox, outbox_task)
+    write_metrics_textfile(metrics)
+    profiler.write()
+
+    for shard_file in shard_files:
+        shard_file.mark_merged()
+    return 0 if report.success_count > 0 else 1
+
+
+def get_daemon_schedule(args) -> Schedule | ResetSchedule:
+    """根据命令行参数和环境变量生成常驻模式的调度计划
+
+    - --reset-aware / DAEMON_SCHEDULE=reset: 按服务商签到重置时间调度，参数见 RESET_* 环境变量
+    - --interval / DAEMON_INTERVAL: 固定运行间隔（秒），设置后忽略 cron
+    - --cron / DAEMON_CRON: cron 表达式，默认 "0 */6 * * *"
+    - --jitter / DAEMON_JITTER: 每次运行的随机延迟上限（秒）
+    """
+    if args.reset_aware or os.getenv('DAEMON_SCHEDULE', '').lower() == 'reset':
+        defaults = ResetSchedule()
+        return ResetSchedule(
+            delay=max(0.0, float(os.getenv('RESET_DELAY') or defaults.delay)),
+            spread=max(0.0, float(os.getenv('RESET_SPREAD') or defaults.spread)),
+            retry_interval=max(1.0, float(os.getenv('RESET_RETRY_INTERVAL') or defaults.retry_interval)),
+            max_retries=max(0, int(os.getenv('RESET_MAX_RETRIES') or defaults.max_retries)),
+        )
+    interval = args.interval if args.interval is not None else os.getenv('DAEMON_INTERVAL')
+    jitter = args.jitter if args.jitter is not None else os.getenv('DAEMON_JITTER')
+    jitter = max(0.0, float(jitter)) if jitter else 0.0
+    if interval:
+        return Schedule(interval=max(1.0, float(interval)), jitter=jitter)
+    cron = args.cron or os.getenv('DAEMON_CRON') or DEFAULT_DAEMON_CRON
+    return Schedule(cron=CronSchedule.parse(cron), jitter=jitter)
+
+
+def next_reset_time(now: datetime, providers: list[ProviderConfig]) -> datetime:
+    """账号用到的服务商中最近的下一次签到重置时间，providers 为空时（如账号配置加载失败）使用所有服务商"""
+    providers = providers or AppConfig.load_from_env().providers.values()
+    return min(provider.next_reset_after(now) for provider in providers).astimezone()
+
+
+async def run_daemon(schedule: Schedule | ResetSchedule, metrics_port: int | None = None,
+                     shard: Shard | None = None):
+    """常驻模式：启动后立即运行一次，之后按调度计划重复执行，收到 SIGTERM/SIGINT 后在当前运行结束时退出
+
+    按重置时间调度时，有账号失败会按退避间隔只重试未签到的账号，重试次数用完后等待下一次重置。
+    设置 metrics_port 时在 METRICS_HOST（默认 127.0.0.1）上提供 /metrics。
+    """
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except (NotImplementedError, RuntimeError):
+            # Windows 不支持 add_signal_handler
+            signal.signal(sig, lambda *_: loop.call_soon_threadsafe(stop_event.set))
+
+    proxy_url = get_proxy_config()
+    await verify_proxy(proxy_url)
+    ctx = RunContext.from_env(proxy_url)
+    metrics_server = None
+    if metrics_port:
+        metrics_server = MetricsServer(ctx.metrics, os.getenv('METRICS_HOST') or '127.0.0.1', metrics_port)
+        try:
+            await metrics_server.start()
+        except OSError as e:
+            print(f'⚠️ [警告] 无法启动指标服务: {e}')
+            metrics_server = None
+    print(f'🕒 [常驻] 已进入常驻模式，调度计划: {schedule.describe()}')
+
+    reset_aware = isinstance(schedule, ResetSchedule)
+    retries = 0
+    try:
+        # 使用带时区的本地时间，便于与各服务商的重置时间比较
+        next_run = datetime.now().astimezone()
+        while not stop_event.is_set():
+            delay = (next_run - datetime.now().astimezone()).total_seconds()
+            if delay > 0:
+                print(f'🕒 [常驻] 下次运行时间: {next_run.strftime("%Y-%m-%d %H:%M:%S")}')
+                try:
+                    await asyncio.wait_for(stop_event.wait(), timeout=delay)
+                    break
+                except asyncio.TimeoutError:
+                    pass
+
+            # 重新加载 .env，使账号和服务商配置的修改在本次运行生效
+            load_dotenv(override=True)
+            try:
+                if reset_aware and retries:
+                    await main(ctx, only_unchecked=True, shard=shard)
+                else:
+                    await main(ctx, spread=schedule.spread if reset_aware else 0.0, shard=shard)
+            except Exception as e:
+                print(f'❌ [失败] 本次运行发生错误: {e}')
+                ctx.last_failed_count = max(ctx.last_failed_count, 1)
+
+            now = datetime.now().astimezone()
+            if not reset_aware:
+                next_run = schedule.next_run(now)
+            elif ctx.last_failed_count and retries < schedule.max_retries:
+                retries += 1
+                next_run = now + timedelta(seconds=schedule.retry_delay(retries))
+                print(f'🔁 [常驻] {ctx.last_failed_count} 个账号签到失败，将进行第 {retries} 次重试')
+            else:
+                retries = 0
+                next_run = schedule.next_reset_run([next_reset_time(now, ctx.account_providers)])
+    finally:
+        if metrics_server:
+            await metrics_server.close()
+        await ctx.close()
+        print('👋 [常驻] 已收到退出信号，资源已释放')
+    return 0
 
 
 def run_main():
     """运行主函数的包装函数"""
+    parser = argparse.ArgumentParser(description='AnyRouter 多账号自动签到')
+    parser.add_argument('--daemon', action='store_true', help='常驻模式：按调度计划重复执行，保持浏览器和连接池')
+    parser.add_argument('--cron', help=f'常驻模式的 cron 表达式（默认 "{DEFAULT_DAEMON_CRON}"）')
+    parser.add_argument('--interval', type=float, help='常驻模式的固定运行间隔（秒），设置后忽略 --cron')
+    parser.add_argument('--jitter', type=float, help='常驻模式每次运行的随机延迟上限（秒）')
+    parser.add_argument('--reset-aware', action='store_true', help='常驻模式按服务商签到重置时间调度，失败账号自动重试')
+    parser.add_argument('--metrics-port', type=int, help='常驻模式在该端口提供 Prometheus /metrics（也可通过 METRICS_PORT 设置）')
+    parser.add_argument('--shard', help='只处理第 i 个分片的账号（格式 i/N，也可通过 SHARD 设置），结果写入 SHARD_RESULTS_DIR')
+    parser.add_argument('--merge-shards', nargs='?', const='', metavar='DIR',
+                        help='合并分片结果并发送一次通知（默认目录为 SHARD_RESULTS_DIR）')
+    args = parser.parse_args()
+
+    shard = None
+    shard_value = args.shard or os.getenv('SHARD')
+    if shard_value:
+        try:
+            shard = Shard.parse(shard_value)
+        except ValueError as e:
+            parser.error(str(e))
+
     try:
-        exit_code = asyncio.run(main())
+        if args.merge_shards is not None:
+            exit_code = asyncio.run(merge_shards(args.merge_shards or get_shard_results_dir()))
+        elif args.daemon:
+            metrics_port = args.metrics_port or int(os.getenv('METRICS_PORT') or 0) or None
+            exit_code = asyncio.run(run_daemon(get_daemon_schedule(args), metrics_port, shard))
+        else:
+            exit_code = asyncio.run(main(shard=shard))
         sys.exit(exit_code)
     except KeyboardInterrupt:
         print('\n⚠️ [警告] 程序被用户中断')
@@ -0,0 +1,92 @@
+import json
+import sys
+from pathlib import Path
+
+# 添加项目根目录到 PATH
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from utils.config import AccountSource, iter_accounts_file
+
+
+def test_invalid_lines_are_skipped(tmp_path, capsys):
+	path = tmp_path / 'accounts.jsonl'
+	path.write_text(
+		'\n'.join(
+			[
+				json.dumps({'cookies': {'session': 'a'}, 'api_user': '1'}),
+				'# 注释行',
+				'',
+				'{not json',
+				json.dumps({'cookies': {'session': 'b'}}),
+				json.dumps({'name': 'B', 'cookies': 'session=b', 'api_user': '2', 'provider': 'agentrouter'}),
+			]
+		),
+		encoding='utf-8',
+	)
+
+	accounts = list(iter_accounts_file(str(path)))
+
+	# 序号取自所在的行，跳过的行不会使后面的账号错位
+	assert [(index, account.api_user) for index, account in accounts] == [(0, '1'), (5, '2')]
+	assert accounts[0][1].get_display_name(0) == 'Account 1'
+	assert accounts[1][1].name == 'B'
+	assert accounts[1][1].provider == 'agentrouter'
+	output = capsys.readouterr().out
+	assert f'{path}:4' in output
+	assert f'{path}:5' in output and 'missing required fields' in output
+
+
+def test_file_source_takes_precedence(tmp_path, monkeypatch):
+	path = tmp_path / 'accounts.jsonl'
+	path.write_text(
+		''.join(json.dumps({'cookies': {'session': str(i)}, 'api_user': str(i)}) + '\n' for i in range(3)),
+		encoding='utf-8',
+	)
+	monkeypatch.setenv('ANYROUTER_ACCOUNTS_FILE', str(path))
+	monkeypatch.setenv('ANYROUTER_ACCOUNTS', json.dumps([{'cookies': {}, 'api_user': 'env'}]))
+
+	source = AccountSource.from_env()
+
+	assert source.count() == 3
+	# 每次迭代重新读取文件，同一服务商名称在账号之间共用一个字符串对象
+	first, second = list(source), list(source)
+	assert [account.api_user for _, account in first] == ['0', '1', '2']
+	assert len(second) == 3
+	assert first[0][1].provider is second[2][1].provider
+	assert not hasattr(first[0][1], '__dict__')
+
+
+def test_providers_referenced_by_accounts(tmp_path):
+	path = tmp_path / 'accounts.jsonl'
+	path.write_text(
+		'\n'.join(
+			[
+				json.dumps({'cookies': {}, 'api_user': '1'}),
+				'{not json',
+				json.dumps({'cookies': {}, 'api_user': '2', 'provider': 'agentrouter'}),
+			]
+		),
+		encoding='utf-8',
+	)
+
+	assert AccountSource(path=str(path)).providers() == {'anyrouter', 'agentrouter'}
+
+
+def test_default_names_follow_file_lines(tmp_path):
+	path = tmp_path / 'accounts.jsonl'
+	path.write_text(
+		'\n'.join(
+			[
+				json.dumps({'cookies': {'session': 'a'}, 'api_user': '1'}),
+				'{not json',
+				json.dumps({'cookies': {'session': 'c'}, 'api_user': '3'}),
+			]
+		),
+		encoding='utf-8',
+	)
+
+	(first_index, first), (third_index, third) = iter_accounts_file(str(path))
+
+	assert first.get_display_name(first_index) == 'Account 1'
+	assert third.get_display_name(third_index) == 'Account 3'
@@ -0,0 +1,27 @@
+import sys
+from pathlib import Path
+
+# 添加项目根目录到 PATH
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from utils.balance_store import BalanceStore
+
+
+def test_latest_returns_most_recent_row_per_account(tmp_path):
+	store = BalanceStore(str(tmp_path / 'balance.db'))
+	store.append([('1001', 'anyrouter', 10.0, 1.0), ('1002', 'agentrouter', 5.0, 0.0)], ts=100)
+	store.append([('1001', 'anyrouter', 35.0, 1.5)], ts=200)
+
+	latest = store.latest([('1001', 'anyrouter'), ('1002', 'agentrouter'), ('1003', 'anyrouter')])
+
+	assert latest == {('1001', 'anyrouter'): (35.0, 1.5), ('1002', 'agentrouter'): (5.0, 0.0)}
+
+
+def test_history_is_persisted(tmp_path):
+	path = str(tmp_path / 'balance.db')
+	store = BalanceStore(path)
+	store.append([('1001', 'anyrouter', 10.0, 1.0)])
+	store.close()
+
+	assert BalanceStore(path).latest([('1001', 'anyrouter')]) == {('1001', 'anyrouter'): (10.0, 1.0)}
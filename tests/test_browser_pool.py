@@ -0,0 +1,73 @@
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+# 添加项目根目录到 PATH
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from utils.browser_pool import BrowserWorkerPool, process_tree_rss_mb
+
+
+async def fake_solver(browser, request: dict) -> dict | None:
+	"""不启动浏览器，只返回工作进程的 pid；crash 为真时模拟浏览器进程崩溃"""
+	if request.get('crash'):
+		os._exit(1)
+	await asyncio.sleep(request.get('delay', 0))
+	return {'pid': str(os.getpid()), 'tag': request.get('tag', '')}
+
+
+def test_workers_are_recycled_after_max_solves():
+	async def run():
+		pool = BrowserWorkerPool(fake_solver, size=1, max_solves=2)
+		try:
+			return [await pool.solve({}) for _ in range(3)], pool.recycled
+		finally:
+			await pool.close()
+
+	results, recycled = asyncio.run(run())
+
+	pids = [result['pid'] for result in results]
+	assert pids[0] == pids[1] != pids[2]
+	assert recycled == 1
+
+
+def test_crashed_worker_is_replaced():
+	async def run():
+		pool = BrowserWorkerPool(fake_solver, size=1)
+		try:
+			return await pool.solve({'crash': True}), await pool.solve({})
+		finally:
+			await pool.close()
+
+	crashed, result = asyncio.run(run())
+
+	assert crashed is None
+	assert result['pid'] != str(os.getpid())
+
+
+def test_cancelled_solve_does_not_leak_its_reply():
+	async def run():
+		pool = BrowserWorkerPool(fake_solver, size=1)
+		try:
+			first = await pool.solve({'tag': 'warmup'})
+			try:
+				await asyncio.wait_for(pool.solve({'tag': 'cancelled', 'delay': 0.5}), timeout=0.2)
+			except asyncio.TimeoutError:
+				pass
+			return first, await pool.solve({'tag': 'next'}), pool.recycled
+		finally:
+			await pool.close()
+
+	first, result, recycled = asyncio.run(run())
+
+	# 被取消的请求所在的进程已被换下，下一个请求由新进程处理并收到自己的结果
+	assert result['tag'] == 'next'
+	assert result['pid'] != first['pid']
+	assert recycled == 1
+
+
+def test_process_tree_rss():
+	rss = process_tree_rss_mb(os.getpid())
+	assert rss is None or rss > 0
@@ -0,0 +1,180 @@
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到 PATH
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import checkin
+from benchmarks.bench_checkin import CLEARED_ENV
+from benchmarks.mock_server import MockNewApiServer, MockServerConfig
+from checkin import RunContext
+
+ACCOUNT_COUNT = 12
+WAF_COOKIES = {'acw_tc': 'tc', 'cdn_sec_tc': 'sec', 'acw_sc__v2': 'v2'}
+
+
+@pytest.fixture
+def env(tmp_path, monkeypatch):
+	"""在临时目录中运行，清空通知和代理配置，账号都指向模拟服务"""
+	monkeypatch.chdir(tmp_path)
+	for name in CLEARED_ENV:
+		monkeypatch.delenv(name, raising=False)
+	accounts = [
+		{'name': f'mock-{i}', 'provider': 'mock', 'api_user': str(i), 'cookies': {'session': f'session-{i}'}}
+		for i in range(ACCOUNT_COUNT)
+	]
+	monkeypatch.setenv('ANYROUTER_ACCOUNTS', json.dumps(accounts))
+	monkeypatch.delenv('ANYROUTER_ACCOUNTS_FILE', raising=False)
+	monkeypatch.setenv('BALANCE_DB_FILE', str(tmp_path / 'balance_history.db'))
+	return monkeypatch
+
+
+class FakePage:
+	"""打开登录页即写入 WAF cookies（模拟服务只检查 cookie 是否齐全）"""
+
+	def __init__(self, context: 'FakeBrowserContext'):
+		self.context = context
+
+	def on(self, event, callback):
+		pass
+
+	def remove_listener(self, event, callback):
+		pass
+
+	async def goto(self, url, **kwargs):
+		self.context.jar.update(WAF_COOKIES)
+
+
+class FakeBrowserContext:
+	def __init__(self, browser: 'FakeBrowser'):
+		self.browser = browser
+		self.jar = {}
+
+	async def route(self, pattern, handler):
+		pass
+
+	def on(self, event, callback):
+		pass
+
+	async def new_page(self):
+		return FakePage(self)
+
+	async def cookies(self):
+		return [{'name': name, 'value': value} for name, value in self.jar.items()]
+
+	async def close(self):
+		self.browser.open_contexts -= 1
+
+
+class FakeBrowser:
+	def __init__(self):
+		self.contexts = 0
+		self.open_contexts = 0
+		self.closed = False
+
+	def is_connected(self):
+		return not self.closed
+
+	async def new_context(self, **kwargs):
+		self.contexts += 1
+		self.open_contexts += 1
+		return FakeBrowserContext(self)
+
+	async def close(self):
+		self.closed = True
+
+
+class FakePlaywright:
+	"""替代 async_playwright().start() 的结果，记录启动的浏览器"""
+
+	def __init__(self):
+		self.browsers = []
+		self.chromium = self
+		self.stopped = False
+
+	async def launch(self, **kwargs):
+		self.browsers.append(FakeBrowser())
+		return self.browsers[-1]
+
+	async def stop(self):
+		self.stopped = True
+
+
+def run_checkin(monkeypatch, config: MockServerConfig, bypass_method=None, setup=None) -> tuple[int, MockNewApiServer]:
+	"""启动模拟服务并在同一事件循环中运行一次 checkin.main，setup 可在运行前修改 RunContext"""
+
+	async def run():
+		async with MockNewApiServer(config) as server:
+			monkeypatch.setenv(
+				'PROVIDERS', json.dumps({'mock': {'domain': server.url, 'bypass_method': bypass_method}})
+			)
+			ctx = RunContext.from_env()
+			if setup:
+				setup(ctx)
+			try:
+				exit_code = await checkin.main(ctx)
+			finally:
+				await ctx.close()
+			return exit_code, server
+
+	return asyncio.run(run())
+
+
+def test_accounts_run_concurrently_within_the_limit(env):
+	env.setenv('MAX_CONCURRENCY', '3')
+
+	exit_code, server = run_checkin(env, MockServerConfig(waf=False, latency=0.05))
+
+	assert exit_code == 0
+	assert len(server.checked_in) == ACCOUNT_COUNT
+	# 同时处理的账号数达到但不超过并发上限；每个账号的用户信息和签到状态并发请求，因此请求数最多为两倍
+	assert server.max_accounts_in_flight == 3
+	assert server.max_in_flight <= 2 * 3
+
+
+def test_accounts_share_one_http_client(env):
+	env.setenv('MAX_CONCURRENCY', '3')
+	clients = []
+
+	def record_clients(ctx: RunContext):
+		get = ctx.clients.get
+
+		def recording_get(domain, proxy_url=None):
+			clients.append(get(domain, proxy_url))
+			return clients[-1]
+
+		ctx.clients.get = recording_get
+
+	exit_code, server = run_checkin(env, MockServerConfig(waf=False, latency=0.05), setup=record_clients)
+
+	assert exit_code == 0
+	assert len(clients) > ACCOUNT_COUNT
+	assert len({id(client) for client in clients}) == 1
+	# keep-alive 连接在账号之间复用，连接数不超过同时处理的请求数
+	assert server.connection_count <= server.max_in_flight < server.request_count
+
+
+def test_accounts_share_one_browser(env):
+	# 关闭 WAF cookies 缓存，每个账号都需要用浏览器求解
+	env.setenv('WAF_COOKIE_TTL', '0')
+	env.delenv('BROWSER_WORKERS', raising=False)
+	playwright = FakePlaywright()
+
+	def use_fake_playwright(ctx: RunContext):
+		ctx.browser._playwright = playwright
+
+	exit_code, server = run_checkin(env, MockServerConfig(), bypass_method='waf_cookies', setup=use_fake_playwright)
+
+	assert exit_code == 0
+	assert len(server.checked_in) == ACCOUNT_COUNT
+	# 只启动一个浏览器，每个账号一个无痕上下文，用完即关闭；运行结束时关闭浏览器
+	assert len(playwright.browsers) == 1
+	browser = playwright.browsers[0]
+	assert browser.contexts == ACCOUNT_COUNT
+	assert browser.open_contexts == 0
+	assert browser.closed and playwright.stopped
@@ -0,0 +1,45 @@
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+# 添加项目根目录到 PATH
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from utils.checkin_state import CheckinStateStore
+from utils.config import ProviderConfig
+
+
+def test_checkin_date_uses_provider_timezone():
+	now = datetime(2026, 1, 1, 17, 0, tzinfo=timezone.utc)
+
+	assert ProviderConfig(name='a', domain='https://a').current_checkin_date(now) == '2026-01-02'
+	assert ProviderConfig(name='a', domain='https://a', reset_timezone='UTC').current_checkin_date(now) == '2026-01-01'
+
+
+def test_invalid_reset_settings_warn_once_at_load(capsys):
+	provider = ProviderConfig.from_dict(
+		'a', {'domain': 'https://a', 'reset_timezone': 'Mars/Base', 'reset_time': 'noon'}
+	)
+
+	assert (provider.reset_timezone, provider.reset_time) == ('+08:00', '00:00')
+	assert capsys.readouterr().out.count('[WARNING]') == 2
+
+	# 之后计算签到日期和重置时间不再重复警告
+	now = datetime(2026, 1, 1, 17, 0, tzinfo=timezone.utc)
+	assert provider.current_checkin_date(now) == '2026-01-02'
+	provider.next_reset_after(now)
+	assert capsys.readouterr().out == ''
+
+
+def test_marked_accounts_are_skipped_only_on_the_same_day(tmp_path):
+	path = str(tmp_path / 'state.db')
+	store = CheckinStateStore(path)
+	store.mark('1001', 'anyrouter', '2026-01-02')
+	assert store.is_checked_in('1001', 'anyrouter', '2026-01-02')
+	store.close()
+
+	store = CheckinStateStore(path)
+	assert store.is_checked_in('1001', 'anyrouter', '2026-01-02')
+	assert not store.is_checked_in('1001', 'anyrouter', '2026-01-03')
+	assert not store.is_checked_in('1001', 'agentrouter', '2026-01-02')
@@ -0,0 +1,72 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import httpx
+
+# 添加项目根目录到 PATH
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from utils.http_pool import DEFAULT_MAX_KEEPALIVE_CONNECTIONS, ClientPool, format_cookie_header
+
+
+def test_clients_are_reused_per_domain_and_proxy():
+	async def run():
+		pool = ClientPool()
+		try:
+			client = pool.get('https://anyrouter.top/')
+			assert pool.get('https://anyrouter.top') is client
+			assert pool.get('https://agentrouter.org') is not client
+			assert pool.get('https://anyrouter.top', 'http://127.0.0.1:7890') is not client
+
+			# 已关闭的客户端会被重新创建
+			await client.aclose()
+			assert pool.get('https://anyrouter.top') is not client
+		finally:
+			await pool.aclose()
+
+	asyncio.run(run())
+
+
+def test_response_cookies_are_not_shared_between_accounts():
+	seen = []
+
+	def handler(request: httpx.Request) -> httpx.Response:
+		seen.append(request.headers.get('cookie'))
+		# 服务器为每个账号下发 session
+		return httpx.Response(200, headers={'set-cookie': f'session={len(seen)}; Path=/'})
+
+	async def run():
+		pool = ClientPool()
+		client = pool.get('https://anyrouter.top')
+		# 替换底层 transport，保留连接池的 cookie 策略
+		client._transport = httpx.MockTransport(handler)
+		try:
+			for account in ('a', 'b'):
+				await client.get(
+					'https://anyrouter.top/api/user/self', headers={'Cookie': format_cookie_header({'user': account})}
+				)
+			# 不带 Cookie 的请求（如健康检查）也不会携带之前账号的 session
+			await client.get('https://anyrouter.top/')
+			return len(client.cookies)
+		finally:
+			await pool.aclose()
+
+	stored = asyncio.run(run())
+
+	assert seen == ['user=a', 'user=b', None]
+	assert stored == 0
+
+
+def test_connection_limits_from_env(monkeypatch):
+	monkeypatch.setenv('HTTP_MAX_CONNECTIONS', '8')
+	monkeypatch.setenv('HTTP_MAX_KEEPALIVE_CONNECTIONS', 'many')
+	monkeypatch.setenv('HTTP_KEEPALIVE_EXPIRY', '5.5')
+
+	limits = ClientPool.from_env().limits
+
+	assert limits.max_connections == 8
+	# 格式错误时使用默认值
+	assert limits.max_keepalive_connections == DEFAULT_MAX_KEEPALIVE_CONNECTIONS
+	assert limits.keepalive_expiry == 5.5
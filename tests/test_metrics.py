@@ -0,0 +1,37 @@
+import sys
+from pathlib import Path
+
+# 添加项目根目录到 PATH
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from utils.metrics import MetricsRegistry
+
+
+def test_render_counters_and_gauges_with_labels():
+	registry = MetricsRegistry()
+	registry.inc('anyrouter_checkin_total', provider='anyrouter', result='success')
+	registry.inc('anyrouter_checkin_total', provider='anyrouter', result='success')
+	registry.set('anyrouter_account_quota', 12.5, account='1001', provider='a"b')
+
+	text = registry.render()
+
+	assert '# TYPE anyrouter_checkin_total counter' in text
+	assert 'anyrouter_checkin_total{provider="anyrouter",result="success"} 2\n' in text
+	assert 'anyrouter_account_quota{account="1001",provider="a\\"b"} 12.5\n' in text
+
+
+def test_histogram_buckets_are_cumulative(tmp_path):
+	registry = MetricsRegistry(buckets=(1.0, 5.0))
+	for value in (0.5, 2.0, 10.0):
+		registry.observe('anyrouter_waf_solve_seconds', value, provider='anyrouter')
+
+	path = tmp_path / 'checkin.prom'
+	registry.write_textfile(str(path))
+	text = path.read_text(encoding='utf-8')
+
+	assert 'anyrouter_waf_solve_seconds_bucket{provider="anyrouter",le="1"} 1\n' in text
+	assert 'anyrouter_waf_solve_seconds_bucket{provider="anyrouter",le="5"} 2\n' in text
+	assert 'anyrouter_waf_solve_seconds_bucket{provider="anyrouter",le="+Inf"} 3\n' in text
+	assert 'anyrouter_waf_solve_seconds_sum{provider="anyrouter"} 12.5\n' in text
+	assert 'anyrouter_waf_solve_seconds_count{provider="anyrouter"} 3\n' in text
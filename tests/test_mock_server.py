@@ -0,0 +1,47 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import httpx
+
+# 添加项目根目录到 PATH
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from benchmarks.mock_server import MockNewApiServer, MockServerConfig
+
+
+def test_waf_challenge_and_checkin_flow():
+	async def run():
+		async with MockNewApiServer(MockServerConfig()) as server:
+			async with httpx.AsyncClient(base_url=server.url) as client:
+				login = await client.get('/login')
+				assert 'arg1=' in login.text
+				assert {'acw_tc', 'cdn_sec_tc'} <= set(login.cookies.keys())
+
+				cookies = 'acw_tc=1; cdn_sec_tc=2; acw_sc__v2=3; session=s'
+				headers = {'Cookie': cookies, 'new-api-user': '1001'}
+				first = await client.post('/api/user/checkin', headers=headers)
+				second = await client.post('/api/user/checkin', headers=headers)
+				status = await client.get('/api/user/checkin/status', headers=headers)
+				return first.json(), second.json(), status.json(), server.stats()
+
+	first, second, status, stats = asyncio.run(run())
+
+	assert first['success'] is True
+	assert second['success'] is False and '已签到' in second['message']
+	assert status['data']['checked'] is True
+	assert stats['requests'] == 4
+
+
+def test_rate_limit_returns_retry_after():
+	async def run():
+		async with MockNewApiServer(MockServerConfig(waf=False, rate_limit=1, burst=1)) as server:
+			async with httpx.AsyncClient(base_url=server.url) as client:
+				return [await client.get('/login') for _ in range(2)]
+
+	first, second = asyncio.run(run())
+
+	assert first.status_code == 200
+	assert second.status_code == 429
+	assert second.headers['Retry-After'] == '1'
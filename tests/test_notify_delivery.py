@@ -0,0 +1,120 @@
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import pytest
+
+# 添加项目根目录到 PATH
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from utils.notify import NotificationKit
+
+# 测试中 httpx.AsyncClient 会被替换，保留原始类用于创建使用 MockTransport 的客户端
+AsyncClient = httpx.AsyncClient
+
+CHANNEL_ENV = (
+	'EMAIL_USER',
+	'EMAIL_PASS',
+	'EMAIL_TO',
+	'PUSHPLUS_TOKEN',
+	'SERVERPUSHKEY',
+	'DINGDING_WEBHOOK',
+	'FEISHU_WEBHOOK',
+	'WEIXIN_WEBHOOK',
+)
+
+
+async def webhook(request: httpx.Request) -> httpx.Response:
+	"""钉钉响应超时，飞书返回 500，企业微信正常"""
+	if request.url.host == 'ding.test':
+		await asyncio.sleep(5)
+	if request.url.host == 'feishu.test':
+		return httpx.Response(500, request=request)
+	return httpx.Response(200, json={'errcode': 0}, request=request)
+
+
+@pytest.fixture
+def kit(monkeypatch):
+	for name in CHANNEL_ENV:
+		monkeypatch.delenv(name, raising=False)
+	monkeypatch.setenv('DINGDING_WEBHOOK', 'https://ding.test/robot/send')
+	monkeypatch.setenv('FEISHU_WEBHOOK', 'https://feishu.test/hook')
+	monkeypatch.setenv('WEIXIN_WEBHOOK', 'https://wecom.test/webhook/send')
+	monkeypatch.setenv('NOTIFY_TIMEOUT', '0.2')
+
+	def mock_client(**kwargs):
+		return AsyncClient(transport=httpx.MockTransport(webhook), **kwargs)
+
+	monkeypatch.setattr(httpx, 'AsyncClient', mock_client)
+	return NotificationKit()
+
+
+def test_failing_channels_do_not_block_the_others(kit):
+	start = time.perf_counter()
+	results = asyncio.run(kit.apush_message('标题', '内容'))
+	elapsed = time.perf_counter() - start
+
+	assert [result['channel'] for result in results] == ['dingtalk', 'feishu', 'wecom']
+	dingtalk, feishu, wecom = results
+	assert not dingtalk['success'] and dingtalk['error'] == '超时（0.2s）'
+	assert not feishu['success'] and '500' in feishu['error']
+	assert wecom['success'] and wecom['error'] is None
+	# 各渠道并发发送，单个渠道超时不影响总耗时
+	assert elapsed < 2
+
+
+def test_send_channel_raises_on_non_2xx(kit):
+	async def run(channel: str):
+		async with httpx.AsyncClient() as client:
+			await kit.send_channel(client, channel, '标题', '内容')
+
+	with pytest.raises(httpx.HTTPStatusError):
+		asyncio.run(run('feishu'))
+	asyncio.run(run('wecom'))
+
+
+def test_deliver_sends_channel_payload(kit):
+	requests = []
+
+	def handler(request: httpx.Request) -> httpx.Response:
+		requests.append(request)
+		return httpx.Response(200, request=request)
+
+	async def run():
+		async with AsyncClient(transport=httpx.MockTransport(handler)) as client:
+			return await kit._deliver(client, 'wecom', '💼 企业微信', '标题', '内容', 'text')
+
+	result = asyncio.run(run())
+
+	assert result['success'] and result['name'] == '💼 企业微信'
+	assert str(requests[0].url) == 'https://wecom.test/webhook/send'
+	assert json.loads(requests[0].content) == {'msgtype': 'text', 'text': {'content': '标题\n内容'}}
+
+
+def test_no_configured_channels(monkeypatch):
+	for name in CHANNEL_ENV:
+		monkeypatch.delenv(name, raising=False)
+
+	assert asyncio.run(NotificationKit().apush_message('标题', '内容')) == []
+
+
+def test_push_message_inside_running_loop(kit):
+	async def run():
+		# 在事件循环中同步推送不会因 asyncio.run 嵌套而失败
+		return kit.push_message('标题', '内容')
+
+	results = asyncio.run(run())
+
+	assert [result['success'] for result in results] == [False, False, True]
+
+
+@pytest.mark.parametrize('value', ['0', '-5', 'soon', 'inf'])
+def test_invalid_notify_timeout_falls_back_to_default(monkeypatch, capsys, value):
+	monkeypatch.setenv('NOTIFY_TIMEOUT', value)
+
+	assert NotificationKit().timeout == 30.0
+	assert 'Invalid NOTIFY_TIMEOUT' in capsys.readouterr().out
@@ -0,0 +1,120 @@
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到 PATH
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from utils import outbox as outbox_module
+from utils.outbox import DELIVERED_RETENTION, NotificationOutbox, message_id
+
+
+class FakeKit:
+	"""只实现发件箱用到的接口，failing 中的渠道发送时抛出异常"""
+
+	timeout = 1.0
+
+	def __init__(self, channels, failing=()):
+		self.channels = channels
+		self.failing = set(failing)
+		self.sent = []
+
+	def configured_channels(self):
+		return [(channel, channel.upper()) for channel in self.channels]
+
+	async def send_channel(self, client, channel, title, content, msg_type='text'):
+		if channel in self.failing:
+			raise RuntimeError(f'{channel} down')
+		self.sent.append((channel, title, content))
+
+
+def make_due(outbox):
+	for item in outbox.pending.values():
+		item['next_attempt_at'] = 0
+
+
+def test_backoff_grows_exponentially_with_jitter(tmp_path, monkeypatch):
+	outbox = NotificationOutbox(str(tmp_path / 'outbox.json'), base_delay=60, max_delay=600)
+
+	monkeypatch.setattr(outbox_module.random, 'uniform', lambda low, high: 0)
+	assert [outbox.backoff(n) for n in (1, 2, 3, 4, 5)] == [30, 60, 120, 240, 300]
+
+	monkeypatch.setattr(outbox_module.random, 'uniform', lambda low, high: high)
+	assert [outbox.backoff(n) for n in (1, 2, 3, 4, 5)] == [60, 120, 240, 480, 600]
+
+
+def test_failed_retry_is_rescheduled_with_backoff(tmp_path):
+	outbox = NotificationOutbox(str(tmp_path / 'outbox.json'), base_delay=60)
+	outbox.record_results([{'channel': 'dingtalk', 'name': 'DINGTALK', 'success': False}], 't', 'c', 'text')
+	msg_id = message_id('dingtalk', 't', 'c')
+	first = outbox.pending[msg_id]['next_attempt_at'] - time.time()
+	assert 30 - 1 <= first <= 60
+
+	make_due(outbox)
+	assert asyncio.run(outbox.deliver_pending(FakeKit(['dingtalk'], failing=['dingtalk']))) == 0
+
+	item = outbox.pending[msg_id]
+	assert item['attempts'] == 2
+	assert item['last_error'] == 'dingtalk down'
+	assert 60 - 1 <= item['next_attempt_at'] - time.time() <= 120
+	# 未到期的消息不会被重试
+	assert outbox.due() == {}
+
+
+def test_message_is_dropped_after_max_attempts(tmp_path):
+	outbox = NotificationOutbox(str(tmp_path / 'outbox.json'), max_attempts=3)
+	outbox.enqueue('dingtalk', 'DINGTALK', 't', 'c', 'text')
+	kit = FakeKit(['dingtalk'], failing=['dingtalk'])
+
+	make_due(outbox)
+	asyncio.run(outbox.deliver_pending(kit))
+	assert outbox.pending[message_id('dingtalk', 't', 'c')]['attempts'] == 2
+
+	make_due(outbox)
+	asyncio.run(outbox.deliver_pending(kit))
+	assert outbox.pending == {}
+	assert NotificationOutbox(outbox.path).pending == {}
+
+
+def test_delivered_messages_are_not_enqueued_again(tmp_path):
+	path = str(tmp_path / 'outbox.json')
+	outbox = NotificationOutbox(path)
+	outbox.enqueue('feishu', 'FEISHU', 't', 'c', 'text')
+	make_due(outbox)
+	kit = FakeKit(['feishu'])
+
+	assert asyncio.run(outbox.deliver_pending(kit)) == 1
+	assert kit.sent == [('feishu', 't', 'c')]
+
+	# 同一条消息再次失败（如重新运行时重复推送）不会再入队
+	reloaded = NotificationOutbox(path)
+	reloaded.record_results([{'channel': 'feishu', 'name': 'FEISHU', 'success': False}], 't', 'c', 'text')
+	assert reloaded.pending == {}
+
+
+def test_delivered_ids_expire_after_retention(tmp_path):
+	path = str(tmp_path / 'outbox.json')
+	outbox = NotificationOutbox(path)
+	outbox.delivered[message_id('feishu', 't', 'c')] = time.time() - DELIVERED_RETENTION - 1
+	outbox.delivered[message_id('feishu', 't', 'recent')] = time.time() - DELIVERED_RETENTION + 60
+	outbox.record_results([], 't', 'c', 'text')
+
+	reloaded = NotificationOutbox(path)
+	assert list(reloaded.delivered) == [message_id('feishu', 't', 'recent')]
+	reloaded.enqueue('feishu', 'FEISHU', 't', 'c', 'text')
+	assert message_id('feishu', 't', 'c') in reloaded.pending
+
+
+def test_messages_for_removed_channels_are_pruned(tmp_path):
+	outbox = NotificationOutbox(str(tmp_path / 'outbox.json'))
+	outbox.enqueue('dingtalk', 'DINGTALK', 't', 'c', 'text')
+	outbox.enqueue('wecom', 'WECOM', 't', 'c', 'text')
+	make_due(outbox)
+	kit = FakeKit(['wecom'])
+
+	assert asyncio.run(outbox.deliver_pending(kit)) == 1
+	assert kit.sent == [('wecom', 't', 'c')]
+	assert outbox.pending == {}
+	assert message_id('dingtalk', 't', 'c') not in outbox.delivered
@@ -0,0 +1,90 @@
+import asyncio
+import sys
+from pathlib import Path
+
+# 添加项目根目录到 PATH
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from utils.pipeline import Done, run_pipeline
+
+
+def collect(items, produce, consume, **sizes):
+	async def run():
+		return [entry async for entry in run_pipeline(items, produce, consume, **sizes)]
+
+	return asyncio.run(run())
+
+
+def test_results_keep_input_order():
+	async def produce(item):
+		await asyncio.sleep(0.001 * (10 - item))
+		if item == 3:
+			return Done('skipped')
+		if item == 5:
+			raise ValueError('bad item')
+		return item * 10
+
+	async def consume(item, produced):
+		await asyncio.sleep(0.001 * item)
+		return produced + 1
+
+	results = collect(range(10), produce, consume, producers=3, consumers=2, queue_size=1)
+
+	assert [item for item, _ in results] == list(range(10))
+	assert results[3][1] == 'skipped'
+	assert isinstance(results[5][1], ValueError)
+	assert [result for item, result in results if item not in (3, 5)] == [1, 11, 21, 41, 61, 71, 81, 91]
+
+
+def test_stage_concurrency_and_backpressure():
+	active = {'produce': 0, 'consume': 0, 'queued': 0}
+	peak = dict(active)
+
+	def enter(stage, delta):
+		active[stage] += delta
+		peak[stage] = max(peak[stage], active[stage])
+
+	async def produce(item):
+		enter('produce', 1)
+		await asyncio.sleep(0.001)
+		enter('produce', -1)
+		enter('queued', 1)
+		return item
+
+	async def consume(item, produced):
+		enter('queued', -1)
+		enter('consume', 1)
+		await asyncio.sleep(0.01)
+		enter('consume', -1)
+		return produced
+
+	results = collect(range(30), produce, consume, producers=4, consumers=2, queue_size=3)
+
+	assert len(results) == 30
+	assert peak['produce'] == 4
+	assert peak['consume'] == 2
+	# 队列中最多 queue_size 个，另外每个第一阶段协程最多有一个等待放入队列
+	assert peak['queued'] <= 3 + 4
+
+
+def test_items_are_read_lazily():
+	pulled = []
+
+	def items():
+		for item in range(1000):
+			pulled.append(item)
+			yield item
+
+	async def identity(item, produced=None):
+		return item
+
+	async def run():
+		pipeline = run_pipeline(items(), identity, identity, producers=2, consumers=2, queue_size=2, window=8)
+		async for item, _ in pipeline:
+			if item == 10:
+				await pipeline.aclose()
+				break
+
+	asyncio.run(run())
+	assert len(pulled) <= 10 + 1 + 8
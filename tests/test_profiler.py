@@ -0,0 +1,45 @@
+import json
+import sys
+from pathlib import Path
+
+# 添加项目根目录到 PATH
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from utils.profiler import RunProfiler, percentile
+
+
+def test_percentile_uses_nearest_rank():
+	values = [float(v) for v in range(1, 101)]
+
+	assert percentile(values, 0.5) == 50.0
+	assert percentile(values, 0.95) == 95.0
+	assert percentile([], 0.5) == 0.0
+
+
+def test_write_appends_spans_accounts_and_summary(tmp_path):
+	path = tmp_path / 'profile.jsonl'
+	profiler = RunProfiler(str(path))
+	profiler.record('user_info', 0.2, 'A')
+	profiler.record('user_info', 0.4, 'A')
+	profiler.record('account', 1.0, 'A')
+	profiler.record('account', 3.0, 'B')
+	profiler.record('notify', 0.5)
+
+	summary = profiler.write()
+	lines = [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+
+	assert [line['type'] for line in lines] == ['span'] * 5 + ['account'] * 2 + ['summary']
+	assert lines[5]['phases'] == {'user_info': 0.6, 'account': 1.0}
+	assert summary['phases']['user_info'] == {'count': 2, 'p50': 0.2, 'p95': 0.4, 'max': 0.4}
+	assert summary['account_total']['max'] == 3.0
+	assert profiler.spans == []
+
+
+def test_disabled_profiler_records_nothing():
+	profiler = RunProfiler()
+	with profiler.span('account', 'A'):
+		pass
+
+	assert profiler.spans == []
+	assert profiler.write() is None
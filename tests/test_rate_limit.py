@@ -0,0 +1,60 @@
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到 PATH
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from utils.config import ProviderConfig
+from utils.rate_limit import TokenBucket
+
+
+def test_bucket_allows_burst_then_paces():
+	bucket = TokenBucket(rate=20, burst=2)
+
+	async def run():
+		start = time.monotonic()
+		for _ in range(4):
+			await bucket.acquire()
+		return time.monotonic() - start
+
+	# 前 2 个请求使用突发容量，之后每个请求间隔 1/20 秒
+	assert 0.08 <= asyncio.run(run()) < 0.5
+
+
+def test_rate_limited_pauses_and_slows_down_then_recovers():
+	bucket = TokenBucket(rate=10)
+	bucket.on_rate_limited(0.05)
+
+	assert bucket.current_rate == 5
+
+	async def run():
+		start = time.monotonic()
+		await bucket.acquire()
+		return time.monotonic() - start
+
+	assert asyncio.run(run()) >= 0.04
+	for _ in range(20):
+		bucket.on_success()
+	assert bucket.current_rate == 10
+
+
+def test_provider_rate_limit_from_dict():
+	config = ProviderConfig.from_dict('p', {'domain': 'https://p', 'rate_limit': 2, 'rate_burst': 5})
+
+	assert (config.rate_limit, config.rate_burst) == (2, 5)
+	assert ProviderConfig.from_dict('p', {'domain': 'https://p'}).rate_limit is None
+
+
+def test_invalid_provider_rate_limit_is_ignored(capsys):
+	config = ProviderConfig.from_dict('p', {'domain': 'https://p', 'rate_limit': '2.5', 'rate_burst': '5'})
+	assert (config.rate_limit, config.rate_burst) == (2.5, 5)
+
+	for rate_limit, rate_burst in ((0, -1), ('fast', '5.5'), (float('nan'), [5])):
+		config = ProviderConfig.from_dict(
+			'p', {'domain': 'https://p', 'rate_limit': rate_limit, 'rate_burst': rate_burst}
+		)
+		assert (config.rate_limit, config.rate_burst) == (None, None)
+		assert 'Invalid rate_limit' in capsys.readouterr().out
@@ -0,0 +1,120 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+
+# 添加项目根目录到 PATH
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import checkin
+from utils.config import ProviderConfig
+from utils.http_pool import ClientPool
+from utils.resilience import CircuitBreaker, CircuitBreakers, CircuitOpenError, ResilientTransport, RetryPolicy
+
+
+def make_client(statuses: list[int], calls: list[str], breakers: CircuitBreakers | None = None) -> httpx.AsyncClient:
+	def handler(request: httpx.Request) -> httpx.Response:
+		calls.append(request.method)
+		return httpx.Response(statuses[min(len(calls), len(statuses)) - 1])
+
+	transport = ResilientTransport(
+		httpx.MockTransport(handler), RetryPolicy(retries=2, backoff=0), breakers or CircuitBreakers()
+	)
+	return httpx.AsyncClient(transport=transport, base_url='https://example.com')
+
+
+def test_idempotent_requests_are_retried_until_success():
+	calls = []
+
+	async def run():
+		async with make_client([502, 503, 200], calls) as client:
+			get = await client.get('/api/user/self')
+			calls.clear()
+			post = await client.post('/api/user/checkin')
+			return get, post
+
+	get, post = asyncio.run(run())
+
+	assert get.status_code == 200
+	# 未声明幂等的 POST 只请求一次
+	assert post.status_code == 502
+	assert calls == ['POST']
+
+
+def test_breaker_opens_on_failures_and_recovers_after_cooldown():
+	breaker = CircuitBreaker(failure_threshold=0.5, min_requests=4, cooldown=0)
+	for success in (True, False, True, False):
+		breaker.record(success)
+
+	assert breaker.state == 'open'
+	assert breaker.allow()  # cooldown 为 0，直接进入半开并放行试探请求
+	assert breaker.state == 'half_open'
+	breaker.record(True)
+	assert breaker.state == 'closed'
+
+
+def test_open_breaker_fails_fast():
+	breakers = CircuitBreakers(cooldown=60)
+	breakers.get('example.com').trip()
+	calls = []
+
+	async def run():
+		async with make_client([200], calls, breakers) as client:
+			await client.get('/api/user/self')
+
+	with pytest.raises(CircuitOpenError):
+		asyncio.run(run())
+	assert calls == []
+
+
+def test_timeouts_can_be_excluded_from_breaker():
+	breakers = CircuitBreakers(min_requests=1)
+
+	def handler(request: httpx.Request) -> httpx.Response:
+		raise httpx.ReadTimeout('slow', request=request)
+
+	async def run(extensions):
+		transport = ResilientTransport(httpx.MockTransport(handler), RetryPolicy(retries=0, backoff=0), breakers)
+		async with httpx.AsyncClient(transport=transport, base_url='https://example.com') as client:
+			with pytest.raises(httpx.ReadTimeout):
+				await client.get('/', extensions=extensions)
+
+	# 如健康检查：响应慢不计为失败
+	asyncio.run(run({'timeout_is_failure': False}))
+	assert breakers.get('example.com').state == 'closed'
+
+	asyncio.run(run({}))
+	assert breakers.get('example.com').state == 'open'
+
+
+def test_health_check_counts_failures_without_tripping():
+	seen = []
+
+	async def handler(request: httpx.Request) -> httpx.Response:
+		seen.append(request.url.host)
+		await asyncio.sleep(0.05)
+		return httpx.Response(502 if request.url.host == 'down.test' else 200)
+
+	async def run():
+		ctx = checkin.RunContext(clients=ClientPool(breakers=CircuitBreakers(min_requests=2)))
+		providers = [ProviderConfig(name=host, domain=f'https://{host}') for host in ('up.test', 'down.test')]
+		for provider in providers:
+			ctx.clients.get(provider.domain)._transport.transport = httpx.MockTransport(handler)
+		try:
+			start = asyncio.get_running_loop().time()
+			await checkin.check_provider_health(providers, ctx)
+			return ctx.clients, asyncio.get_running_loop().time() - start
+		finally:
+			await ctx.clients.aclose()
+
+	clients, elapsed = asyncio.run(run())
+
+	assert sorted(seen) == ['down.test', 'up.test']
+	# 两个域名并发检查
+	assert elapsed < 0.1
+	# 一次 502 只计入失败统计，不会直接熔断
+	assert clients.is_available('https://down.test')
+	assert clients.breakers.get('down.test')._results.count(False) == 1
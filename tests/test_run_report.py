@@ -0,0 +1,124 @@
+import sys
+from pathlib import Path
+
+# 添加项目根目录到 PATH
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import checkin
+from checkin import RunReport
+from utils.balance_store import BalanceStore
+
+
+def record(number: int, quota: float | None = 10.0, used: float = 1.0, success: bool = True) -> dict:
+	data = {
+		'index': number - 1,
+		'name': f'Account {number}',
+		'provider': 'anyrouter',
+		'api_user': str(number),
+		'success': success,
+		'already_checked': False,
+	}
+	if quota is not None:
+		data.update(quota=quota, used=used, display=f'💰 已使用: ${used}, 当前余额: 💵${quota}')
+	return data
+
+
+def make_report(tmp_path, history: list[tuple] = (), **kwargs) -> RunReport:
+	store = BalanceStore(str(tmp_path / 'balance.db'))
+	if history:
+		store.append(list(history), ts=100)
+	return RunReport(store, **kwargs)
+
+
+def test_first_run_lists_all_balances(tmp_path):
+	report = make_report(tmp_path)
+	report.add(record(1))
+	report.add(record(2, quota=20.0))
+
+	content = report.build_notification()
+
+	assert report.balance_changed
+	assert '💰 [余额] Account 1\n💰 已使用: $1.0, 当前余额: 💵$10.0' in content
+	assert '💰 [余额] Account 2' in content
+	assert '🎉 [成功] 所有账号签到成功！' in content
+
+
+def test_unchanged_balance_skips_notification(tmp_path):
+	report = make_report(tmp_path, [('1', 'anyrouter', 10.0, 1.0), ('2', 'anyrouter', 20.0, 1.0)])
+	report.add(record(1))
+	report.add(record(2, quota=20.0))
+
+	assert report.build_notification() is None
+	assert not report.balance_changed
+
+
+def test_changed_quota_or_used_is_compared_with_latest_row(tmp_path):
+	history = [
+		('1', 'anyrouter', 5.0, 1.0),
+		('2', 'anyrouter', 20.0, 1.0),
+		('3', 'anyrouter', 30.0, 1.0),
+	]
+	report = make_report(tmp_path, history)
+	# 账号 3 较早的记录与本次不同，但最近一次记录相同
+	report.balance_store.append([('3', 'anyrouter', 7.0, 2.0)], ts=50)
+	report.add(record(1))
+	report.add(record(2, quota=20.0, used=1.5))
+	report.add(record(3, quota=30.0))
+
+	content = report.build_notification()
+
+	assert report.changed_count == 2
+	assert '💰 [余额] Account 1' in content
+	assert '💰 [余额] Account 2\n💰 已使用: $1.5' in content
+	assert '💰 [余额] Account 3' not in content
+	assert '💰 [余额] 1 个账号余额无变化，合计余额: 💵$30.0' in content
+
+
+def test_balances_are_saved_on_close(tmp_path):
+	report = make_report(tmp_path)
+	report.add(record(1, quota=12.5, used=2.0))
+	report.close()
+
+	store = BalanceStore(str(tmp_path / 'balance.db'))
+	assert store.latest([('1', 'anyrouter')]) == {('1', 'anyrouter'): (12.5, 2.0)}
+
+
+def test_output_is_capped(tmp_path, monkeypatch):
+	monkeypatch.setattr(checkin, 'NOTIFY_MAX_SUMMARY_NAMES', 3)
+	report = make_report(tmp_path, max_lines=2)
+	for number in range(1, 6):
+		report.add(record(number, quota=float(number)))
+	for number in range(6, 11):
+		report.add(record(number, quota=None, success=False))
+
+	content = report.build_notification()
+
+	assert content.count('💰 [余额] Account') == 2
+	assert '💰 [余额] 另有 3 个账号余额有变化，未逐一列出' in content
+	assert content.count('❌ [失败] Account') == 3
+	assert '✅ [新签到] 【Account 1】、【Account 2】、【Account 3】等 5 个账号签到成功！' in content
+	assert '❌ [失败] 另有 2 个账号失败，未逐一列出' in content
+	assert '❌ [失败] 【Account 6】、【Account 7】、【Account 8】等 5 个账号签到失败！' in content
+	assert '⚠️ [警告] 部分账号签到成功！' in content
+
+
+def test_balances_are_compared_and_saved_in_one_batch(tmp_path):
+	report = make_report(tmp_path, [('1', 'anyrouter', 10.0, 1.0)])
+	calls = []
+	store = report.balance_store
+	latest, append = store.latest, store.append
+	store.latest = lambda keys: calls.append('latest') or latest(keys)
+	store.append = lambda rows, ts=None: calls.append('append') or append(rows, ts)
+	for number in range(1, 4):
+		report.add(record(number))
+
+	report.build_notification()
+	report.close()
+
+	# 所有账号的历史记录一次取回，本次余额一次写入
+	assert calls == ['latest', 'append']
+	assert report.changed_count == 2
+	assert BalanceStore(str(tmp_path / 'balance.db')).latest([(str(n), 'anyrouter') for n in range(1, 4)]) == {
+		(str(n), 'anyrouter'): (10.0, 1.0) for n in range(1, 4)
+	}
@@ -0,0 +1,64 @@
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到 PATH
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from checkin import next_reset_time
+from utils.config import ProviderConfig
+from utils.scheduler import CronSchedule, ResetSchedule, Schedule
+
+
+def test_every_six_hours():
+	cron = CronSchedule.parse('0 */6 * * *')
+
+	assert cron.next_after(datetime(2026, 1, 1, 5, 59, 30)) == datetime(2026, 1, 1, 6, 0)
+	assert cron.next_after(datetime(2026, 1, 1, 6, 0)) == datetime(2026, 1, 1, 12, 0)
+	assert cron.next_after(datetime(2026, 1, 1, 23, 0)) == datetime(2026, 1, 2, 0, 0)
+
+
+def test_weekday_and_month_rollover():
+	# 2026-01-01 是周四，下一个周日是 01-04
+	assert CronSchedule.parse('30 8 * * 0').next_after(datetime(2026, 1, 1)) == datetime(2026, 1, 4, 8, 30)
+	assert CronSchedule.parse('0 0 1 * *').next_after(datetime(2026, 1, 15)) == datetime(2026, 2, 1)
+	assert CronSchedule.parse('15 1,13 * 3 *').next_after(datetime(2026, 1, 1)) == datetime(2026, 3, 1, 1, 15)
+
+
+def test_invalid_expressions():
+	with pytest.raises(ValueError):
+		CronSchedule.parse('0 */6 * *')
+	with pytest.raises(ValueError):
+		CronSchedule.parse('60 * * * *')
+
+
+def test_interval_with_jitter():
+	now = datetime(2026, 1, 1)
+	next_run = Schedule(interval=3600, jitter=60).next_run(now)
+
+	assert 3600 <= (next_run - now).total_seconds() <= 3660
+
+
+def test_reset_schedule_uses_earliest_reset():
+	schedule = ResetSchedule(delay=300, retry_interval=900)
+	resets = [datetime(2026, 1, 2, 0, 0), datetime(2026, 1, 1, 16, 0)]
+
+	assert schedule.next_reset_run(resets) == datetime(2026, 1, 1, 16, 5)
+	assert 450 <= schedule.retry_delay(1) <= 900
+	assert 900 <= schedule.retry_delay(2) <= 1800
+
+
+def test_next_reset_time_uses_account_providers(monkeypatch):
+	now = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+	utc = ProviderConfig(name='utc', domain='https://utc', reset_timezone='UTC')
+	beijing = ProviderConfig(name='beijing', domain='https://beijing')
+
+	# 只考虑账号用到的服务商，其他服务商更早的重置时间不会唤醒常驻进程
+	assert next_reset_time(now, [utc]) == datetime(2026, 1, 2, 0, 0, tzinfo=timezone.utc)
+	assert next_reset_time(now, [utc, beijing]) == datetime(2026, 1, 1, 16, 0, tzinfo=timezone.utc)
+	# 没有账号信息时使用所有服务商（内置服务商都按北京时间零点重置）
+	monkeypatch.delenv('PROVIDERS', raising=False)
+	assert next_reset_time(now, []) == datetime(2026, 1, 1, 16, 0, tzinfo=timezone.utc)
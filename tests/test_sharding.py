@@ -0,0 +1,80 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到 PATH
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import checkin
+from utils.metrics import MetricsRegistry
+from utils.sharding import Shard, ShardResultWriter, find_shard_results, shard_of
+
+
+def test_assignment_is_stable_and_partitions_accounts():
+	accounts = [('anyrouter', str(i)) for i in range(200)] + [('agentrouter', str(i)) for i in range(200)]
+	shards = [Shard(i, 4) for i in range(1, 5)]
+
+	owners = [[shard for shard in shards if shard.owns(*account)] for account in accounts]
+
+	assert all(len(owner) == 1 for owner in owners)
+	# 分配只取决于 (provider, api_user)，与账号顺序无关
+	assert [shard_of(*account, 4) for account in reversed(accounts)] == [owner[0].index for owner in reversed(owners)]
+	assert all(sum(1 for owner in owners if owner[0] == shard) > 50 for shard in shards)
+
+
+def test_parse_shard():
+	assert Shard.parse('2/4') == Shard(2, 4)
+	for value in ('0/4', '5/4', '4', 'a/b', '1/0'):
+		with pytest.raises(ValueError):
+			Shard.parse(value)
+
+
+def test_results_are_only_visible_after_close(tmp_path):
+	writer = ShardResultWriter(Shard(2, 3), str(tmp_path))
+	writer.write({'index': 4, 'name': 'A', 'success': True})
+	assert find_shard_results(str(tmp_path)) == []
+
+	writer.close({'success': 1})
+	(result,) = find_shard_results(str(tmp_path))
+	assert (result.index, result.count) == (2, 3)
+	assert list(result.records()) == [{'index': 4, 'name': 'A', 'success': True}]
+
+	result.mark_merged()
+	assert find_shard_results(str(tmp_path)) == []
+
+
+def test_merge_records_metrics_for_all_shards(tmp_path, monkeypatch):
+	results_dir = str(tmp_path / 'shards')
+	for shard, records in ((Shard(1, 2), [(0, True, 10.0)]), (Shard(2, 2), [(1, True, 20.0), (2, False, None)])):
+		writer = ShardResultWriter(shard, results_dir)
+		for index, success, quota in records:
+			record = {'index': index, 'name': f'Account {index + 1}', 'provider': 'anyrouter', 'api_user': str(index)}
+			record.update(success=success, already_checked=False)
+			if quota is not None:
+				record.update(quota=quota, used=1.0, display=f'${quota}')
+			writer.write(record)
+		writer.close({'success': 1})
+	textfile = tmp_path / 'anyrouter.prom'
+	monkeypatch.setenv('BALANCE_DB_FILE', str(tmp_path / 'balance.db'))
+	monkeypatch.setenv('NOTIFY_OUTBOX_FILE', '')
+	monkeypatch.setenv('METRICS_TEXTFILE', str(textfile))
+
+	async def push(title, content, msg_type='text'):
+		return [{'channel': 'wecom', 'name': 'WECOM', 'success': True, 'elapsed': 0.1, 'error': None}]
+
+	monkeypatch.setattr(
+		checkin, 'get_notification_kit', lambda: type('Kit', (), {'apush_message': staticmethod(push)})()
+	)
+	metrics = MetricsRegistry()
+
+	assert asyncio.run(checkin.merge_shards(results_dir, metrics)) == 0
+
+	rendered = metrics.render()
+	assert 'anyrouter_checkin_total{provider="anyrouter",result="success"} 2' in rendered
+	assert 'anyrouter_checkin_total{provider="anyrouter",result="failure"} 1' in rendered
+	assert 'anyrouter_account_quota{account="1",provider="anyrouter"} 20' in rendered
+	assert 'anyrouter_notify_total{channel="wecom",result="success"} 1' in rendered
+	assert textfile.read_text(encoding='utf-8') == rendered
@@ -0,0 +1,17 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+
+
+def test_import_does_not_load_playwright_or_notification_backends():
+	probe = (
+		'import json, sys\n'
+		'import checkin\n'
+		'print(json.dumps([m for m in sys.modules if m.split(".")[0] in ("playwright", "smtplib") or m == "utils.notify"]))'
+	)
+	result = subprocess.run([sys.executable, '-c', probe], cwd=project_root, capture_output=True, text=True, check=True)
+
+	assert json.loads(result.stdout.strip().splitlines()[-1]) == []
@@ -0,0 +1,186 @@
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到 PATH
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from checkin import block_unneeded_resources, wait_for_waf_cookies
+
+ORIGIN = 'https://anyrouter.test/login'
+WAF_COOKIES = {'acw_tc': 'tc', 'cdn_sec_tc': 'sec', 'acw_sc__v2': 'v2'}
+
+
+class FakeRequest:
+	def __init__(self, url: str, resource_type: str):
+		self.url = url
+		self.resource_type = resource_type
+
+
+class FakeRoute:
+	def __init__(self, url: str, resource_type: str):
+		self.request = FakeRequest(url, resource_type)
+		self.result = None
+
+	async def abort(self):
+		self.result = 'abort'
+
+	async def continue_(self):
+		self.result = 'continue'
+
+
+class FakeContext:
+	"""只记录注册的路由处理函数，cookies 由测试直接设置"""
+
+	def __init__(self):
+		self.handlers = []
+		self.jar = {}
+
+	async def route(self, pattern, handler):
+		self.handlers.append((pattern, handler))
+
+	async def cookies(self):
+		return [{'name': name, 'value': value} for name, value in self.jar.items()]
+
+
+class FakePage:
+	def __init__(self):
+		self.context = FakeContext()
+		self.listeners = []
+
+	def on(self, event, callback):
+		self.listeners.append((event, callback))
+
+	def remove_listener(self, event, callback):
+		self.listeners.remove((event, callback))
+
+	def respond(self, cookies: dict):
+		"""模拟挑战脚本写入 cookie 后页面重新加载"""
+		self.context.jar.update(cookies)
+		for event, callback in list(self.listeners):
+			if event == 'response':
+				callback(object())
+
+
+def route_results(requests, resource_types=('image', 'font'), url_patterns=('analytics',), origin=ORIGIN) -> list:
+	async def run():
+		context = FakeContext()
+		await block_unneeded_resources(context, resource_types, url_patterns, origin=origin)
+		results = []
+		for url, resource_type in requests:
+			route = FakeRoute(url, resource_type)
+			for _, handler in context.handlers:
+				await handler(route)
+			results.append(route.result)
+		return results
+
+	return asyncio.run(run())
+
+
+def test_blocked_resource_types_are_aborted():
+	results = route_results(
+		[
+			('https://anyrouter.test/logo.png', 'image'),
+			('https://cdn.test/font.woff2', 'font'),
+			('https://anyrouter.test/style.css', 'stylesheet'),
+		]
+	)
+
+	assert results == ['abort', 'abort', 'continue']
+
+
+def test_blocked_url_patterns_are_aborted_but_documents_pass():
+	results = route_results(
+		[
+			('https://www.google-analytics.test/analytics.js', 'script'),
+			('https://stats.test/analytics/collect', 'xhr'),
+			('https://anyrouter.test/analytics', 'document'),
+		]
+	)
+
+	assert results == ['abort', 'abort', 'continue']
+
+
+def test_first_party_scripts_are_never_blocked():
+	results = route_results(
+		[
+			('https://anyrouter.test/static/analytics.js', 'script'),
+			('https://anyrouter.test/static/analytics.js', 'xhr'),
+			('http://anyrouter.test/static/analytics.js', 'script'),
+			('https://cdn.anyrouter.test/analytics.js', 'script'),
+		],
+		resource_types=('script',),
+	)
+
+	# 只放行与服务商同源的脚本，同源的其他请求和其他域名的脚本照常拦截
+	assert results == ['continue', 'abort', 'abort', 'abort']
+
+
+def test_nothing_is_routed_when_blocking_is_disabled():
+	async def run():
+		context = FakeContext()
+		await block_unneeded_resources(context, (), (), origin=ORIGIN)
+		return context.handlers
+
+	assert asyncio.run(run()) == []
+
+
+def wait_with(page: FakePage, updates, timeout: float, poll_interval: float) -> tuple[dict, float]:
+	"""updates 为 (延迟, cookies, 是否触发 response 事件)，按顺序在等待期间写入"""
+
+	async def run():
+		async def apply():
+			for delay, cookies, respond in updates:
+				await asyncio.sleep(delay)
+				if respond:
+					page.respond(cookies)
+				else:
+					page.context.jar.update(cookies)
+
+		task = asyncio.create_task(apply())
+		start = time.perf_counter()
+		try:
+			return await wait_for_waf_cookies(page, timeout, poll_interval), time.perf_counter() - start
+		finally:
+			task.cancel()
+
+	return asyncio.run(run())
+
+
+def test_returns_as_soon_as_cookies_appear():
+	page = FakePage()
+
+	cookies, elapsed = wait_with(page, [(0.05, WAF_COOKIES, True)], timeout=5, poll_interval=5)
+
+	# 页面响应后立即检查，不必等到下一次轮询
+	assert cookies == WAF_COOKIES
+	assert elapsed < 1
+	assert page.listeners == []
+
+
+def test_timeout_returns_partial_cookies():
+	page = FakePage()
+	page.context.jar.update({'acw_tc': 'tc', 'session': 'other'})
+
+	cookies, elapsed = wait_with(page, [], timeout=0.2, poll_interval=0.05)
+
+	assert cookies == {'acw_tc': 'tc'}
+	assert 0.19 <= elapsed < 1
+	assert page.listeners == []
+
+
+def test_partial_cookies_keep_waiting_until_complete():
+	page = FakePage()
+	updates = [
+		(0.02, {'acw_tc': 'tc'}, True),
+		(0.02, {'cdn_sec_tc': 'sec'}, True),
+		# 没有页面响应时靠轮询发现最后一个 cookie
+		(0.05, {'acw_sc__v2': 'v2'}, False),
+	]
+
+	cookies, elapsed = wait_with(page, updates, timeout=5, poll_interval=0.05)
+
+	assert cookies == WAF_COOKIES
+	assert elapsed < 1
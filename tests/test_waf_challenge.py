@@ -0,0 +1,114 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import httpx
+
+# 添加项目根目录到 PATH
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import checkin
+from checkin import PreparedCheckin, RunContext, complete_checkin, refresh_balance_only
+from utils.config import AccountConfig, ProviderConfig
+from utils.http_pool import ClientPool
+from utils.waf_cache import WafCookieCache
+
+PROVIDER = ProviderConfig(name='anyrouter', domain='https://anyrouter.test', bypass_method='waf_cookies')
+CHALLENGE = '<html><script>var arg1="3F2A";</script></html>'
+
+
+class MockClientPool(ClientPool):
+	"""所有请求交给 handler 处理：带过期 WAF cookie 的请求返回挑战页"""
+
+	def __init__(self):
+		super().__init__()
+		self.requests = []
+		self.client = httpx.AsyncClient(transport=httpx.MockTransport(self.handle))
+
+	def handle(self, request: httpx.Request) -> httpx.Response:
+		self.requests.append((request.url.path, request.headers['cookie']))
+		if 'acw_sc__v2=old' in request.headers['cookie']:
+			return httpx.Response(200, text=CHALLENGE, headers={'content-type': 'text/html'})
+		if request.url.path == '/api/user/self':
+			return httpx.Response(200, json={'success': True, 'data': {'quota': 5000000, 'used_quota': 500000}})
+		if request.url.path == '/api/user/checkin/status':
+			return httpx.Response(200, json={'success': True, 'data': {'checked': False}})
+		return httpx.Response(200, json={'success': True})
+
+	def get(self, domain, proxy_url=None):
+		return self.client
+
+
+def make_context(monkeypatch):
+	solves = []
+
+	async def solve(account_name, login_url, provider_config, ctx):
+		solves.append(account_name)
+		await asyncio.sleep(0.01)
+		return {'acw_sc__v2': 'new'}
+
+	monkeypatch.setattr(checkin, 'solve_waf_cookies', solve)
+	cache = WafCookieCache(ttl=3600)
+	# 缓存中的 cookies 已通过验证，复用时不再探测
+	cache.set(cache.make_key(PROVIDER.domain, None), {'acw_sc__v2': 'old'})
+	return RunContext(waf_cache=cache, clients=MockClientPool()), solves
+
+
+def prepared(number: int) -> PreparedCheckin:
+	account = AccountConfig(cookies={'session': f's{number}'}, api_user=str(number))
+	return PreparedCheckin(
+		account, f'Account {number}', PROVIDER, '2026-10-18', {'acw_sc__v2': 'old', 'session': f's{number}'}
+	)
+
+
+def test_challenge_evicts_cached_cookies_and_retries_once(monkeypatch):
+	ctx, solves = make_context(monkeypatch)
+
+	success, user_info, already_checked = asyncio.run(complete_checkin(prepared(1), ctx))
+
+	assert (success, already_checked) == (True, False)
+	assert user_info['quota'] == 10.0
+	assert solves == ['Account 1']
+	assert ctx.waf_cache.get(ctx.waf_cache.make_key(PROVIDER.domain, None)).cookies == {'acw_sc__v2': 'new'}
+	# 重试时携带新的 WAF cookies 和账号自己的 cookies
+	assert ('/api/user/checkin', 'acw_sc__v2=new; session=s1') in ctx.clients.requests
+
+
+def test_concurrent_rejections_solve_once(monkeypatch):
+	ctx, solves = make_context(monkeypatch)
+
+	async def run():
+		return await asyncio.gather(*(complete_checkin(prepared(number), ctx) for number in range(1, 6)))
+
+	results = asyncio.run(run())
+
+	assert all(success for success, _, _ in results)
+	assert len(solves) == 1
+
+
+def test_balance_refresh_skips_rejected_cookies_without_solving(monkeypatch):
+	ctx, solves = make_context(monkeypatch)
+	account = AccountConfig(cookies={'session': 's1'}, api_user='1')
+
+	user_info = asyncio.run(refresh_balance_only('Account 1', account, PROVIDER, {'session': 's1'}, ctx))
+
+	# 不为已签到账号启动浏览器，被拒绝的 cookies 从缓存中移除，之后的已签到账号直接跳过
+	assert user_info is None
+	assert solves == []
+	assert [path for path, _ in ctx.clients.requests] == ['/api/user/self']
+	assert ctx.waf_cache.get(ctx.waf_cache.make_key(PROVIDER.domain, None)) is None
+
+
+def test_failed_re_solve_reports_failure(monkeypatch):
+	ctx, solves = make_context(monkeypatch)
+
+	async def solve(account_name, login_url, provider_config, ctx):
+		solves.append(account_name)
+		return None
+
+	monkeypatch.setattr(checkin, 'solve_waf_cookies', solve)
+
+	assert asyncio.run(complete_checkin(prepared(1), ctx)) == (False, None, False)
+	assert solves == ['Account 1']
+	assert ctx.waf_cache.get(ctx.waf_cache.make_key(PROVIDER.domain, None)) is None
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+余额历史存储模块：使用 SQLite 按账号记录每次运行的 quota / used_quota
+"""
+
+import os
+import sqlite3
+import time
+from typing import Iterable
+
+DEFAULT_BALANCE_DB_FILE = 'balance_history.db'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS balance_history (
+	account TEXT NOT NULL,
+	provider TEXT NOT NULL,
+	ts REAL NOT NULL,
+	quota REAL NOT NULL,
+	used_quota REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_balance_history_account ON balance_history (account, provider, ts);
+"""
+
+
+class BalanceStore:
+	"""余额历史记录
+
+	每个账号以 (account, provider) 标识，account 使用 api_user，
+	因此调整账号顺序或名称不会影响变化检测。
+	"""
+
+	def __init__(self, path: str = DEFAULT_BALANCE_DB_FILE):
+		self.path = path
+		self.conn = sqlite3.connect(path)
+		self.conn.executescript(_SCHEMA)
+
+	@classmethod
+	def from_env(cls) -> 'BalanceStore':
+		"""从环境变量 BALANCE_DB_FILE 获取数据库路径"""
+		return cls(os.getenv('BALANCE_DB_FILE') or DEFAULT_BALANCE_DB_FILE)
+
+	def latest(self, keys: Iterable[tuple[str, str]]) -> dict[tuple[str, str], tuple[float, float]]:
+		"""获取每个账号最近一次记录的 (quota, used_quota)，没有记录的账号不在结果中
+
+		所有账号写入临时表后用一次查询取回，每个账号的最近记录仍是一次索引查找，
+		历史数据增长不会影响查询耗时。
+		"""
+		with self.conn:
+			self.conn.execute(
+				'CREATE TEMP TABLE IF NOT EXISTS balance_keys (account TEXT, provider TEXT, PRIMARY KEY (account, provider))'
+			)
+			self.conn.execute('DELETE FROM balance_keys')
+			self.conn.executemany('INSERT OR IGNORE INTO balance_keys (account, provider) VALUES (?, ?)', keys)
+			rows = self.conn.execute(
+				'SELECT k.account, k.provider, b.quota, b.used_quota FROM balance_keys k '
+				'JOIN balance_history b ON b.account = k.account AND b.provider = k.provider AND b.ts = ('
+				'SELECT MAX(ts) FROM balance_history WHERE account = k.account AND provider = k.provider)'
+			).fetchall()
+			self.conn.execute('DELETE FROM balance_keys')
+		return {(account, provider): (quota, used) for account, provider, quota, used in rows}
+
+	def append(self, rows: Iterable[tuple[str, str, float, float]], ts: float | None = None):
+		"""在一个事务中批量追加 (account, provider, quota, used_quota)"""
+		ts = ts or time.time()
+		with self.conn:
+			self.conn.executemany(
+				'INSERT INTO balance_history (account, provider, ts, quota, used_quota) VALUES (?, ?, ?, ?, ?)',
+				((account, provider, ts, quota, used) for account, provider, quota, used in rows),
+			)
+
+	def close(self):
+		self.conn.close()
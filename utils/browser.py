@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+共享浏览器模块：一次运行只启动一个 Chromium，每个账号使用独立的无痕上下文
+"""
+
+import asyncio
+import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+	from playwright.async_api import Browser, BrowserContext, Playwright
+
+BROWSER_ARGS = [
+	'--disable-blink-features=AutomationControlled',
+	'--disable-dev-shm-usage',
+	'--disable-web-security',
+	'--disable-features=VizDisplayCompositor',
+	'--no-sandbox',
+]
+
+
+class SharedBrowser:
+	"""在多个账号之间共享的 Playwright 浏览器
+
+	浏览器在第一次需要时才启动，Playwright 也在此时才导入（无需 WAF 的运行不会加载 Playwright），
+	每次调用 new_context() 都会得到一个互相隔离的无痕上下文。
+	"""
+
+	def __init__(self, headless: bool = True, proxy: dict | None = None):
+		self.headless = headless
+		self.proxy = proxy
+		self._playwright: 'Playwright | None' = None
+		self._browser: 'Browser | None' = None
+		self._lock = asyncio.Lock()
+
+	async def get_browser(self) -> 'Browser':
+		"""获取浏览器实例，首次调用时启动"""
+		if self._browser and self._browser.is_connected():
+			return self._browser
+
+		async with self._lock:
+			if self._browser and self._browser.is_connected():
+				return self._browser
+
+			start = time.perf_counter()
+			if self._playwright is None:
+				from playwright.async_api import async_playwright
+
+				self._playwright = await async_playwright().start()
+
+			launch_args = {'headless': self.headless, 'args': BROWSER_ARGS}
+			if self.proxy:
+				launch_args['proxy'] = self.proxy
+
+			self._browser = await self._playwright.chromium.launch(**launch_args)
+			print(f'🚀 [浏览器] 共享浏览器已启动，耗时 {time.perf_counter() - start:.2f}s')
+			return self._browser
+
+	async def new_context(self, **kwargs) -> 'BrowserContext':
+		"""创建一个新的无痕浏览器上下文"""
+		browser = await self.get_browser()
+		return await browser.new_context(**kwargs)
+
+	async def close(self):
+		"""关闭浏览器并停止 Playwright 驱动"""
+		async with self._lock:
+			if self._browser:
+				try:
+					await self._browser.close()
+				except Exception as e:
+					print(f'⚠️ [警告] 关闭浏览器失败: {e}')
+				self._browser = None
+			if self._playwright:
+				try:
+					await self._playwright.stop()
+				except Exception as e:
+					print(f'⚠️ [警告] 停止 Playwright 失败: {e}')
+				self._playwright = None
+
+	async def __aenter__(self) -> 'SharedBrowser':
+		return self
+
+	async def __aexit__(self, *exc_info):
+		await self.close()
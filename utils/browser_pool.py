@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+浏览器工作进程池：多个子进程各自运行一个 Playwright 浏览器，为主进程求解 WAF cookies
+
+单个进程中所有浏览器上下文都经过同一个 Playwright 驱动和事件循环，WAF 账号很多时会成为瓶颈；
+工作进程池把求解分摊到多个 CPU 核心上，并定期回收工作进程以控制 Chromium 的内存泄漏。
+"""
+
+import asyncio
+import multiprocessing
+import os
+import sys
+import time
+from typing import Awaitable, Callable
+
+from utils.browser import SharedBrowser
+
+# 工作进程启动（导入模块并回报就绪）的最长等待时间（秒）
+WORKER_STARTUP_TIMEOUT = 60.0
+# 通知工作进程退出后等待其关闭浏览器的时间（秒），超时后强制结束
+WORKER_STOP_TIMEOUT = 10.0
+
+Solver = Callable[[SharedBrowser, dict], Awaitable[dict | None]]
+
+
+def process_tree_rss_mb(pid: int) -> float | None:
+	"""进程及其所有子进程（Chromium 的各个进程）的常驻内存合计（MB），非 Linux 系统返回 None"""
+	if not os.path.isdir('/proc'):
+		return None
+	children: dict[int, list[int]] = {}
+	rss_pages: dict[int, int] = {}
+	for entry in os.listdir('/proc'):
+		if not entry.isdigit():
+			continue
+		try:
+			with open(f'/proc/{entry}/stat', encoding='utf-8') as f:
+				# 进程名可能包含空格和括号，从最后一个 ')' 之后开始解析
+				fields = f.read().rsplit(')', 1)[1].split()
+		except (OSError, IndexError):
+			continue
+		children.setdefault(int(fields[1]), []).append(int(entry))
+		rss_pages[int(entry)] = int(fields[21])
+	if pid not in rss_pages:
+		return None
+	total, stack = 0, [pid]
+	while stack:
+		current = stack.pop()
+		total += rss_pages.get(current, 0)
+		stack.extend(children.get(current, ()))
+	return total * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+
+
+def _worker_main(conn, solver: Solver, headless: bool, proxy: dict | None):
+	"""工作进程入口"""
+	if hasattr(sys.stdout, 'reconfigure'):
+		# 日志按行输出，与主进程的日志交错时保持完整
+		sys.stdout.reconfigure(line_buffering=True)
+	try:
+		asyncio.run(_serve(conn, solver, headless, proxy))
+	except KeyboardInterrupt:
+		pass
+
+
+async def _serve(conn, solver: Solver, headless: bool, proxy: dict | None):
+	async with SharedBrowser(headless=headless, proxy=proxy) as browser:
+		conn.send({'type': 'ready'})
+		while True:
+			try:
+				request = await asyncio.to_thread(conn.recv)
+			except EOFError:
+				# 主进程已退出
+				return
+			if request is None:
+				return
+			try:
+				conn.send({'type': 'result', 'cookies': await solver(browser, request)})
+			except Exception as e:
+				conn.send({'type': 'error', 'error': f'{type(e).__name__}: {e}'})
+
+
+class _Worker:
+	"""主进程中对一个工作进程的引用，进程在第一次使用时才启动"""
+
+	def __init__(self, number: int):
+		self.number = number
+		self.process = None
+		self.conn = None
+		self.solves = 0
+
+	@property
+	def alive(self) -> bool:
+		return self.process is not None and self.process.is_alive()
+
+	def start(self, mp_context, solver: Solver, headless: bool, proxy: dict | None):
+		parent_conn, child_conn = mp_context.Pipe()
+		self.process = mp_context.Process(
+			target=_worker_main,
+			args=(child_conn, solver, headless, proxy),
+			name=f'browser-worker-{self.number}',
+			daemon=True,
+		)
+		self.process.start()
+		child_conn.close()
+		self.conn = parent_conn
+		self.solves = 0
+		if not self.conn.poll(WORKER_STARTUP_TIMEOUT) or self.conn.recv().get('type') != 'ready':
+			raise TimeoutError('worker did not become ready')
+
+	def call(self, request: dict, timeout: float) -> dict:
+		# 请求被取消后本线程仍会等待响应，此时 self.conn 可能已换成新进程的连接，只能使用发出请求时的连接
+		conn = self.conn
+		conn.send(request)
+		if not conn.poll(timeout):
+			raise TimeoutError(f'no response within {timeout:.0f}s')
+		return conn.recv()
+
+	def detach(self) -> '_Worker':
+		"""把当前进程移交给返回的新引用，本引用恢复为未启动状态，下次使用时启动新进程"""
+		stale = _Worker(self.number)
+		stale.process, stale.conn = self.process, self.conn
+		self.process = self.conn = None
+		return stale
+
+	def stop(self):
+		"""通知工作进程关闭浏览器后退出，超时或已无响应时强制结束"""
+		if self.process is None:
+			return
+		try:
+			if self.process.is_alive():
+				self.conn.send(None)
+		except (OSError, ValueError):
+			pass
+		self.process.join(WORKER_STOP_TIMEOUT)
+		if self.process.is_alive():
+			self.process.kill()
+			self.process.join()
+		self.conn.close()
+		self.process = None
+		self.conn = None
+
+
+class BrowserWorkerPool:
+	"""WAF 求解工作进程池
+
+	求解请求在队列中等待空闲的工作进程，每个工作进程同一时间只处理一个请求。
+	工作进程在第一次使用时才启动；每次使用前检查进程是否存活，请求超时或进程崩溃时结束并在下次使用时重新启动；
+	处理 max_solves 次请求后，或进程树（含 Chromium）常驻内存超过 max_rss_mb 时回收。
+	solver 必须是模块级的异步函数（工作进程通过 spawn 启动，需要能按名称导入）。
+	"""
+
+	def __init__(
+		self,
+		solver: Solver,
+		size: int,
+		max_solves: int = 50,
+		max_rss_mb: float | None = None,
+		headless: bool = True,
+		proxy: dict | None = None,
+		solve_timeout: float = 120.0,
+	):
+		self.solver = solver
+		self.size = size
+		self.max_solves = max_solves
+		self.max_rss_mb = max_rss_mb
+		self.headless = headless
+		self.proxy = proxy
+		self.solve_timeout = solve_timeout
+		self.recycled = 0
+		self._workers = [_Worker(number) for number in range(1, size + 1)]
+		# 请求被取消后换下、正在后台结束的工作进程
+		self._stopping: set[asyncio.Future] = set()
+		self._idle: asyncio.Queue[_Worker] | None = None
+		# 进程中已有事件循环和线程，fork 不安全
+		self._mp_context = multiprocessing.get_context('spawn')
+
+	@classmethod
+	def from_env(
+		cls, solver: Solver, headless: bool = True, proxy: dict | None = None, solve_timeout: float = 120.0
+	) -> 'BrowserWorkerPool | None':
+		"""从环境变量创建，未启用时返回 None
+
+		- BROWSER_WORKERS: 工作进程数，默认 0（不使用工作进程，在主进程中求解）
+		- BROWSER_WORKER_MAX_SOLVES: 每个工作进程处理多少次请求后回收，默认 50
+		- BROWSER_WORKER_MAX_RSS_MB: 工作进程树的常驻内存上限（MB），超过后回收，默认不限制
+		"""
+
+		def read(name: str, default, cast):
+			value = os.getenv(name)
+			if not value:
+				return default
+			try:
+				return cast(value)
+			except ValueError:
+				print(f'[WARNING] Invalid {name} "{value}", using default {default}')
+				return default
+
+		size = read('BROWSER_WORKERS', 0, int)
+		if size <= 0:
+			return None
+		return cls(
+			solver,
+			size,
+			max_solves=max(1, read('BROWSER_WORKER_MAX_SOLVES', 50, int)),
+			max_rss_mb=read('BROWSER_WORKER_MAX_RSS_MB', 0.0, float) or None,
+			headless=headless,
+			proxy=proxy,
+			solve_timeout=solve_timeout,
+		)
+
+	def _idle_queue(self) -> asyncio.Queue:
+		# 在使用时创建，保证队列属于当前事件循环
+		if self._idle is None:
+			self._idle = asyncio.Queue()
+			for worker in self._workers:
+				self._idle.put_nowait(worker)
+		return self._idle
+
+	async def solve(self, request: dict) -> dict | None:
+		"""由空闲的工作进程处理一个求解请求，返回 WAF cookies，失败时返回 None"""
+		idle = self._idle_queue()
+		worker = await idle.get()
+		try:
+			return await self._solve_with(worker, request)
+		except asyncio.CancelledError:
+			# 等待响应的线程无法取消，进程的下一个响应仍属于这次请求；换下该进程，避免下一个请求收到过期的结果
+			self._discard(worker)
+			raise
+		finally:
+			idle.put_nowait(worker)
+
+	def _discard(self, worker: _Worker):
+		if worker.process is None:
+			return
+		print(f'♻️ [浏览器进程] 请求已取消，回收工作进程 {worker.number}')
+		self.recycled += 1
+		stale = worker.detach()
+		stale.process.kill()
+		future = asyncio.ensure_future(asyncio.to_thread(stale.stop))
+		self._stopping.add(future)
+		future.add_done_callback(self._stopping.discard)
+
+	async def _solve_with(self, worker: _Worker, request: dict) -> dict | None:
+		if not worker.alive:
+			if worker.process is not None:
+				print(f'⚠️ [浏览器进程] 工作进程 {worker.number} 已退出（退出码 {worker.process.exitcode}），重新启动')
+				await asyncio.to_thread(worker.stop)
+			start = time.perf_counter()
+			try:
+				await asyncio.to_thread(worker.start, self._mp_context, self.solver, self.headless, self.proxy)
+			except Exception as e:
+				print(f'❌ [浏览器进程] 工作进程 {worker.number} 启动失败: {e}')
+				await asyncio.to_thread(worker.stop)
+				return None
+			print(
+				f'🚀 [浏览器进程] 工作进程 {worker.number} 已启动（pid {worker.process.pid}），'
+				f'耗时 {time.perf_counter() - start:.2f}s'
+			)
+
+		try:
+			response = await asyncio.to_thread(worker.call, request, self.solve_timeout)
+		except (TimeoutError, EOFError, OSError) as e:
+			print(f'⚠️ [浏览器进程] 工作进程 {worker.number} 无响应（{type(e).__name__}: {e}），结束并在下次使用时重启')
+			await asyncio.to_thread(worker.stop)
+			return None
+
+		worker.solves += 1
+		await self._maybe_recycle(worker)
+		if response.get('type') == 'error':
+			print(f'❌ [浏览器进程] 工作进程 {worker.number} 求解失败: {response["error"]}')
+			return None
+		return response.get('cookies')
+
+	async def _maybe_recycle(self, worker: _Worker):
+		reason = None
+		if worker.solves >= self.max_solves:
+			reason = f'已处理 {worker.solves} 次请求'
+		elif self.max_rss_mb:
+			rss = await asyncio.to_thread(process_tree_rss_mb, worker.process.pid)
+			if rss is not None and rss > self.max_rss_mb:
+				reason = f'内存占用 {rss:.0f} MB 超过 {self.max_rss_mb:.0f} MB'
+		if reason:
+			print(f'♻️ [浏览器进程] 回收工作进程 {worker.number}（{reason}）')
+			self.recycled += 1
+			await asyncio.to_thread(worker.stop)
+
+	async def close(self):
+		"""结束所有工作进程"""
+		await asyncio.gather(*(asyncio.to_thread(worker.stop) for worker in self._workers), *self._stopping)
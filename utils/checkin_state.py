@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+签到状态模块：记录每个账号最近一次确认签到的日期，当天后续运行可跳过签到
+"""
+
+import os
+import sqlite3
+import time
+
+from utils.balance_store import DEFAULT_BALANCE_DB_FILE
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkin_state (
+	account TEXT NOT NULL,
+	provider TEXT NOT NULL,
+	checkin_date TEXT NOT NULL,
+	updated_at REAL NOT NULL,
+	PRIMARY KEY (account, provider)
+);
+"""
+
+
+class CheckinStateStore:
+	"""签到状态存储，与余额历史共用同一个 SQLite 数据库文件
+
+	mark() 只写入内存，flush() 时在一个事务中批量落盘。
+	"""
+
+	def __init__(self, path: str = DEFAULT_BALANCE_DB_FILE):
+		self.path = path
+		self.conn = sqlite3.connect(path)
+		self.conn.executescript(_SCHEMA)
+		self._pending: dict[tuple[str, str], str] = {}
+
+	@classmethod
+	def from_env(cls) -> 'CheckinStateStore | None':
+		"""从环境变量创建，SKIP_CHECKED_ACCOUNTS=false 时禁用"""
+		if os.getenv('SKIP_CHECKED_ACCOUNTS', 'true').lower() not in ['true', '1', 'yes']:
+			return None
+		return cls(os.getenv('BALANCE_DB_FILE') or DEFAULT_BALANCE_DB_FILE)
+
+	def is_checked_in(self, account: str, provider: str, checkin_date: str) -> bool:
+		"""账号在 checkin_date 当天是否已确认签到"""
+		if self._pending.get((account, provider)) == checkin_date:
+			return True
+		row = self.conn.execute(
+			'SELECT checkin_date FROM checkin_state WHERE account = ? AND provider = ?',
+			(account, provider),
+		).fetchone()
+		return row is not None and row[0] == checkin_date
+
+	def mark(self, account: str, provider: str, checkin_date: str):
+		"""记录账号在 checkin_date 已完成签到"""
+		self._pending[(account, provider)] = checkin_date
+
+	def flush(self):
+		"""批量写入待保存的签到状态"""
+		if not self._pending:
+			return
+		now = time.time()
+		with self.conn:
+			self.conn.executemany(
+				'INSERT OR REPLACE INTO checkin_state (account, provider, checkin_date, updated_at) VALUES (?, ?, ?, ?)',
+				((account, provider, checkin_date, now) for (account, provider), checkin_date in self._pending.items()),
+			)
+		self._pending.clear()
+
+	def close(self):
+		self.flush()
+		self.conn.close()
@@ -4,9 +4,56 @@
 """
 
 import json
+import math
 import os
+import re
+import sys
 from dataclasses import dataclass
-from typing import Dict, Literal
+from datetime import datetime, timedelta, timezone, tzinfo
+from typing import Dict, Iterator, Literal
+from zoneinfo import ZoneInfo
+
+# 获取 WAF cookies 时默认拦截的资源类型（WAF 挑战只依赖文档和脚本）
+DEFAULT_BLOCKED_RESOURCE_TYPES = ('image', 'media', 'font')
+# 获取 WAF cookies 时默认拦截的 URL 关键字（统计分析脚本）
+DEFAULT_BLOCKED_URL_PATTERNS = (
+    'google-analytics.com',
+    'googletagmanager.com',
+    'hm.baidu.com',
+    'clarity.ms',
+    'umami',
+    'plausible.io',
+)
+# 服务商签到日期的默认时区和重置时间（new-api 服务端一般按北京时间零点重置签到）
+DEFAULT_RESET_TIMEZONE = '+08:00'
+DEFAULT_RESET_TIME = '00:00'
+
+
+def parse_timezone(value: str) -> tzinfo:
+    """解析时区，支持 "+08:00" 这样的 UTC 偏移和 "Asia/Shanghai" 这样的 IANA 名称，无法识别时抛出 ValueError"""
+    match = re.fullmatch(r'(?:UTC)?([+-])(\d{1,2})(?::?(\d{2}))?', str(value).strip())
+    if match:
+        sign, hours, minutes = match.groups()
+        offset = timedelta(hours=int(hours), minutes=int(minutes or 0))
+        return timezone(-offset if sign == '-' else offset)
+    try:
+        return ZoneInfo(value)
+    except Exception as e:
+        raise ValueError(f'Unknown timezone "{value}"') from e
+
+
+def parse_positive(value, cast, field: str, provider: str):
+    """将服务商配置中的数值转换为 cast 类型的正数，未设置时返回 None，格式错误或不是正数时警告并忽略"""
+    if value is None:
+        return None
+    try:
+        number = cast(value)
+    except (TypeError, ValueError):
+        number = None
+    if number is None or not (0 < number < math.inf):
+        print(f'[WARNING] Invalid {field} "{value}" for provider "{provider}", ignoring')
+        return None
+    return number
 
 
 @dataclass
@@ -22,6 +69,27 @@ class ProviderConfig:
     user_info_path: str = '/api/user/self'
     api_user_key: str = 'new-api-user'
     bypass_method: Literal['waf_cookies'] | None = None
+    blocked_resource_types: tuple[str, ...] = DEFAULT_BLOCKED_RESOURCE_TYPES
+    blocked_url_patterns: tuple[str, ...] = DEFAULT_BLOCKED_URL_PATTERNS
+    reset_timezone: str = DEFAULT_RESET_TIMEZONE
+    reset_time: str = DEFAULT_RESET_TIME
+    # 每秒最多请求数（HTTP 请求和浏览器导航合计），为空时不限速；rate_burst 为允许的突发请求数
+    rate_limit: float | None = None
+    rate_burst: int | None = None
+
+    def __post_init__(self):
+        # 重置时区和时间在加载配置时检查一次，无效时改用默认值，之后计算签到日期时不再重复警告
+        try:
+            parse_timezone(self.reset_timezone)
+        except ValueError:
+            print(f'[WARNING] Unknown reset_timezone "{self.reset_timezone}" for provider "{self.name}", '
+                  f'using {DEFAULT_RESET_TIMEZONE}')
+            self.reset_timezone = DEFAULT_RESET_TIMEZONE
+        try:
+            self.reset_offset()
+        except (ValueError, AttributeError):
+            print(f'[WARNING] Invalid reset_time "{self.reset_time}" for provider "{self.name}", using {DEFAULT_RESET_TIME}')
+            self.reset_time = DEFAULT_RESET_TIME
 
     @classmethod
     def from_dict(cls, name: str, data: dict) -> 'ProviderConfig':
@@ -30,6 +98,9 @@ class ProviderConfig:
         配置格式:
         - 基础: {"domain": "https://example.com"}
         - 完整: {"domain": "https://example.com", "login_path": "/login", "api_user_key": "x-api-user", "bypass_method": "waf_cookies", ...}
+        - 资源拦截: {"blocked_resource_types": ["image", "font"], "blocked_url_patterns": ["analytics"]}，设置为 [] 时不拦截
+        - 签到重置时间: {"reset_timezone": "+08:00", "reset_time": "00:00"}，时区也可以是 "Asia/Shanghai"
+        - 限流: {"rate_limit": 2, "rate_burst": 5}，每秒最多 2 个请求，最多连续突发 5 个
         """
         return cls(
             name=name,
@@ -42,6 +113,14 @@ class ProviderConfig:
             user_info_path=data.get('user_info_path', '/api/user/self'),
             api_user_key=data.get('api_user_key', 'new-api-user'),
             bypass_method=data.get('bypass_method'),
+            blocked_resource_types=tuple(data.get(
+                'blocked_resource_types', DEFAULT_BLOCKED_RESOURCE_TYPES)),
+            blocked_url_patterns=tuple(data.get(
+                'blocked_url_patterns', DEFAULT_BLOCKED_URL_PATTERNS)),
+            reset_timezone=data.get('reset_timezone', DEFAULT_RESET_TIMEZONE),
+            reset_time=data.get('reset_time', DEFAULT_RESET_TIME),
+            rate_limit=parse_positive(data.get('rate_limit'), float, 'rate_limit', name),
+            rate_burst=parse_positive(data.get('rate_burst'), int, 'rate_burst', name),
         )
 
     def needs_waf_cookies(self) -> bool:
@@ -52,6 +131,25 @@ class ProviderConfig:
         """判断是否需要手动调用签到接口"""
         return self.bypass_method == 'waf_cookies'
 
+    def reset_offset(self) -> timedelta:
+        """每日签到重置时间相对于零点的偏移"""
+        hours, minutes = self.reset_time.split(':')
+        return timedelta(hours=int(hours), minutes=int(minutes))
+
+    def current_checkin_date(self, now: datetime | None = None) -> str:
+        """获取当前所属的签到日期（YYYY-MM-DD），以服务商时区的重置时间为日期分界"""
+        now = now or datetime.now(timezone.utc)
+        local = now.astimezone(parse_timezone(self.reset_timezone)) - self.reset_offset()
+        return local.date().isoformat()
+
+    def next_reset_after(self, now: datetime) -> datetime:
+        """获取 now 之后的下一次签到重置时间（带时区）"""
+        local = now.astimezone(parse_timezone(self.reset_timezone))
+        reset = local.replace(hour=0, minute=0, second=0, microsecond=0) + self.reset_offset()
+        while reset <= local:
+            reset += timedelta(days=1)
+        return reset
+
 
 @dataclass
 class AppConfig:
@@ -136,9 +234,9 @@ class AppConfig:
         return self.providers.get(name)
 
 
-@dataclass
+@dataclass(slots=True)
 class AccountConfig:
-    """账号配置"""
+    """账号配置（使用 __slots__，大量账号时占用更少内存）"""
 
     cookies: dict | str
     api_user: str
@@ -148,7 +246,8 @@ class AccountConfig:
     @classmethod
     def from_dict(cls, data: dict, index: int) -> 'AccountConfig':
         """从字典创建 AccountConfig"""
-        provider = data.get('provider', 'anyrouter')
+        # 服务商名称在所有账号之间重复，驻留后每个账号只保存同一个字符串的引用
+        provider = sys.intern(data.get('provider', 'anyrouter'))
         name = data.get('name', f'Account {index + 1}')
 
         return cls(cookies=data['cookies'], api_user=data['api_user'], provider=provider, name=name if name else None)
@@ -158,6 +257,19 @@ class AccountConfig:
         return self.name if self.name else f'Account {index + 1}'
 
 
+def validate_account_dict(data) -> str | None:
+    """检查单个账号配置，返回错误描述，没有问题时返回 None"""
+    if not isinstance(data, dict):
+        return 'configuration format is incorrect'
+    if 'cookies' not in data or 'api_user' not in data:
+        return 'missing required fields (cookies, api_user)'
+    if 'name' in data and not data['name']:
+        return 'name field cannot be empty'
+    if not isinstance(data.get('provider', 'anyrouter'), str):
+        return 'provider field must be a string'
+    return None
+
+
 def load_accounts_config() -> list[AccountConfig] | None:
     """从环境变量加载账号配置"""
     accounts_str = os.getenv('ANYROUTER_ACCOUNTS')
@@ -174,18 +286,9 @@ def load_accounts_config() -> list[AccountConfig] | None:
 
         accounts = []
         for i, account_dict in enumerate(accounts_data):
-            if not isinstance(account_dict, dict):
-                print(
-                    f'ERROR: Account {i + 1} configuration format is incorrect')
-                return None
-
-            if 'cookies' not in account_dict or 'api_user' not in account_dict:
-                print(
-                    f'ERROR: Account {i + 1} missing required fields (cookies, api_user)')
-                return None
-
-            if 'name' in account_dict and not account_dict['name']:
-                print(f'ERROR: Account {i + 1} name field cannot be empty')
+            error = validate_account_dict(account_dict)
+            if error:
+                print(f'ERROR: Account {i + 1} {error}')
                 return None
 
             accounts.append(AccountConfig.from_dict(account_dict, i))
@@ -194,3 +297,85 @@ def load_accounts_config() -> list[AccountConfig] | None:
     except Exception as e:
         print(f'ERROR: Account configuration format is incorrect: {e}')
         return None
+
+
+def iter_accounts_file(path: str) -> Iterator[tuple[int, AccountConfig]]:
+    """逐行读取 JSONL 账号文件，产出 (账号序号, AccountConfig)
+
+    每行一个账号 JSON 对象，空行和以 # 开头的行会被忽略。某一行格式错误时只跳过该行并打印行号，
+    不影响其余账号。账号序号取自所在的行（第 N 行的序号为 N - 1，默认名称为 Account N），
+    跳过的行不会使后续账号的序号、名称和日志错位。
+    """
+    with open(path, encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            try:
+                data = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f'ERROR: {path}:{line_number} invalid JSON ({e.msg}), skipping')
+                continue
+            error = validate_account_dict(data)
+            if error:
+                print(f'ERROR: {path}:{line_number} account {error}, skipping')
+                continue
+            yield line_number - 1, AccountConfig.from_dict(data, line_number - 1)
+
+
+class AccountSource:
+    """账号来源：ANYROUTER_ACCOUNTS_FILE 指定的 JSONL 文件，或 ANYROUTER_ACCOUNTS 环境变量
+
+    文件来源每次迭代都重新打开文件逐行解析，内存占用与账号数量无关；
+    环境变量来源沿用 load_accounts_config，任一账号配置错误时整体加载失败。
+    """
+
+    def __init__(self, path: str | None = None, accounts: list[AccountConfig] | None = None):
+        self.path = path
+        self.accounts = accounts
+
+    @classmethod
+    def from_env(cls) -> 'AccountSource | None':
+        path = os.getenv('ANYROUTER_ACCOUNTS_FILE')
+        if path:
+            if not os.path.isfile(path):
+                print(f'ERROR: ANYROUTER_ACCOUNTS_FILE "{path}" not found')
+                return None
+            return cls(path=path)
+        accounts = load_accounts_config()
+        return cls(accounts=accounts) if accounts else None
+
+    def __iter__(self) -> Iterator[tuple[int, AccountConfig]]:
+        if self.path:
+            return iter_accounts_file(self.path)
+        return enumerate(self.accounts or [])
+
+    def count(self) -> int:
+        """账号数量（文件来源只统计非空行，不解析 JSON，格式错误的行也计入）"""
+        if not self.path:
+            return len(self.accounts or [])
+        with open(self.path, encoding='utf-8') as f:
+            return sum(1 for line in f if line.strip() and not line.lstrip().startswith('#'))
+
+    def providers(self) -> set[str]:
+        """账号引用的服务商名称（文件来源逐行读取，只取 provider 字段，格式错误的行直接忽略）"""
+        if not self.path:
+            return {account.provider for account in self.accounts or []}
+        providers = set()
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                try:
+                    data = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if isinstance(data, dict):
+                    providers.add(data.get('provider', 'anyrouter'))
+        return providers
+
+    def describe(self) -> str:
+        if self.path:
+            return f'账号文件 {self.path}'
+        return f'环境变量 ANYROUTER_ACCOUNTS（{len(self.accounts or [])} 个账号）'
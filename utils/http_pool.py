@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+HTTP 连接池模块：每个服务商域名（+ 代理）在整个运行期间共用一个 httpx.AsyncClient
+"""
+
+import os
+from http import cookiejar
+
+import httpx
+
+from utils.rate_limit import RateLimiters
+from utils.resilience import CircuitBreakers, ResilientTransport, RetryPolicy
+
+DEFAULT_MAX_CONNECTIONS = 100
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 20
+DEFAULT_KEEPALIVE_EXPIRY = 30.0
+
+
+class _RejectAllCookiesPolicy(cookiejar.DefaultCookiePolicy):
+	"""拒绝保存任何 cookie，避免共享客户端在不同账号之间串用 session"""
+
+	netscape = True
+	rfc2965 = hide_cookie2 = False
+
+	def set_ok(self, cookie, request):
+		return False
+
+	def return_ok(self, cookie, request):
+		return False
+
+
+def format_cookie_header(cookies: dict) -> str:
+	"""将 cookies 字典转换为 Cookie 请求头"""
+	return '; '.join(f'{key}={value}' for key, value in cookies.items())
+
+
+class ClientPool:
+	"""按 (域名, 代理) 复用的 AsyncClient 池
+
+	客户端不保存 cookie，账号 cookies 和 api_user 请求头需要在每个请求中单独携带，
+	这样同一服务商的并发账号可以共用 HTTP/2 连接。
+	所有请求都经过按域名的令牌桶限流和熔断器，幂等请求按 retry 策略重试。
+	"""
+
+	def __init__(
+		self,
+		max_connections: int = DEFAULT_MAX_CONNECTIONS,
+		max_keepalive_connections: int = DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+		keepalive_expiry: float = DEFAULT_KEEPALIVE_EXPIRY,
+		timeout: float = 30.0,
+		retry: RetryPolicy | None = None,
+		breakers: CircuitBreakers | None = None,
+	):
+		self.limits = httpx.Limits(
+			max_connections=max_connections,
+			max_keepalive_connections=max_keepalive_connections,
+			keepalive_expiry=keepalive_expiry,
+		)
+		self.timeout = timeout
+		self.retry = retry or RetryPolicy()
+		self.breakers = breakers or CircuitBreakers()
+		# 浏览器导航也使用同一组令牌桶，见 checkin.pace_navigations
+		self.limiters = RateLimiters()
+		# 新建客户端时注册的 httpx 响应钩子（如指标统计）
+		self.response_hooks: list = []
+		self._clients: dict[tuple[str, str | None], httpx.AsyncClient] = {}
+
+	@classmethod
+	def from_env(cls) -> 'ClientPool':
+		"""从环境变量创建连接池
+
+		- HTTP_MAX_CONNECTIONS: 每个客户端的最大连接数
+		- HTTP_MAX_KEEPALIVE_CONNECTIONS: 每个客户端保持的空闲连接数
+		- HTTP_KEEPALIVE_EXPIRY: 空闲连接保持时间（秒）
+		- 重试和熔断参数见 RetryPolicy.from_env / CircuitBreakers.from_env
+		"""
+
+		def read(name: str, default, cast):
+			value = os.getenv(name)
+			if not value:
+				return default
+			try:
+				return cast(value)
+			except ValueError:
+				print(f'[WARNING] Invalid {name} "{value}", using default {default}')
+				return default
+
+		return cls(
+			max_connections=read('HTTP_MAX_CONNECTIONS', DEFAULT_MAX_CONNECTIONS, int),
+			max_keepalive_connections=read('HTTP_MAX_KEEPALIVE_CONNECTIONS', DEFAULT_MAX_KEEPALIVE_CONNECTIONS, int),
+			keepalive_expiry=read('HTTP_KEEPALIVE_EXPIRY', DEFAULT_KEEPALIVE_EXPIRY, float),
+			retry=RetryPolicy.from_env(),
+			breakers=CircuitBreakers.from_env(),
+		)
+
+	def get(self, domain: str, proxy_url: str | None = None) -> httpx.AsyncClient:
+		"""获取指定域名和代理对应的客户端，不存在时创建"""
+		key = (domain.rstrip('/'), proxy_url)
+		client = self._clients.get(key)
+		if client is None or client.is_closed:
+			transport = httpx.AsyncHTTPTransport(http2=True, limits=self.limits, proxy=proxy_url)
+			client = httpx.AsyncClient(
+				timeout=self.timeout,
+				transport=ResilientTransport(transport, self.retry, self.breakers, self.limiters),
+				# 直接传入 CookieJar：传入 httpx.Cookies 时会被复制到使用默认策略的新 CookieJar 中
+				cookies=cookiejar.CookieJar(policy=_RejectAllCookiesPolicy()),
+				event_hooks={'response': list(self.response_hooks)},
+			)
+			self._clients[key] = client
+		return client
+
+	def limiter(self, domain: str):
+		"""获取服务商域名的令牌桶"""
+		return self.limiters.get(httpx.URL(domain).host)
+
+	def is_available(self, domain: str) -> bool:
+		"""服务商域名当前是否未被熔断"""
+		return self.breakers.get(httpx.URL(domain).host).available()
+
+	async def aclose(self):
+		"""关闭所有客户端"""
+		clients = list(self._clients.values())
+		self._clients.clear()
+		for client in clients:
+			try:
+				await client.aclose()
+			except Exception as e:
+				print(f'[WARNING] Failed to close HTTP client: {e}')
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Prometheus 指标模块：单次运行后写入 node_exporter textfile，常驻模式下通过 /metrics 提供
+"""
+
+import asyncio
+import os
+import time
+from urllib.parse import urlsplit
+
+import httpx
+
+# 直方图默认分桶（秒），覆盖从 HTTP 请求到浏览器求解 WAF 的耗时范围
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# 指标名 -> (类型, 说明)
+METRICS = {
+	'anyrouter_checkin_total': ('counter', 'Check-in outcomes by provider and result.'),
+	'anyrouter_http_responses_total': ('counter', 'HTTP responses from provider APIs by host and status code.'),
+	'anyrouter_waf_solve_seconds': ('histogram', 'Time spent solving the WAF challenge in the browser.'),
+	'anyrouter_waf_solve_total': ('counter', 'Browser WAF solves by provider and result.'),
+	'anyrouter_waf_cache_lookups_total': (
+		'counter',
+		'WAF cookie cache lookups by provider and result (hit, stale, miss).',
+	),
+	'anyrouter_notify_seconds': ('histogram', 'Notification delivery latency by channel.'),
+	'anyrouter_notify_total': ('counter', 'Notification deliveries by channel and result.'),
+	'anyrouter_account_quota': ('gauge', 'Remaining quota per account in USD.'),
+	'anyrouter_account_used_quota': ('gauge', 'Used quota per account in USD.'),
+	'anyrouter_last_run_timestamp_seconds': ('gauge', 'Unix time when the last run finished.'),
+	'anyrouter_last_run_duration_seconds': ('gauge', 'Duration of the last run.'),
+}
+
+Labels = tuple[tuple[str, str], ...]
+
+
+def _escape(value: str) -> str:
+	return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels: Labels, extra: tuple[str, str] | None = None) -> str:
+	pairs = labels + (extra,) if extra else labels
+	if not pairs:
+		return ''
+	return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+
+def _format_value(value: float) -> str:
+	if value == float('inf'):
+		return '+Inf'
+	return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class MetricsRegistry:
+	"""进程内的指标集合，输出 Prometheus 文本格式（0.0.4）
+
+	常驻模式下在多次运行之间保留，计数器持续累加。
+	"""
+
+	def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+		self.buckets = buckets
+		self._values: dict[str, dict[Labels, float]] = {}
+		# 直方图: 指标名 -> 标签 -> [各分桶计数..., 总和, 次数]
+		self._histograms: dict[str, dict[Labels, list[float]]] = {}
+
+	@staticmethod
+	def _labels(labels: dict) -> Labels:
+		return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+	def inc(self, name: str, value: float = 1.0, **labels):
+		series = self._values.setdefault(name, {})
+		key = self._labels(labels)
+		series[key] = series.get(key, 0.0) + value
+
+	def set(self, name: str, value: float, **labels):
+		self._values.setdefault(name, {})[self._labels(labels)] = value
+
+	def observe(self, name: str, value: float, **labels):
+		series = self._histograms.setdefault(name, {})
+		state = series.setdefault(self._labels(labels), [0.0] * (len(self.buckets) + 2))
+		for i, bound in enumerate(self.buckets):
+			if value <= bound:
+				state[i] += 1
+		state[-2] += value
+		state[-1] += 1
+
+	async def record_http_response(self, response: httpx.Response):
+		"""httpx 响应钩子：按域名和状态码计数"""
+		host = urlsplit(str(response.request.url)).hostname or ''
+		self.inc('anyrouter_http_responses_total', host=host, status=response.status_code)
+
+	def render(self) -> str:
+		lines = []
+		for name in sorted(set(self._values) | set(self._histograms)):
+			metric_type, help_text = METRICS.get(name, ('untyped', ''))
+			lines.append(f'# HELP {name} {help_text}')
+			lines.append(f'# TYPE {name} {metric_type}')
+			for labels, value in sorted(self._values.get(name, {}).items()):
+				lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+			for labels, state in sorted(self._histograms.get(name, {}).items()):
+				for bound, count in zip((*self.buckets, float('inf')), (*state[:-2], state[-1])):
+					lines.append(
+						f'{name}_bucket{_format_labels(labels, ("le", _format_value(bound)))} {_format_value(count)}'
+					)
+				lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(state[-2])}')
+				lines.append(f'{name}_count{_format_labels(labels)} {_format_value(state[-1])}')
+		return '\n'.join(lines) + '\n'
+
+	def write_textfile(self, path: str):
+		"""原子写入 node_exporter textfile，避免被读取到写了一半的文件"""
+		try:
+			tmp_path = f'{path}.{os.getpid()}.tmp'
+			with open(tmp_path, 'w', encoding='utf-8') as f:
+				f.write(self.render())
+			os.replace(tmp_path, path)
+		except Exception as e:
+			print(f'[WARNING] Failed to write metrics textfile: {e}')
+
+	def mark_run(self, duration: float):
+		self.set('anyrouter_last_run_timestamp_seconds', time.time())
+		self.set('anyrouter_last_run_duration_seconds', duration)
+
+
+class MetricsServer:
+	"""只提供 GET /metrics 的极简 HTTP 服务，基于 asyncio，不引入额外依赖"""
+
+	def __init__(self, registry: MetricsRegistry, host: str = '127.0.0.1', port: int = 9105):
+		self.registry = registry
+		self.host = host
+		self.port = port
+		self._server: asyncio.AbstractServer | None = None
+
+	async def start(self):
+		self._server = await asyncio.start_server(self._handle, self.host, self.port)
+		print(f'📈 [指标] 已在 http://{self.host}:{self.port}/metrics 提供 Prometheus 指标')
+
+	async def close(self):
+		if self._server:
+			self._server.close()
+			await self._server.wait_closed()
+			self._server = None
+
+	async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+		try:
+			request_line = await asyncio.wait_for(reader.readline(), timeout=10)
+			# 读完请求头，忽略内容
+			while (await asyncio.wait_for(reader.readline(), timeout=10)) not in (b'\r\n', b'\n', b''):
+				pass
+			parts = request_line.decode('latin-1').split()
+			if len(parts) >= 2 and parts[0] == 'GET' and parts[1].split('?', 1)[0] == '/metrics':
+				status, content_type, body = (
+					'200 OK',
+					'text/plain; version=0.0.4; charset=utf-8',
+					self.registry.render(),
+				)
+			else:
+				status, content_type, body = '404 Not Found', 'text/plain; charset=utf-8', 'Not Found\n'
+			payload = body.encode('utf-8')
+			writer.write(
+				f'HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\nContent-Length: {len(payload)}\r\n'
+				f'Connection: close\r\n\r\n'.encode('latin-1')
+				+ payload
+			)
+			await writer.drain()
+		except Exception:
+			pass
+		finally:
+			writer.close()
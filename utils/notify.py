@@ -1,16 +1,19 @@
+import asyncio
+import math
 import os
-import smtplib
-from email.mime.text import MIMEText
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Literal
 
 import httpx
-from dotenv import load_dotenv
 
-# 加载环境变量
-load_dotenv()
+# 单个渠道的默认超时时间（秒）
+DEFAULT_NOTIFY_TIMEOUT = 30.0
 
 
 class NotificationKit:
+	"""通知渠道集合，创建时从环境变量读取配置（调用方负责先加载 .env）"""
+
 	def __init__(self):
 		self.email_user: str = os.getenv('EMAIL_USER', '')
 		self.email_pass: str = os.getenv('EMAIL_PASS', '')
@@ -21,11 +24,27 @@ class NotificationKit:
 		self.dingding_webhook = os.getenv('DINGDING_WEBHOOK')
 		self.feishu_webhook = os.getenv('FEISHU_WEBHOOK')
 		self.weixin_webhook = os.getenv('WEIXIN_WEBHOOK')
+		# 单个渠道的超时时间（秒），必须为正数
+		self.timeout: float = DEFAULT_NOTIFY_TIMEOUT
+		timeout_str = os.getenv('NOTIFY_TIMEOUT')
+		if timeout_str:
+			try:
+				timeout = float(timeout_str)
+			except ValueError:
+				timeout = math.nan
+			if 0 < timeout < math.inf:
+				self.timeout = timeout
+			else:
+				print(f'[WARNING] Invalid NOTIFY_TIMEOUT "{timeout_str}", using default {DEFAULT_NOTIFY_TIMEOUT:g}s')
 
 	def send_email(self, title: str, content: str, msg_type: Literal['text', 'html'] = 'text'):
 		if not self.email_user or not self.email_pass or not self.email_to:
 			raise ValueError('邮箱配置未设置')
 
+		# 只有配置了邮箱渠道时才需要加载 smtplib 和 email 模块
+		import smtplib
+		from email.mime.text import MIMEText
+
 		# MIMEText 需要 'plain' 或 'html'，而不是 'text'
 		mime_subtype = 'plain' if msg_type == 'text' else 'html'
 		msg = MIMEText(content, mime_subtype, 'utf-8')
@@ -34,35 +53,32 @@ class NotificationKit:
 		msg['Subject'] = title
 
 		smtp_server = self.smtp_server if self.smtp_server else f'smtp.{self.email_user.split("@")[1]}'
-		with smtplib.SMTP_SSL(smtp_server, 465) as server:
+		with smtplib.SMTP_SSL(smtp_server, 465, timeout=self.timeout) as server:
 			server.login(self.email_user, self.email_pass)
 			server.send_message(msg)
 
-	def send_pushplus(self, title: str, content: str):
+	def _pushplus_request(self, title: str, content: str) -> tuple[str, dict]:
 		if not self.pushplus_token:
 			raise ValueError('PushPlus Token 未配置')
 
 		data = {'token': self.pushplus_token, 'title': title, 'content': content, 'template': 'html'}
-		with httpx.Client(timeout=30.0) as client:
-			client.post('http://www.pushplus.plus/send', json=data)
+		return 'http://www.pushplus.plus/send', data
 
-	def send_serverPush(self, title: str, content: str):
+	def _server_push_request(self, title: str, content: str) -> tuple[str, dict]:
 		if not self.server_push_key:
 			raise ValueError('Server酱 SendKey 未配置')
 
 		data = {'title': title, 'desp': content}
-		with httpx.Client(timeout=30.0) as client:
-			client.post(f'https://sctapi.ftqq.com/{self.server_push_key}.send', json=data)
+		return f'https://sctapi.ftqq.com/{self.server_push_key}.send', data
 
-	def send_dingtalk(self, title: str, content: str):
+	def _dingtalk_request(self, title: str, content: str) -> tuple[str, dict]:
 		if not self.dingding_webhook:
 			raise ValueError('钉钉 Webhook 未配置')
 
 		data = {'msgtype': 'text', 'text': {'content': f'{title}\n{content}'}}
-		with httpx.Client(timeout=30.0) as client:
-			client.post(self.dingding_webhook, json=data)
+		return self.dingding_webhook, data
 
-	def send_feishu(self, title: str, content: str):
+	def _feishu_request(self, title: str, content: str) -> tuple[str, dict]:
 		if not self.feishu_webhook:
 			raise ValueError('飞书 Webhook 未配置')
 
@@ -73,33 +89,108 @@ class NotificationKit:
 				'header': {'template': 'blue', 'title': {'content': title, 'tag': 'plain_text'}},
 			},
 		}
-		with httpx.Client(timeout=30.0) as client:
-			client.post(self.feishu_webhook, json=data)
+		return self.feishu_webhook, data
 
-	def send_wecom(self, title: str, content: str):
+	def _wecom_request(self, title: str, content: str) -> tuple[str, dict]:
 		if not self.weixin_webhook:
 			raise ValueError('企业微信 Webhook 未配置')
 
 		data = {'msgtype': 'text', 'text': {'content': f'{title}\n{content}'}}
-		with httpx.Client(timeout=30.0) as client:
-			client.post(self.weixin_webhook, json=data)
-
-	def push_message(self, title: str, content: str, msg_type: Literal['text', 'html'] = 'text'):
-		notifications = [
-			('📧 邮箱', lambda: self.send_email(title, content, msg_type)),
-			('📱 PushPlus', lambda: self.send_pushplus(title, content)),
-			('🔔 Server酱', lambda: self.send_serverPush(title, content)),
-			('💬 钉钉', lambda: self.send_dingtalk(title, content)),
-			('📲 飞书', lambda: self.send_feishu(title, content)),
-			('💼 企业微信', lambda: self.send_wecom(title, content)),
-		]
+		return self.weixin_webhook, data
 
-		for name, func in notifications:
-			try:
-				func()
-				print(f'{name}: 消息推送成功！')
-			except Exception as e:
-				print(f'{name}: 消息推送失败！原因: {str(e)}')
+	def _post(self, url: str, data: dict):
+		with httpx.Client(timeout=self.timeout) as client:
+			client.post(url, json=data)
 
+	def send_pushplus(self, title: str, content: str):
+		self._post(*self._pushplus_request(title, content))
+
+	def send_serverPush(self, title: str, content: str):
+		self._post(*self._server_push_request(title, content))
+
+	def send_dingtalk(self, title: str, content: str):
+		self._post(*self._dingtalk_request(title, content))
 
-notify = NotificationKit()
+	def send_feishu(self, title: str, content: str):
+		self._post(*self._feishu_request(title, content))
+
+	def send_wecom(self, title: str, content: str):
+		self._post(*self._wecom_request(title, content))
+
+	def configured_channels(self) -> list[tuple[str, str]]:
+		"""返回已配置的渠道列表 [(渠道标识, 显示名称)]"""
+		channels = [
+			('email', '📧 邮箱', self.email_user and self.email_pass and self.email_to),
+			('pushplus', '📱 PushPlus', self.pushplus_token),
+			('serverchan', '🔔 Server酱', self.server_push_key),
+			('dingtalk', '💬 钉钉', self.dingding_webhook),
+			('feishu', '📲 飞书', self.feishu_webhook),
+			('wecom', '💼 企业微信', self.weixin_webhook),
+		]
+		return [(key, name) for key, name, configured in channels if configured]
+
+	async def send_channel(
+		self,
+		client: httpx.AsyncClient,
+		channel: str,
+		title: str,
+		content: str,
+		msg_type: Literal['text', 'html'] = 'text',
+	):
+		"""通过共享的 AsyncClient 向单个渠道发送消息，邮件在线程中发送避免阻塞事件循环"""
+		if channel == 'email':
+			await asyncio.to_thread(self.send_email, title, content, msg_type)
+			return
+
+		builders = {
+			'pushplus': self._pushplus_request,
+			'serverchan': self._server_push_request,
+			'dingtalk': self._dingtalk_request,
+			'feishu': self._feishu_request,
+			'wecom': self._wecom_request,
+		}
+		url, data = builders[channel](title, content)
+		response = await client.post(url, json=data)
+		response.raise_for_status()
+
+	async def _deliver(self, client: httpx.AsyncClient, channel: str, name: str, title: str, content: str, msg_type):
+		start = time.perf_counter()
+		try:
+			await asyncio.wait_for(self.send_channel(client, channel, title, content, msg_type), timeout=self.timeout)
+			elapsed = time.perf_counter() - start
+			print(f'{name}: 消息推送成功！耗时 {elapsed:.2f}s')
+			return {'channel': channel, 'name': name, 'success': True, 'elapsed': elapsed, 'error': None}
+		except Exception as e:
+			elapsed = time.perf_counter() - start
+			if isinstance(e, asyncio.TimeoutError):
+				error = f'超时（{self.timeout:g}s）'
+			else:
+				error = (str(e) or type(e).__name__).splitlines()[0]
+			print(f'{name}: 消息推送失败！耗时 {elapsed:.2f}s，原因: {error}')
+			return {'channel': channel, 'name': name, 'success': False, 'elapsed': elapsed, 'error': error}
+
+	async def apush_message(self, title: str, content: str, msg_type: Literal['text', 'html'] = 'text') -> list[dict]:
+		"""并发推送到所有已配置的渠道，返回每个渠道的结果和耗时"""
+		channels = self.configured_channels()
+		if not channels:
+			print('ℹ️ [信息] 未配置任何通知渠道，跳过推送')
+			return []
+
+		async with httpx.AsyncClient(timeout=self.timeout) as client:
+			return list(
+				await asyncio.gather(
+					*(self._deliver(client, channel, name, title, content, msg_type) for channel, name in channels)
+				)
+			)
+
+	def push_message(self, title: str, content: str, msg_type: Literal['text', 'html'] = 'text') -> list[dict]:
+		"""apush_message 的同步版本，在事件循环中应直接 await apush_message
+
+		在事件循环中调用时无法使用 asyncio.run，改为在工作线程的新事件循环中推送，推送期间当前事件循环会被阻塞
+		"""
+		try:
+			asyncio.get_running_loop()
+		except RuntimeError:
+			return asyncio.run(self.apush_message(title, content, msg_type))
+		with ThreadPoolExecutor(max_workers=1) as executor:
+			return executor.submit(asyncio.run, self.apush_message(title, content, msg_type)).result()
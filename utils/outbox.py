@@ -0,0 +1,161 @@
+"""
+通知发件箱：推送失败的渠道消息持久化到本地，之后按指数退避 + 抖动重试
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+
+import httpx
+
+DEFAULT_OUTBOX_FILE = 'notify_outbox.json'
+DEFAULT_MAX_ATTEMPTS = 8
+DEFAULT_BASE_DELAY = 60.0
+DEFAULT_MAX_DELAY = 6 * 3600.0
+# 已送达消息 ID 的保留时间，用于去重
+DELIVERED_RETENTION = 7 * 24 * 3600.0
+
+
+def message_id(channel: str, title: str, content: str) -> str:
+	"""同一渠道的同一条消息得到相同的 ID"""
+	digest = hashlib.sha256(f'{channel}\0{title}\0{content}'.encode('utf-8')).hexdigest()
+	return digest[:24]
+
+
+class NotificationOutbox:
+	"""基于 JSON 文件的通知发件箱
+
+	文件结构: {"pending": {id: {...}}, "delivered": {id: 送达时间}}
+	"""
+
+	def __init__(
+		self,
+		path: str = DEFAULT_OUTBOX_FILE,
+		max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+		base_delay: float = DEFAULT_BASE_DELAY,
+		max_delay: float = DEFAULT_MAX_DELAY,
+	):
+		self.path = path
+		self.max_attempts = max_attempts
+		self.base_delay = base_delay
+		self.max_delay = max_delay
+		self.pending: dict[str, dict] = {}
+		self.delivered: dict[str, float] = {}
+		self._load()
+
+	@classmethod
+	def from_env(cls) -> 'NotificationOutbox | None':
+		"""从环境变量创建发件箱，NOTIFY_OUTBOX_FILE 设置为空字符串时禁用"""
+		path = os.getenv('NOTIFY_OUTBOX_FILE', DEFAULT_OUTBOX_FILE)
+		if not path:
+			return None
+		max_attempts = DEFAULT_MAX_ATTEMPTS
+		max_attempts_str = os.getenv('NOTIFY_OUTBOX_MAX_ATTEMPTS')
+		if max_attempts_str:
+			try:
+				max_attempts = max(1, int(max_attempts_str))
+			except ValueError:
+				print(
+					f'[WARNING] Invalid NOTIFY_OUTBOX_MAX_ATTEMPTS "{max_attempts_str}", using default {DEFAULT_MAX_ATTEMPTS}'
+				)
+		return cls(path=path, max_attempts=max_attempts)
+
+	def backoff(self, attempts: int) -> float:
+		"""第 attempts 次失败后的等待时间：指数增长，带一半幅度的随机抖动"""
+		delay = min(self.max_delay, self.base_delay * (2 ** max(0, attempts - 1)))
+		return delay / 2 + random.uniform(0, delay / 2)
+
+	def enqueue(self, channel: str, name: str, title: str, content: str, msg_type: str, error: str | None = None):
+		"""记录一次失败的推送，已送达或已在队列中的消息不会重复入队"""
+		msg_id = message_id(channel, title, content)
+		if msg_id in self.delivered or msg_id in self.pending:
+			return
+		now = time.time()
+		self.pending[msg_id] = {
+			'channel': channel,
+			'name': name,
+			'title': title,
+			'content': content,
+			'msg_type': msg_type,
+			'attempts': 1,
+			'created_at': now,
+			'next_attempt_at': now + self.backoff(1),
+			'last_error': error,
+		}
+		self._save()
+
+	def record_results(self, results: list[dict], title: str, content: str, msg_type: str):
+		"""根据 push 结果更新发件箱：失败的渠道入队，成功的渠道记为已送达"""
+		for result in results:
+			if result['success']:
+				self.delivered[message_id(result['channel'], title, content)] = time.time()
+			else:
+				self.enqueue(result['channel'], result['name'], title, content, msg_type, result.get('error'))
+		self._save()
+
+	def due(self, now: float | None = None) -> dict[str, dict]:
+		now = now or time.time()
+		return {msg_id: item for msg_id, item in self.pending.items() if item['next_attempt_at'] <= now}
+
+	async def deliver_pending(self, kit) -> int:
+		"""重试所有到期的消息，返回本次成功送达的数量"""
+		due = self.due()
+		if not due:
+			return 0
+
+		configured = {channel for channel, _ in kit.configured_channels()}
+		print(f'📮 [发件箱] 正在重试 {len(due)} 条待发送通知')
+
+		async def retry(client: httpx.AsyncClient, msg_id: str, item: dict) -> bool:
+			# 渠道配置已被移除的消息直接丢弃
+			if item['channel'] not in configured:
+				self.pending.pop(msg_id, None)
+				return False
+			try:
+				await asyncio.wait_for(
+					kit.send_channel(client, item['channel'], item['title'], item['content'], item['msg_type']),
+					timeout=kit.timeout,
+				)
+			except Exception as e:
+				item['attempts'] += 1
+				item['last_error'] = (str(e) or type(e).__name__).splitlines()[0]
+				if item['attempts'] >= self.max_attempts:
+					print(f'📮 [发件箱] {item["name"]}: 已重试 {item["attempts"]} 次仍失败，放弃发送')
+					self.pending.pop(msg_id, None)
+				else:
+					item['next_attempt_at'] = time.time() + self.backoff(item['attempts'])
+				return False
+			print(f'📮 [发件箱] {item["name"]}: 补发成功（第 {item["attempts"] + 1} 次尝试）')
+			self.pending.pop(msg_id, None)
+			self.delivered[msg_id] = time.time()
+			return True
+
+		async with httpx.AsyncClient(timeout=kit.timeout) as client:
+			results = await asyncio.gather(*(retry(client, msg_id, item) for msg_id, item in due.items()))
+		self._save()
+		return sum(results)
+
+	def _load(self):
+		if not os.path.exists(self.path):
+			return
+		try:
+			with open(self.path, 'r', encoding='utf-8') as f:
+				data = json.load(f)
+			self.pending = data.get('pending', {})
+			self.delivered = data.get('delivered', {})
+		except Exception as e:
+			print(f'[WARNING] Failed to load notification outbox: {e}')
+
+	def _save(self):
+		cutoff = time.time() - DELIVERED_RETENTION
+		self.delivered = {msg_id: ts for msg_id, ts in self.delivered.items() if ts >= cutoff}
+		try:
+			tmp_path = f'{self.path}.tmp'
+			with open(tmp_path, 'w', encoding='utf-8') as f:
+				json.dump({'pending': self.pending, 'delivered': self.delivered}, f, ensure_ascii=False)
+			os.replace(tmp_path, self.path)
+		except Exception as e:
+			print(f'[WARNING] Failed to save notification outbox: {e}')
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+两阶段流水线：第一阶段（如获取 WAF cookies）的产出经有界队列交给第二阶段（如 HTTP 签到），两个阶段的并发数分别配置
+"""
+
+import asyncio
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, TypeVar
+
+T = TypeVar('T')
+# items 已读完的标记
+_EXHAUSTED = object()
+
+
+@dataclass(frozen=True, slots=True)
+class Done:
+	"""第一阶段返回 Done 时该项不进入第二阶段，result 直接作为结果（如配置错误、无法获取 WAF cookies）"""
+
+	result: Any
+
+
+async def run_pipeline(
+	items: Iterable[T],
+	produce: Callable[[T], Awaitable[Any]],
+	consume: Callable[[T, Any], Awaitable[Any]],
+	producers: int,
+	consumers: int,
+	queue_size: int,
+	window: int | None = None,
+) -> AsyncIterator[tuple[T, Any]]:
+	"""按 items 的顺序产出 (item, 结果)
+
+	producers 个协程依次读取 items 并执行 produce(item)，结果放入容量为 queue_size 的队列，队列满时第一阶段等待；
+	consumers 个协程从队列取出并执行 consume(item, produced)。任一阶段抛出的异常作为该项的结果返回。
+	已读取但尚未产出的项不超过 window 个（默认为两个阶段并发数与队列容量之和的两倍），items 只在需要时才读取下一个。
+	"""
+	window = window or 2 * (producers + queue_size + consumers)
+	iterator = iter(items)
+	queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+	slots = asyncio.Semaphore(window)
+	finished: dict[int, tuple[T, Any]] = {}
+	changed = asyncio.Event()
+	pulled = 0
+	producers_running = producers
+
+	def finish(seq: int, item: T, result):
+		finished[seq] = (item, result)
+		changed.set()
+
+	async def producer():
+		nonlocal pulled, producers_running
+		try:
+			while True:
+				await slots.acquire()
+				item = next(iterator, _EXHAUSTED)
+				if item is _EXHAUSTED:
+					slots.release()
+					break
+				seq = pulled
+				pulled += 1
+				try:
+					produced = await produce(item)
+				except Exception as e:
+					finish(seq, item, e)
+					continue
+				if isinstance(produced, Done):
+					finish(seq, item, produced.result)
+				else:
+					await queue.put((seq, item, produced))
+		finally:
+			producers_running -= 1
+			changed.set()
+		if producers_running == 0:
+			# 第一阶段全部结束后通知第二阶段退出
+			for _ in range(consumers):
+				await queue.put(None)
+
+	async def consumer():
+		try:
+			while True:
+				entry = await queue.get()
+				if entry is None:
+					return
+				seq, item, produced = entry
+				try:
+					finish(seq, item, await consume(item, produced))
+				except Exception as e:
+					finish(seq, item, e)
+		finally:
+			changed.set()
+
+	workers = [asyncio.create_task(producer()) for _ in range(producers)]
+	workers += [asyncio.create_task(consumer()) for _ in range(consumers)]
+	emitted = 0
+	try:
+		while True:
+			while emitted not in finished:
+				for worker in workers:
+					# 读取 items 出错等意外异常直接抛给调用方
+					if worker.done() and not worker.cancelled() and worker.exception():
+						raise worker.exception()
+				if producers_running == 0 and emitted >= pulled:
+					return
+				changed.clear()
+				await changed.wait()
+			item, result = finished.pop(emitted)
+			emitted += 1
+			slots.release()
+			yield item, result
+	finally:
+		for worker in workers:
+			worker.cancel()
+		await asyncio.gather(*workers, return_exceptions=True)
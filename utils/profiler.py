@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+运行耗时统计模块：按阶段记录耗时，运行结束后以 JSON Lines 格式追加到文件
+"""
+
+import json
+import math
+import os
+import time
+from contextlib import contextmanager
+from typing import Awaitable, TypeVar
+
+T = TypeVar('T')
+
+
+def percentile(values: list[float], q: float) -> float:
+	"""最近秩法计算分位数，values 为空时返回 0"""
+	if not values:
+		return 0.0
+	ordered = sorted(values)
+	return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+def describe_durations(values: list[float]) -> dict:
+	"""一组耗时的次数、p50、p95 和最大值（秒）"""
+	return {
+		'count': len(values),
+		'p50': round(percentile(values, 0.5), 4),
+		'p95': round(percentile(values, 0.95), 4),
+		'max': round(max(values, default=0.0), 4),
+	}
+
+
+class RunProfiler:
+	"""一次运行的阶段耗时记录
+
+	未设置输出文件时不记录任何数据，span() 只有一次判断的开销。
+	文件中每行一个 JSON 对象，type 为 span（单个阶段）、account（单个账号各阶段合计）或 summary（本次运行汇总）。
+	"""
+
+	def __init__(self, path: str | None = None):
+		self.path = path
+		self.run_id = time.strftime('%Y%m%dT%H%M%S')
+		self.spans: list[dict] = []
+
+	@classmethod
+	def from_env(cls) -> 'RunProfiler':
+		"""从环境变量 PROFILE_FILE 获取输出文件，未设置时禁用"""
+		return cls(os.getenv('PROFILE_FILE') or None)
+
+	@property
+	def enabled(self) -> bool:
+		return bool(self.path)
+
+	def record(self, phase: str, elapsed: float, account: str | None = None):
+		if self.enabled:
+			self.spans.append({'phase': phase, 'account': account, 'elapsed': elapsed, 'ts': time.time()})
+
+	@contextmanager
+	def span(self, phase: str, account: str | None = None):
+		"""记录 with 块的耗时，块内抛出异常时同样记录"""
+		if not self.enabled:
+			yield
+			return
+		start = time.perf_counter()
+		try:
+			yield
+		finally:
+			self.record(phase, time.perf_counter() - start, account)
+
+	async def timed(self, phase: str, awaitable: Awaitable[T], account: str | None = None) -> T:
+		"""等待 awaitable 并记录耗时，便于在 asyncio.gather 中分别统计并发的请求"""
+		with self.span(phase, account):
+			return await awaitable
+
+	def summary(self) -> dict:
+		"""按阶段汇总 p50/p95/max，并统计每个账号的阶段耗时合计"""
+		by_phase: dict[str, list[float]] = {}
+		by_account: dict[str, dict[str, float]] = {}
+		for span in self.spans:
+			by_phase.setdefault(span['phase'], []).append(span['elapsed'])
+			if span['account'] is not None:
+				phases = by_account.setdefault(span['account'], {})
+				phases[span['phase']] = phases.get(span['phase'], 0.0) + span['elapsed']
+		account_totals = [phases['account'] for phases in by_account.values() if 'account' in phases]
+		return {
+			'phases': {phase: describe_durations(values) for phase, values in by_phase.items()},
+			'accounts': by_account,
+			'account_total': describe_durations(account_totals),
+		}
+
+	def write(self) -> dict | None:
+		"""将本次运行的阶段耗时追加到文件并返回汇总，之后清空记录"""
+		if not self.enabled or not self.spans:
+			return None
+		summary = self.summary()
+		lines = [
+			{'type': 'span', 'run': self.run_id, **span, 'elapsed': round(span['elapsed'], 6)} for span in self.spans
+		]
+		lines += [
+			{
+				'type': 'account',
+				'run': self.run_id,
+				'account': account,
+				'phases': {phase: round(elapsed, 4) for phase, elapsed in phases.items()},
+			}
+			for account, phases in summary['accounts'].items()
+		]
+		lines.append(
+			{
+				'type': 'summary',
+				'run': self.run_id,
+				'phases': summary['phases'],
+				'account_total': summary['account_total'],
+			}
+		)
+		try:
+			with open(self.path, 'a', encoding='utf-8') as f:
+				f.writelines(json.dumps(line, ensure_ascii=False) + '\n' for line in lines)
+		except Exception as e:
+			print(f'[WARNING] Failed to write run profile: {e}')
+		self.spans.clear()
+		return summary
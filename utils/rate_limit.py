@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+限流模块：按服务商域名的令牌桶，HTTP 请求和浏览器页面导航都需要先取得令牌，收到 429 时自动降速
+"""
+
+import asyncio
+import time
+
+# 收到 429 后速率减半，最低降到配置速率的 1/10；之后每次成功请求恢复配置速率的 5%
+MIN_RATE_FACTOR = 0.1
+RECOVERY_FACTOR = 0.05
+# 429 响应没有 Retry-After 时的默认暂停时间（秒）
+DEFAULT_RATE_LIMITED_PAUSE = 1.0
+
+
+class TokenBucket:
+	"""单个域名的令牌桶
+
+	rate 为每秒请求数，burst 为桶容量（允许的突发请求数），rate 为空时不限速，
+	但收到 429 后仍会按 Retry-After 暂停该域名的所有请求。
+	"""
+
+	def __init__(self, rate: float | None = None, burst: int | None = None):
+		self.rate: float | None = None
+		self.capacity = 1.0
+		self.current_rate: float | None = None
+		self.configure(rate, burst)
+		self.tokens = self.capacity
+		self.updated = time.monotonic()
+		self.paused_until = 0.0
+		self._lock = asyncio.Lock()
+
+	def configure(self, rate: float | None, burst: int | None = None):
+		"""更新限速配置（常驻模式下每次运行都会根据最新的服务商配置调用）"""
+		rate = rate if rate and rate > 0 else None
+		if rate != self.rate:
+			self.current_rate = rate
+		self.rate = rate
+		self.capacity = max(1.0, float(burst or rate or 1))
+
+	async def acquire(self):
+		"""等待直到可以发出下一个请求，等待的请求按先后顺序放行"""
+		if self.current_rate is None and self.paused_until <= time.monotonic() and not self._lock.locked():
+			return
+		async with self._lock:
+			while True:
+				now = time.monotonic()
+				if self.paused_until > now:
+					await asyncio.sleep(self.paused_until - now)
+					continue
+				if self.current_rate is None:
+					return
+				self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.current_rate)
+				self.updated = now
+				if self.tokens >= 1:
+					self.tokens -= 1
+					return
+				await asyncio.sleep((1 - self.tokens) / self.current_rate)
+
+	def on_rate_limited(self, retry_after: float | None = None):
+		"""收到 429：暂停到 Retry-After 之后，并降低速率"""
+		now = time.monotonic()
+		pause = retry_after if retry_after is not None else DEFAULT_RATE_LIMITED_PAUSE
+		self.paused_until = max(self.paused_until, now + pause)
+		self.tokens = 0.0
+		self.updated = now
+		if self.rate:
+			self.current_rate = max(self.rate * MIN_RATE_FACTOR, self.current_rate / 2)
+			print(f'🐢 [限流] 收到 429，暂停 {pause:.1f}s，速率降至 {self.current_rate:.2f} 次/秒')
+		else:
+			print(f'🐢 [限流] 收到 429，暂停 {pause:.1f}s')
+
+	def on_success(self):
+		"""请求未被限流时逐步恢复到配置的速率"""
+		if self.rate and self.current_rate < self.rate:
+			self.current_rate = min(self.rate, self.current_rate + self.rate * RECOVERY_FACTOR)
+
+
+class RateLimiters:
+	"""按域名（host）管理令牌桶，同一域名的 HTTP 客户端和浏览器共用一个"""
+
+	def __init__(self):
+		self._buckets: dict[str, TokenBucket] = {}
+
+	def get(self, host: str) -> TokenBucket:
+		bucket = self._buckets.get(host)
+		if bucket is None:
+			bucket = TokenBucket()
+			self._buckets[host] = bucket
+		return bucket
+
+	def configure(self, host: str, rate: float | None, burst: int | None = None):
+		self.get(host).configure(rate, burst)
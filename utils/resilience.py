@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+请求容错模块：幂等请求的指数退避重试，以及按服务商域名的熔断器
+"""
+
+import asyncio
+import os
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+import httpx
+
+from utils.rate_limit import RateLimiters
+
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS'})
+DEFAULT_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class CircuitOpenError(httpx.TransportError):
+	"""服务商熔断期间直接拒绝请求"""
+
+
+def _read_env(name: str, default, cast):
+	value = os.getenv(name)
+	if not value:
+		return default
+	try:
+		return cast(value)
+	except ValueError:
+		print(f'[WARNING] Invalid {name} "{value}", using default {default}')
+		return default
+
+
+def parse_retry_after(value: str | None) -> float | None:
+	"""解析 Retry-After 响应头（秒数或 HTTP 日期），无法解析时返回 None"""
+	if not value:
+		return None
+	try:
+		return max(0.0, float(value))
+	except ValueError:
+		pass
+	from email.utils import parsedate_to_datetime
+
+	try:
+		return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+	except (TypeError, ValueError):
+		return None
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+	"""重试策略：第 n 次重试前等待 backoff * 2^(n-1) 秒（带一半幅度的随机抖动），不超过 max_backoff
+
+	只重试幂等请求（GET/HEAD/OPTIONS，或通过 extensions={'idempotent': True} 声明的请求），
+	重试网络错误、超时和 retry_statuses 中的状态码，响应带 Retry-After 时按其等待。
+	"""
+
+	retries: int = 2
+	backoff: float = 0.5
+	max_backoff: float = 8.0
+	retry_statuses: frozenset[int] = DEFAULT_RETRY_STATUSES
+
+	@classmethod
+	def from_env(cls) -> 'RetryPolicy':
+		"""从环境变量 HTTP_RETRIES / HTTP_RETRY_BACKOFF / HTTP_RETRY_MAX_BACKOFF 创建"""
+		defaults = cls()
+		return cls(
+			retries=max(0, _read_env('HTTP_RETRIES', defaults.retries, int)),
+			backoff=max(0.0, _read_env('HTTP_RETRY_BACKOFF', defaults.backoff, float)),
+			max_backoff=max(0.0, _read_env('HTTP_RETRY_MAX_BACKOFF', defaults.max_backoff, float)),
+		)
+
+	def delay(self, attempt: int, retry_after: str | None = None) -> float:
+		server_delay = parse_retry_after(retry_after)
+		if server_delay is not None:
+			return min(server_delay, self.max_backoff)
+		delay = min(self.max_backoff, self.backoff * (2 ** max(0, attempt - 1)))
+		return delay / 2 + random.uniform(0, delay / 2)
+
+
+@dataclass
+class CircuitBreaker:
+	"""单个域名的熔断器
+
+	最近 window 次请求中失败比例达到 failure_threshold（且至少 min_requests 次）时打开，
+	打开期间请求直接失败；cooldown 秒后进入半开状态，只放行一个试探请求，成功则关闭，失败则重新打开。
+	网络错误、超时和 5xx 响应记为失败。
+	"""
+
+	failure_threshold: float = 0.5
+	min_requests: int = 5
+	window: int = 20
+	cooldown: float = 30.0
+	state: str = 'closed'
+	opened_at: float = 0.0
+	_results: deque = field(default_factory=deque)
+	_trial_started: float | None = None
+
+	def available(self) -> bool:
+		"""当前是否可能放行请求（不占用半开状态的试探名额）"""
+		return self.state == 'closed' or time.monotonic() - self.opened_at >= self.cooldown
+
+	def allow(self) -> bool:
+		if self.state == 'closed':
+			return True
+		if self.state == 'open':
+			if time.monotonic() - self.opened_at < self.cooldown:
+				return False
+			self.state = 'half_open'
+			self._trial_started = None
+		# 试探请求超过 cooldown 仍未完成（如被取消）时允许新的试探
+		now = time.monotonic()
+		if self._trial_started is not None and now - self._trial_started < self.cooldown:
+			return False
+		self._trial_started = now
+		return True
+
+	def record(self, success: bool):
+		if self.state == 'half_open':
+			if success:
+				self.state = 'closed'
+				self._results.clear()
+			else:
+				self.trip()
+			self._trial_started = None
+			return
+		self._results.append(success)
+		while len(self._results) > self.window:
+			self._results.popleft()
+		failures = self._results.count(False)
+		if len(self._results) >= self.min_requests and failures / len(self._results) >= self.failure_threshold:
+			self.trip()
+
+	def trip(self):
+		"""立即打开熔断器"""
+		self.state = 'open'
+		self.opened_at = time.monotonic()
+		self._results.clear()
+
+
+class CircuitBreakers:
+	"""按域名（host）管理熔断器，同一域名经不同代理访问时共用一个熔断器"""
+
+	def __init__(self, failure_threshold: float = 0.5, min_requests: int = 5, cooldown: float = 30.0):
+		self.failure_threshold = failure_threshold
+		self.min_requests = min_requests
+		self.cooldown = cooldown
+		self._breakers: dict[str, CircuitBreaker] = {}
+
+	@classmethod
+	def from_env(cls) -> 'CircuitBreakers':
+		"""从环境变量 CIRCUIT_FAILURE_THRESHOLD / CIRCUIT_MIN_REQUESTS / CIRCUIT_COOLDOWN 创建"""
+		return cls(
+			failure_threshold=_read_env('CIRCUIT_FAILURE_THRESHOLD', 0.5, float),
+			min_requests=max(1, _read_env('CIRCUIT_MIN_REQUESTS', 5, int)),
+			cooldown=max(0.0, _read_env('CIRCUIT_COOLDOWN', 30.0, float)),
+		)
+
+	def get(self, host: str) -> CircuitBreaker:
+		breaker = self._breakers.get(host)
+		if breaker is None:
+			breaker = CircuitBreaker(self.failure_threshold, self.min_requests, cooldown=self.cooldown)
+			self._breakers[host] = breaker
+		return breaker
+
+
+class ResilientTransport(httpx.AsyncBaseTransport):
+	"""在底层 transport 外加上限流、熔断和重试，对调用方透明
+
+	每次请求（包括重试）都先从该域名的令牌桶取得令牌，429 响应会让令牌桶按 Retry-After 暂停并降速。
+	单个请求可通过 extensions={'retries': n} 覆盖重试次数，
+	通过 extensions={'timeout_is_failure': False} 使超时不计入熔断器的失败统计（如健康检查）。
+	"""
+
+	def __init__(
+		self,
+		transport: httpx.AsyncBaseTransport,
+		retry: RetryPolicy,
+		breakers: CircuitBreakers,
+		limiters: RateLimiters | None = None,
+	):
+		self.transport = transport
+		self.retry = retry
+		self.breakers = breakers
+		self.limiters = limiters or RateLimiters()
+
+	async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+		host = request.url.host
+		breaker = self.breakers.get(host)
+		limiter = self.limiters.get(host)
+		retries = 0
+		if request.method in IDEMPOTENT_METHODS or request.extensions.get('idempotent'):
+			retries = request.extensions.get('retries', self.retry.retries)
+
+		attempt = 0
+		while True:
+			attempt += 1
+			if not breaker.allow():
+				raise CircuitOpenError(f'{host} 已熔断，暂停请求', request=request)
+			await limiter.acquire()
+			try:
+				response = await self.transport.handle_async_request(request)
+			except httpx.TransportError as e:
+				if not isinstance(e, httpx.TimeoutException) or request.extensions.get('timeout_is_failure', True):
+					breaker.record(False)
+				if attempt > retries:
+					raise
+				delay = self.retry.delay(attempt)
+				print(
+					f'🔁 [重试] {request.method} {request.url.path} 失败（{type(e).__name__}），{delay:.1f}s 后第 {attempt} 次重试'
+				)
+				await asyncio.sleep(delay)
+				continue
+
+			breaker.record(response.status_code < 500)
+			if response.status_code == 429:
+				limiter.on_rate_limited(parse_retry_after(response.headers.get('Retry-After')))
+			else:
+				limiter.on_success()
+			if response.status_code not in self.retry.retry_statuses or attempt > retries:
+				return response
+			delay = self.retry.delay(attempt, response.headers.get('Retry-After'))
+			await response.aclose()
+			print(
+				f'🔁 [重试] {request.method} {request.url.path} 返回 HTTP {response.status_code}，{delay:.1f}s 后第 {attempt} 次重试'
+			)
+			await asyncio.sleep(delay)
+
+	async def aclose(self):
+		await self.transport.aclose()
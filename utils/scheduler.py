@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+调度模块：常驻模式下计算下一次运行时间，支持 cron 表达式和固定间隔 + 随机抖动
+"""
+
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+
+def _parse_field(field: str, low: int, high: int) -> frozenset[int]:
+	"""解析 cron 单个字段，支持 *、数字、a-b 范围、/n 步长和逗号列表"""
+	values = set()
+	for part in field.split(','):
+		step = 1
+		if '/' in part:
+			part, step_str = part.split('/', 1)
+			step = int(step_str)
+			if step <= 0:
+				raise ValueError(f'invalid step in "{field}"')
+		if part in ('*', ''):
+			start, end = low, high
+		elif '-' in part:
+			start_str, end_str = part.split('-', 1)
+			start, end = int(start_str), int(end_str)
+		else:
+			start = int(part)
+			end = high if step > 1 else start
+		if start < low or end > high or start > end:
+			raise ValueError(f'value out of range in "{field}"')
+		values.update(range(start, end + 1, step))
+	return frozenset(values)
+
+
+@dataclass(frozen=True)
+class CronSchedule:
+	"""标准 5 段 cron 表达式：分 时 日 月 周（周日为 0 或 7），使用本地时间"""
+
+	expression: str
+	minutes: frozenset[int]
+	hours: frozenset[int]
+	days: frozenset[int]
+	months: frozenset[int]
+	weekdays: frozenset[int]
+	any_day: bool
+	any_weekday: bool
+
+	@classmethod
+	def parse(cls, expression: str) -> 'CronSchedule':
+		fields = expression.split()
+		if len(fields) != 5:
+			raise ValueError(f'cron expression must have 5 fields: "{expression}"')
+		minute, hour, day, month, weekday = fields
+		weekdays = {7 if d == 0 else d for d in _parse_field(weekday, 0, 7)}
+		return cls(
+			expression=expression,
+			minutes=_parse_field(minute, 0, 59),
+			hours=_parse_field(hour, 0, 23),
+			days=_parse_field(day, 1, 31),
+			months=_parse_field(month, 1, 12),
+			weekdays=frozenset(weekdays),
+			any_day=day == '*',
+			any_weekday=weekday == '*',
+		)
+
+	def _day_matches(self, t: datetime) -> bool:
+		day_ok = t.day in self.days
+		# datetime.isoweekday(): 周一为 1，周日为 7
+		weekday_ok = t.isoweekday() in self.weekdays
+		if self.any_day or self.any_weekday:
+			return day_ok and weekday_ok
+		# 日和周都有限定时，满足其一即可（与 cron 行为一致）
+		return day_ok or weekday_ok
+
+	def next_after(self, now: datetime) -> datetime:
+		"""计算 now 之后的下一次触发时间"""
+		t = now.replace(second=0, microsecond=0) + timedelta(minutes=1)
+		# 最多向后查找 5 年，避免无效表达式（如 2 月 30 日）导致死循环
+		limit = now + timedelta(days=366 * 5)
+		while t <= limit:
+			if t.month not in self.months:
+				t = (t.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+			elif not self._day_matches(t):
+				t = t.replace(hour=0, minute=0) + timedelta(days=1)
+			elif t.hour not in self.hours:
+				t = t.replace(minute=0) + timedelta(hours=1)
+			elif t.minute not in self.minutes:
+				t += timedelta(minutes=1)
+			else:
+				return t
+		raise ValueError(f'cron expression never fires: "{self.expression}"')
+
+
+@dataclass(frozen=True)
+class Schedule:
+	"""常驻模式的调度策略：cron 表达式或固定间隔，触发时间再加上 0~jitter 秒的随机延迟"""
+
+	cron: CronSchedule | None = None
+	interval: float | None = None
+	jitter: float = 0.0
+
+	def next_run(self, now: datetime) -> datetime:
+		if self.cron:
+			next_time = self.cron.next_after(now)
+		else:
+			next_time = now + timedelta(seconds=self.interval or 0)
+		if self.jitter > 0:
+			next_time += timedelta(seconds=random.uniform(0, self.jitter))
+		return next_time
+
+	def describe(self) -> str:
+		base = f'cron "{self.cron.expression}"' if self.cron else f'每 {self.interval:g} 秒'
+		return f'{base}，随机延迟 0~{self.jitter:g} 秒' if self.jitter > 0 else base
+
+
+@dataclass(frozen=True)
+class ResetSchedule:
+	"""按服务商签到重置时间调度
+
+	每次重置后延迟 delay 秒运行，各账号在 0~spread 秒内随机错开开始；
+	有账号失败时按 retry_interval 指数退避重试（只处理未签到的账号），
+	重试 max_retries 次后等待下一次重置。
+	"""
+
+	delay: float = 300.0
+	spread: float = 600.0
+	retry_interval: float = 900.0
+	max_retries: int = 5
+
+	def next_reset_run(self, reset_times: list[datetime]) -> datetime:
+		"""最近一次重置时间加上延迟"""
+		return min(reset_times) + timedelta(seconds=self.delay)
+
+	def retry_delay(self, attempt: int) -> float:
+		"""第 attempt 次重试前的等待时间（秒），带一半幅度的随机抖动"""
+		delay = min(6 * 3600.0, self.retry_interval * (2 ** max(0, attempt - 1)))
+		return delay / 2 + random.uniform(0, delay / 2)
+
+	def describe(self) -> str:
+		return f'签到重置后 {self.delay:g} 秒运行，账号随机错开 0~{self.spread:g} 秒，失败账号最多重试 {self.max_retries} 次'
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+账号分片：多个进程或机器各自处理一部分账号，结果写入分片结果文件，再由合并步骤统一检查余额并发送一次通知
+"""
+
+import glob
+import hashlib
+import json
+import os
+import re
+import time
+from dataclasses import dataclass
+from typing import Iterator
+
+DEFAULT_SHARD_RESULTS_DIR = 'shard_results'
+SHARD_FILE_PATTERN = re.compile(r'^shard-(\d+)-of-(\d+)\.jsonl$')
+# 已合并的分片结果文件加上此后缀，重复执行合并不会再次统计和通知
+MERGED_SUFFIX = '.merged'
+
+
+def shard_of(provider: str, api_user: str, count: int) -> int:
+	"""按 (provider, api_user) 的哈希分配分片（从 1 开始），与账号在配置中的顺序无关，且不受 PYTHONHASHSEED 影响"""
+	digest = hashlib.blake2b(f'{provider}\0{api_user}'.encode('utf-8'), digest_size=8).digest()
+	return int.from_bytes(digest, 'big') % count + 1
+
+
+@dataclass(frozen=True)
+class Shard:
+	"""第 index 个分片（共 count 个，index 从 1 开始）"""
+
+	index: int
+	count: int
+
+	@classmethod
+	def parse(cls, value: str) -> 'Shard':
+		"""解析 "i/N" 格式，如 "2/4" 表示 4 个分片中的第 2 个"""
+		index, sep, count = value.partition('/')
+		try:
+			shard = cls(int(index), int(count))
+		except ValueError:
+			raise ValueError(f'Invalid shard "{value}", expected i/N') from None
+		if not sep or shard.count < 1 or not 1 <= shard.index <= shard.count:
+			raise ValueError(f'Invalid shard "{value}", expected i/N with 1 <= i <= N')
+		return shard
+
+	def owns(self, provider: str, api_user: str) -> bool:
+		return shard_of(provider, str(api_user), self.count) == self.index
+
+	def result_path(self, directory: str) -> str:
+		return os.path.join(directory, f'shard-{self.index}-of-{self.count}.jsonl')
+
+	def __str__(self) -> str:
+		return f'{self.index}/{self.count}'
+
+
+class ShardResultWriter:
+	"""逐行写入分片结果（JSON Lines）
+
+	第一行为分片信息，之后每个账号一行，最后一行为汇总；先写入临时文件，完成后原子替换，
+	合并步骤不会读到写了一半的文件，同一分片未合并的旧结果会被本次结果覆盖。
+	"""
+
+	def __init__(self, shard: Shard, directory: str):
+		os.makedirs(directory, exist_ok=True)
+		self.shard = shard
+		self.path = shard.result_path(directory)
+		self._tmp_path = f'{self.path}.tmp'
+		self._file = open(self._tmp_path, 'w', encoding='utf-8')
+		self.count = 0
+		self._write({'type': 'shard', 'index': shard.index, 'count': shard.count, 'started': time.time()})
+
+	def _write(self, data: dict):
+		self._file.write(json.dumps(data, ensure_ascii=False) + '\n')
+
+	def write(self, record: dict):
+		self._write({'type': 'account', **record})
+		self.count += 1
+
+	def close(self, summary: dict | None = None):
+		"""写入汇总并替换正式文件；summary 为空表示运行中断，只删除临时文件"""
+		if summary is None:
+			self._file.close()
+			os.remove(self._tmp_path)
+			return
+		self._write({'type': 'summary', 'accounts': self.count, 'finished': time.time(), **summary})
+		self._file.close()
+		os.replace(self._tmp_path, self.path)
+
+
+@dataclass
+class ShardResultFile:
+	"""一个待合并的分片结果文件"""
+
+	path: str
+	index: int
+	count: int
+
+	def records(self) -> Iterator[dict]:
+		"""逐行读取账号记录，不一次性载入整个文件"""
+		with open(self.path, encoding='utf-8') as f:
+			for line in f:
+				data = json.loads(line)
+				if data.pop('type', None) == 'account':
+					yield data
+
+	def mark_merged(self):
+		os.replace(self.path, self.path + MERGED_SUFFIX)
+
+
+def find_shard_results(directory: str) -> list[ShardResultFile]:
+	"""列出目录中尚未合并的分片结果文件，按分片序号排序"""
+	files = []
+	for path in glob.glob(os.path.join(glob.escape(directory), 'shard-*-of-*.jsonl')):
+		match = SHARD_FILE_PATTERN.match(os.path.basename(path))
+		if match:
+			files.append(ShardResultFile(path, int(match.group(1)), int(match.group(2))))
+	return sorted(files, key=lambda f: (f.count, f.index))
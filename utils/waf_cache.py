@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+WAF cookies 缓存模块：按服务商域名 + 代理缓存 acw_tc / cdn_sec_tc / acw_sc__v2
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass
+
+# WAF cookies 默认有效期（秒），可通过环境变量 WAF_COOKIE_TTL 覆盖
+DEFAULT_WAF_COOKIE_TTL = 1200
+
+
+@dataclass
+class WafCookieEntry:
+	"""缓存条目"""
+
+	cookies: dict
+	expires_at: float
+	# 本进程内是否已确认可用（新获取或探测通过），从磁盘加载的条目需要先探测
+	validated: bool = False
+
+	def is_expired(self, now: float | None = None) -> bool:
+		return (now or time.time()) >= self.expires_at
+
+
+class WafCookieCache:
+	"""带 TTL 的 WAF cookies 缓存，内存为主，可选持久化到磁盘"""
+
+	def __init__(self, ttl: float = DEFAULT_WAF_COOKIE_TTL, cache_file: str | None = None):
+		self.ttl = ttl
+		self.cache_file = cache_file
+		self._entries: dict[str, WafCookieEntry] = {}
+		self._locks: dict[str, asyncio.Lock] = {}
+		self._load()
+
+	@classmethod
+	def from_env(cls) -> 'WafCookieCache':
+		"""从环境变量创建缓存
+
+		- WAF_COOKIE_TTL: 有效期（秒），设置为 0 时禁用缓存
+		- WAF_COOKIE_CACHE_FILE: 磁盘缓存文件路径，不设置时仅在内存中缓存
+		"""
+		ttl = DEFAULT_WAF_COOKIE_TTL
+		ttl_str = os.getenv('WAF_COOKIE_TTL')
+		if ttl_str:
+			try:
+				ttl = max(0.0, float(ttl_str))
+			except ValueError:
+				print(f'[WARNING] Invalid WAF_COOKIE_TTL "{ttl_str}", using default {DEFAULT_WAF_COOKIE_TTL}s')
+		return cls(ttl=ttl, cache_file=os.getenv('WAF_COOKIE_CACHE_FILE') or None)
+
+	@property
+	def enabled(self) -> bool:
+		return self.ttl > 0
+
+	@staticmethod
+	def make_key(domain: str, proxy_url: str | None) -> str:
+		"""生成缓存 key，代理地址只保存摘要，避免把代理凭据写入磁盘"""
+		proxy_digest = hashlib.sha256(proxy_url.encode('utf-8')).hexdigest()[:12] if proxy_url else 'direct'
+		return f'{domain.rstrip("/")}|{proxy_digest}'
+
+	def lock(self, key: str) -> asyncio.Lock:
+		"""同一 key 的 WAF 求解串行进行，避免多个账号同时启动浏览器"""
+		if key not in self._locks:
+			self._locks[key] = asyncio.Lock()
+		return self._locks[key]
+
+	def get(self, key: str) -> WafCookieEntry | None:
+		"""获取未过期的缓存条目"""
+		if not self.enabled:
+			return None
+		entry = self._entries.get(key)
+		if entry is None:
+			return None
+		if entry.is_expired():
+			self._entries.pop(key, None)
+			return None
+		return entry
+
+	def set(self, key: str, cookies: dict):
+		"""写入新获取的 cookies"""
+		if not self.enabled:
+			return
+		self._entries[key] = WafCookieEntry(cookies=dict(cookies), expires_at=time.time() + self.ttl, validated=True)
+		self._save()
+
+	def invalidate(self, key: str):
+		"""删除被服务器拒绝的 cookies"""
+		if self._entries.pop(key, None) is not None:
+			self._save()
+
+	def _load(self):
+		if not self.enabled or not self.cache_file or not os.path.exists(self.cache_file):
+			return
+		try:
+			with open(self.cache_file, 'r', encoding='utf-8') as f:
+				data = json.load(f)
+			now = time.time()
+			for key, item in data.items():
+				entry = WafCookieEntry(cookies=item['cookies'], expires_at=float(item['expires_at']))
+				if not entry.is_expired(now):
+					self._entries[key] = entry
+		except Exception as e:
+			print(f'[WARNING] Failed to load WAF cookie cache: {e}')
+
+	def _save(self):
+		if not self.cache_file:
+			return
+		try:
+			now = time.time()
+			data = {
+				key: {'cookies': entry.cookies, 'expires_at': entry.expires_at}
+				for key, entry in self._entries.items()
+				if not entry.is_expired(now)
+			}
+			tmp_file = f'{self.cache_file}.tmp'
+			with open(tmp_file, 'w', encoding='utf-8') as f:
+				json.dump(data, f)
+			os.replace(tmp_file, self.cache_file)
+		except Exception as e:
+			print(f'[WARNING] Failed to save WAF cookie cache: {e}')